@@ -5,6 +5,7 @@ from tabulacaoOlimpiadasEParalimpada import main as tabulacao_main
 from classificacaoMelhoresColocados import main as classificacao_tabulacao_main
 from semifinal import main as seminifinal_main
 from final import main as final_main
+from perfil import coletar, painel, perfilar
 
 
 # Configuração da página
@@ -41,21 +42,30 @@ if st.sidebar.button('Semifinal '): #semifinal.py
 if st.sidebar.button('Final '): #final.py
     st.session_state.current_page = 'final'
 
+# Medição de desempenho (perfil.py): o painel "Desempenho desta execução" aparece abaixo da página
+st.sidebar.markdown("---")
+medir_memoria = st.sidebar.checkbox('Medir memória por etapa (mais lento)', value=False)
+gerar_perfil = st.sidebar.checkbox('Gerar perfil (cProfile) desta execução', value=False)
+
 
 # Mostrando conteúdos baseados no estado
-if st.session_state.current_page == 'merge_sheets': #juntarSheets.py
-    juntar_sheets_main()
-elif st.session_state.current_page == 'tabulacao': #tabulacaoOlimpiadasEParalimpada.py
-    tabulacao_main()
-elif st.session_state.current_page == 'classificacaoMelhoresColocados': #classificacaoMelhoresColocados.py
-    classificacao_tabulacao_main()
-elif st.session_state.current_page == 'semifinal': #semifinal.py
-    seminifinal_main()
-elif st.session_state.current_page == 'final': #final.py
-    final_main()
-elif st.session_state.current_page == 'home':
-    st.title("Inteleceleri - Pedagógico")
-    st.write("Por favor, escolha uma opção ao lado para visualizar os dados.")
+with coletar(memoria=medir_memoria) as relatorio, perfilar(gerar_perfil) as perfil:
+    if st.session_state.current_page == 'merge_sheets': #juntarSheets.py
+        juntar_sheets_main()
+    elif st.session_state.current_page == 'tabulacao': #tabulacaoOlimpiadasEParalimpada.py
+        tabulacao_main()
+    elif st.session_state.current_page == 'classificacaoMelhoresColocados': #classificacaoMelhoresColocados.py
+        classificacao_tabulacao_main()
+    elif st.session_state.current_page == 'semifinal': #semifinal.py
+        seminifinal_main()
+    elif st.session_state.current_page == 'final': #final.py
+        final_main()
+    elif st.session_state.current_page == 'home':
+        st.title("Inteleceleri - Pedagógico")
+        st.write("Por favor, escolha uma opção ao lado para visualizar os dados.")
+
+if st.session_state.current_page != 'home':
+    painel(relatorio, perfil if gerar_perfil else None)
 
 # Espaços adicionais na barra lateral, para estética
 for _ in range(20):
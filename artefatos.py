@@ -0,0 +1,166 @@
+# Artefato Parquet entre as páginas (alternativa ao .xlsx baixado e reenviado)
+# - Cada página pode exportar o seu resultado como um Parquet tipado e as páginas seguintes
+#   aceitam esse arquivo no lugar do .xlsx: sem reler uma planilha estilizada pelo openpyxl,
+#   sem perder os tipos (Pontuação numérica, Escola/Ano categóricos) e sem renormalizar
+# - Um arquivo = uma tabela longa; as abas do .xlsx equivalente viram a coluna Aba
+#   (categórica, na ordem das abas). A aba-resumo (GERAL, RANKING FINAL), que é a tabela
+#   inteira, fica só registrada nos metadados
+# - Colunas derivadas (Tempo_seg, Ordem_Ano) vão junto, marcadas nos metadados: quem lê
+#   decide se usa; abas() devolve as abas como no .xlsx, sem elas
+# - Colunas que misturam texto e número (Tempo: '12:30' e 540) não cabem numa coluna
+#   Parquet: viram <coluna>__txt + <coluna>__num e voltam a ser uma só na leitura
+# - A leitura envolve os bytes do upload sem copiá-los (pa.BufferReader)
+
+import json
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_DISPONIVEL = True
+except ImportError:
+    PYARROW_DISPONIVEL = False
+
+FORMATO = 'tabulacao-artefato'
+VERSAO = 1
+CHAVE_METADADOS = b'tabulacao'
+COLUNA_ABA = 'Aba'
+COLUNAS_CATEGORICAS = ('Escola', 'Ano', 'Deficiência/Transtorno')  # as mesmas que a Tabulação guarda como categoria
+EXTENSAO = 'parquet'
+MIME = 'application/vnd.apache.parquet'
+_MAGICO = b'PAR1'
+_SUFIXO_TEXTO, _SUFIXO_NUMERO = '__txt', '__num'
+_TIPOS_MISTOS = ('mixed', 'mixed-integer')  # infer_dtype: texto junto com números/horas
+
+
+class Artefato(NamedTuple):
+    tipo: str             # página que gerou: 'combinado', 'tabulacao', 'classificacao', 'semifinal', 'final'
+    tabela: pd.DataFrame  # tabela longa (com a coluna Aba quando veio de várias abas)
+    metadados: dict
+
+
+def eh_artefato(conteudo: bytes) -> bool:
+    """Parquet começa e termina com b'PAR1' (um .xlsx é um zip: b'PK')."""
+    return len(conteudo) >= 8 and conteudo[:4] == _MAGICO and conteudo[-4:] == _MAGICO
+
+
+def _exigir_pyarrow():
+    if not PYARROW_DISPONIVEL:
+        raise ImportError("O artefato Parquet precisa do pacote pyarrow (pip install pyarrow).")
+
+
+def separar_texto_numero(serie: pd.Series):
+    """(texto, número) de uma coluna mista: número (float64) para int/float, texto para o resto."""
+    numerico = serie.map(lambda v: isinstance(v, (int, float, np.number)) and not isinstance(v, bool)).to_numpy(bool)
+    texto = serie.astype(str).where(~numerico & serie.notna().to_numpy(), None)
+    numero = pd.to_numeric(serie.where(numerico), errors='coerce').astype('float64')
+    return texto, numero
+
+
+def juntar_texto_numero(texto: pd.Series, numero: pd.Series) -> pd.Series:
+    """Inverso de separar_texto_numero (números inteiros voltam como int)."""
+    valores = texto.astype(object)
+    inteiro = (numero % 1 == 0).to_numpy()  # NaN -> False
+    valores[inteiro] = numero[inteiro].astype('int64').astype(object)
+    fracionario = numero.notna().to_numpy() & ~inteiro
+    valores[fracionario] = numero[fracionario].astype(object)
+    return valores.where(valores.notna(), np.nan)
+
+
+def _mista(serie: pd.Series) -> bool:
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return pd.api.types.infer_dtype(serie.cat.categories, skipna=True) in _TIPOS_MISTOS
+    return serie.dtype == object and pd.api.types.infer_dtype(serie, skipna=True) in _TIPOS_MISTOS
+
+
+def _tabela_longa(abas: dict) -> pd.DataFrame:
+    """Empilha {aba: DataFrame} com a coluna Aba (categórica, na ordem das abas)."""
+    if not abas:
+        return pd.DataFrame({COLUNA_ABA: pd.Categorical([])})
+    tabela = pd.concat(list(abas.values()), ignore_index=True)
+    tabela[COLUNA_ABA] = pd.Categorical.from_codes(np.repeat(np.arange(len(abas)), [len(df) for df in abas.values()]),
+                                                   categories=list(abas))
+    return tabela
+
+
+def exportar(dados, tipo: str, derivadas=(), aba_geral=None, **extras) -> bytes:
+    """
+    Bytes do artefato. dados: DataFrame (pode ter a coluna Aba) ou {aba: DataFrame}.
+    derivadas: colunas calculadas que não aparecem nas abas do .xlsx. aba_geral: nome da
+    aba-resumo com a tabela inteira, se o .xlsx tiver uma. extras: metadados livres (JSON).
+    """
+    _exigir_pyarrow()
+    tabela = _tabela_longa(dados) if isinstance(dados, dict) else dados
+    colunas, mistas = {}, []
+    for nome, serie in tabela.items():
+        nome = str(nome)
+        if _mista(serie):
+            colunas[nome + _SUFIXO_TEXTO], colunas[nome + _SUFIXO_NUMERO] = separar_texto_numero(serie.astype(object))
+            mistas.append(nome)
+        elif nome in COLUNAS_CATEGORICAS and serie.dtype == object:
+            colunas[nome] = serie.astype('category')
+        else:
+            colunas[nome] = serie
+    gravada = pd.DataFrame(colunas).reset_index(drop=True)
+
+    metadados = {'formato': FORMATO, 'versao': VERSAO, 'tipo': tipo, 'colunas': [str(c) for c in tabela.columns],
+                 'mistas': mistas, 'derivadas': [c for c in derivadas if c in tabela.columns],
+                 'aba_geral': aba_geral, **extras}
+    arrow = pa.Table.from_pandas(gravada, preserve_index=False)
+    arrow = arrow.replace_schema_metadata({**(arrow.schema.metadata or {}),
+                                           CHAVE_METADADOS: json.dumps(metadados, default=str).encode()})
+    saida = pa.BufferOutputStream()
+    pq.write_table(arrow, saida, compression='zstd')
+    return saida.getvalue().to_pybytes()
+
+
+def ler(conteudo: bytes) -> Artefato:
+    """Artefato a partir dos bytes (ValueError se for um Parquet que não saiu de uma página)."""
+    _exigir_pyarrow()
+    arrow = pq.read_table(pa.BufferReader(conteudo))
+    bruto = (arrow.schema.metadata or {}).get(CHAVE_METADADOS)
+    if bruto is None:
+        raise ValueError("Arquivo Parquet sem os metadados do artefato: gere-o pelo botão de download de uma página.")
+    metadados = json.loads(bruto)
+    if metadados.get('formato') != FORMATO or metadados.get('versao', 0) > VERSAO:
+        raise ValueError(f"Artefato em formato não suportado: {metadados.get('formato')} "
+                         f"versão {metadados.get('versao')} (esperado {FORMATO} até a versão {VERSAO}).")
+
+    tabela = arrow.to_pandas()  # categorias e tipos voltam pelos metadados do pandas
+    for nome in metadados['mistas']:
+        tabela[nome] = juntar_texto_numero(tabela.pop(nome + _SUFIXO_TEXTO), tabela.pop(nome + _SUFIXO_NUMERO))
+    return Artefato(metadados['tipo'], tabela[metadados['colunas']], metadados)
+
+
+def abas(artefato: Artefato, incluir_derivadas=False, incluir_geral=False) -> dict:
+    """
+    {aba: DataFrame} como no .xlsx equivalente, na ordem do arquivo, cada uma com índice 0..n-1
+    e sem a coluna Aba. A aba-resumo só entra com incluir_geral (as páginas não a leem como escola).
+    """
+    tabela = artefato.tabela
+    descartar = {COLUNA_ABA} if COLUNA_ABA in tabela.columns else set()
+    if not incluir_derivadas:
+        descartar.update(artefato.metadados.get('derivadas', ()))
+    colunas = [i for i, c in enumerate(tabela.columns) if c not in descartar]
+
+    resultado = {}
+    if incluir_geral and artefato.metadados.get('aba_geral'):
+        resultado[artefato.metadados['aba_geral']] = tabela.iloc[:, colunas]
+    if COLUNA_ABA not in tabela.columns:
+        if not resultado:
+            resultado[artefato.tipo] = tabela.iloc[:, colunas]
+        return resultado
+
+    aba = tabela[COLUNA_ABA]
+    nomes = list(aba.cat.categories)
+    codigos = aba.cat.codes.to_numpy()
+    ordem = np.argsort(codigos, kind='stable')  # cada aba mantém a ordem das linhas na tabela
+    limites = np.searchsorted(codigos[ordem], np.arange(len(nomes) + 1))
+    for i, nome in enumerate(nomes):
+        linhas = ordem[limites[i]:limites[i + 1]]
+        if len(linhas):  # linhas antes das colunas (iloc[linhas, colunas] copia as colunas inteiras)
+            resultado[nome] = tabela.iloc[linhas].iloc[:, colunas].reset_index(drop=True)
+    return resultado
@@ -0,0 +1,892 @@
+# Benchmarks do pipeline de tabulação
+# Uso: python benchmark.py particao [--escolas 100 250 500 1000] [--linhas-por-escola 200]
+#      python benchmark.py estilos [--abas 300] [--linhas-por-aba 50]
+#      python benchmark.py leitura [--abas 50] [--linhas 200000] [--colunas-extras 20]
+#      python benchmark.py combinar [--abas 50 100 200 400] [--linhas-por-aba 500]
+#      python benchmark.py incremental [--linhas 100000] [--escolas 300] [--novas 50]
+#      python benchmark.py ranking [--abas 300] [--linhas-por-aba 2000] [--top 5]
+#      python benchmark.py semifinal [--escolas 300] [--linhas-por-escola 200]
+#      python benchmark.py cabecalhos [--questoes 50 200 1000]
+#      python benchmark.py divisao [--linhas 1000000] [--escolas 500]
+#      python benchmark.py artefato [--linhas 100000] [--escolas 300]
+#      python benchmark.py blocos [--linhas 300000] [--escolas 500] [--tamanho-bloco 50000]
+#      python benchmark.py duplicatas [--linhas 50000 100000 500000] [--linhas-por-escola 1000]
+#      python benchmark.py suite [--linhas 1000 10000 100000] [--escolas 10 100] [--etapas ...]
+#          [--saida resultados.csv] [--comparar anterior.csv]
+
+import argparse
+import csv
+import ctypes
+import gc
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from difflib import SequenceMatcher
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+import artefatos
+from classificacaoMelhoresColocados import filtrar_melhores_alunos
+from estilos_excel import obter_formato
+from leitura import MOTOR_PADRAO, TAMANHO_BLOCO_LEITURA, ler_em_blocos, ler_planilha
+from merge_sheets import colunas_desejadas, combinar_abas
+from ranking import top_n_por_aba
+from semifinal import montar_tabela_longa, ordenar_tabela_longa, ranking_geral
+from duplicatas import pares_parecidos
+from duracao import adicionar_tempo_seg
+from perfil import pico_rss_mb
+from tabulacaoOlimpiadasEParalimpada import (_COL_CANON, ESTILO_CABECALHO, ESTILO_TITULO_ESCOLA, TAMANHO_BLOCO_ESCRITA,
+                                             _blocos, _codigos_aluno, _colunas_exportacao, _norm,
+                                             _reindexar_particao, atualizar_classificatoria, coluna_canonica,
+                                             datas_resposta, filtrar_particao, gerar_classificatoria,
+                                             mascara_sem_deficiencia, normalizar_em_blocos, ordenar_classificatoria,
+                                             particionar_por_escola, remover_duplicatas, salvar_artefatos,
+                                             salvar_excels)
+from cabecalhos import ResolvedorCabecalhos
+
+
+def _cronometrar(func, repeticoes=3):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        func()
+        melhor = min(melhor, time.perf_counter() - t0)
+    return melhor
+
+
+def _classificatoria_sintetica(n_escolas, linhas_por_escola, seed=0):
+    """DataFrame no formato de saída de gerar_classificatoria (sem normalização)."""
+    rng = np.random.default_rng(seed)
+    n = n_escolas * linhas_por_escola
+    escolas = [f"ESCOLA {i:04d}" for i in range(n_escolas)]
+    return pd.DataFrame({
+        'Ano': rng.choice(['1° ANO', '2° ANO', '3° ANO', 'EJAI 1ª ETAPA'], n),
+        'Nome': [f"ALUNO {i}" for i in range(n)],
+        'Escola': pd.Categorical(rng.choice(escolas, n), categories=escolas),
+        'Pontuação': rng.integers(0, 50, n),
+        'Tempo': '00:15:00',
+        'Deficiência/Transtorno': 'N',
+        'ETAPA': '1° CLASSIFICATÓRIA',
+        'Tempo_seg': rng.integers(60, 3600, n).astype(float),
+    })
+
+
+# Variações de cabeçalho que aparecem nas exportações (todas reconhecidas pelo _COL_CANON):
+# com/sem acento, com/sem "?"/":", e os textos de versões diferentes do formulário
+_CABECALHOS_FORMULARIO = {
+    'Data/Hora': ['Carimbo de data/hora'],
+    'Email': ['Endereço de e-mail', 'Endereco de e-mail'],
+    'Nome': ['Nome do aluno?', 'Nome do aluno'],
+    'EscolaSel': ['Qual é o nome da sua escola?', 'Selecione o nome da sua escola?', 'Qual e o nome da sua escola'],
+    'EscolaLivre': ['Escreva o nome da escola caso ela no esteja listada'],
+    'Ano': ['Ano escolar do aluno:', 'Ano escolar do aluno'],
+    'Pontuacao': ['Total de pontuação?', 'Quantos pontos o aluno fez?', 'Total de pontuacao'],
+    'Tempo': ['Quanto tempo de realização?', 'Quanto tempo de realizacao?'],
+    'DefTran': ['Se for aluno com deficiência/transtorno:',
+                'Se for aluno com deficiência/transtorno, escolha a categoria da Olimpíada que o(a) aluno(a) se encaixa',
+                'Se for aluno com deficiencia/transtorno'],
+    'Mensagem': ['Quer deixar uma mensagem? Pode usar o espaço abaixo'],
+}
+_ANOS_FORMULARIO = ['1° ANO', '1º ANO', '2° ANO', '2ª ANO', '3° ANO', '4º ANO', '5° ANO', '6° ANO', '7° ANO',
+                    '8° ANO', '9° ANO', 'EJAI 1ª ETAPA', 'EJAI 2ª ETAPA', 'EJAI 3ª ETAPA', 'EJAI 4ª ETAPA']
+# (resposta, peso): a maioria sem deficiência, com as grafias variadas do "não"
+_DEFICIENCIAS_FORMULARIO = [
+    ('Não possui deficiência/transtorno', 60), ('Nao possui deficiencia/transtorno', 10), ('Não', 8), ('N', 7),
+    ('TEA', 5), ('TDAH', 3), ('Deficiência intelectual', 3), ('Deficiência física', 1), ('Deficiência visual', 1),
+    ('Deficiência auditiva', 1), ('Síndrome de Down', 1),
+]
+_NOMES_FORMULARIO = ['João', 'Maria', 'José', 'Ana', 'Antônio', 'Luíza', 'Conceição', 'Raimundo', 'Letícia', 'Ígor']
+_SOBRENOMES_FORMULARIO = ['da Silva', 'Gonçalves', 'Araújo', 'Sousa', 'Conceição', 'Brandão', 'Lima', 'Patrício']
+
+
+def _formulario_sintetico(n_linhas, n_escolas, seed=0, questoes=10):
+    """
+    Exportação sintética do Google Forms, reprodutível pela seed: cabeçalhos sorteados entre as
+    variações reconhecidas, escola com grafias diferentes ("EMEF", "E.M.E.F.", minúsculas),
+    "Escola não está na lista"/"Outros" com o nome digitado, anos do 1° ao 9° e EJAI, pontuação em
+    número ou texto ("38 pts"), Tempo em 'hh:mm:ss', 'mm:ss', segundos (texto ou número) e alguns
+    inválidos, deficiências variadas e questões de múltipla escolha (colunas que a leitura descarta).
+    """
+    rng = np.random.default_rng(seed)
+    n = n_linhas
+
+    numero = rng.integers(0, n_escolas, n)
+    grafia = rng.choice(np.array(['EMEF Escola {}', 'E.M.E.F. Escola {}', 'emef escola {} ', 'Escola {}'],
+                                 dtype=object), n, p=[0.7, 0.1, 0.1, 0.1])
+    escola_sel = pd.Series([g.format(i) for g, i in zip(grafia, numero)], dtype=object)
+    fora = rng.choice(np.array([None, 'Escola não está na lista', 'Outros'], dtype=object), n, p=[0.95, 0.04, 0.01])
+    tem_fora = pd.notna(fora)
+    escola_sel[tem_fora] = fora[tem_fora]
+    escola_livre = pd.Series(None, index=escola_sel.index, dtype=object)
+    escola_livre[tem_fora] = [f"E.M.E.F. Nova Esperança {i}" for i in numero[tem_fora] % 7]
+
+    segundos = rng.integers(60, 3600, n)
+    hh, mm, ss = segundos // 3600, segundos // 60 % 60, segundos % 60
+    formato = rng.choice(4, n, p=[0.6, 0.25, 0.1, 0.05])
+    tempo = np.where(formato == 0, [f"{h:02d}:{m:02d}:{s:02d}" for h, m, s in zip(hh, mm, ss)],
+                     np.where(formato == 1, [f"{h * 60 + m}:{s:02d}" for h, m, s in zip(hh, mm, ss)],
+                              segundos.astype(str))).astype(object)
+    numerico = formato == 3
+    tempo[numerico] = segundos[numerico]  # número de segundos (célula numérica)
+    tempo[rng.random(n) < 0.002] = 'não lembro'
+
+    pontos = rng.integers(0, 51, n)
+    pontuacao = pontos.astype(object)
+    texto = rng.random(n) < 0.1
+    pontuacao[texto] = [f"{p} pts" for p in pontos[texto]]
+
+    defs, pesos = zip(*_DEFICIENCIAS_FORMULARIO)
+    pesos = np.array(pesos, dtype=float)
+    nomes = [f"{_NOMES_FORMULARIO[i % 10]} {_SOBRENOMES_FORMULARIO[i % 8]} {i}" for i in range(n)]
+
+    colunas = {
+        'Data/Hora': pd.Timestamp('2024-05-01 08:00') + pd.to_timedelta(np.arange(n) * 7, unit='s'),
+        'Email': [f"prof{i}@escola.br" for i in rng.integers(0, max(n_escolas * 3, 1), n)],
+        'Nome': nomes,
+        'EscolaSel': escola_sel.to_numpy(),
+        'EscolaLivre': escola_livre.to_numpy(),
+        'Ano': rng.choice(np.array(_ANOS_FORMULARIO, dtype=object), n),
+        'Pontuacao': pontuacao,
+        'Tempo': tempo,
+        'DefTran': rng.choice(np.array(defs, dtype=object), n, p=pesos / pesos.sum()),
+        'Mensagem': np.where(rng.random(n) < 0.05, 'Obrigado!', None),
+    }
+    cabecalhos = {canon: variantes[rng.integers(len(variantes))] for canon, variantes in _CABECALHOS_FORMULARIO.items()}
+    df = pd.DataFrame({cabecalhos[canon]: valores for canon, valores in colunas.items()})
+    alternativas = np.array(list('ABCD'), dtype=object)
+    respostas = pd.DataFrame({f"Questão {q}": rng.choice(alternativas, n) for q in range(1, questoes + 1)})
+    return pd.concat([df, respostas], axis=1)
+
+
+# ------------------ Particionamento por escola ------------------
+def bench_particao(escolas_lista, linhas_por_escola):
+    """Filtro booleano por escola (O(escolas × linhas)) x partição única (O(linhas))."""
+    print(f"{'escolas':>8} {'linhas':>9} {'filtro (s)':>11} {'partição (s)':>13} {'ganho':>7}")
+    for n_escolas in escolas_lista:
+        df = _classificatoria_sintetica(n_escolas, linhas_por_escola)
+
+        df_obj = df.astype({'Escola': object})  # como era antes da codificação
+
+        def filtro_por_escola():
+            for escola in sorted(df_obj['Escola'].dropna().unique()):
+                df_obj[df_obj['Escola'] == escola]
+
+        def particao_unica():
+            p = particionar_por_escola(df)
+            df_ord = df.iloc[p.ordem]
+            for i in range(len(p.escolas)):
+                df_ord.iloc[p.limites[i]:p.limites[i + 1]]
+
+        t_filtro = _cronometrar(filtro_por_escola, repeticoes=1)
+        t_particao = _cronometrar(particao_unica)
+        print(f"{n_escolas:>8} {len(df):>9} {t_filtro:>11.3f} {t_particao:>13.3f} {t_filtro / t_particao:>6.1f}x")
+
+
+# ------------------ Registro de formatos ------------------
+def bench_estilos(n_abas, linhas_por_aba):
+    """add_format a cada aba x registro por workbook (obter_formato): tempo e tamanho do arquivo."""
+    df = _classificatoria_sintetica(1, linhas_por_aba).drop(columns=['Tempo_seg'])
+
+    def escrever(criar_formato):
+        out = BytesIO()
+        with pd.ExcelWriter(out, engine='xlsxwriter') as writer:
+            for i in range(n_abas):
+                sheet = f"ESCOLA {i}"
+                df.to_excel(writer, sheet_name=sheet, index=False, startrow=1)
+                ws = writer.sheets[sheet]
+                cabecalho = criar_formato(writer.book, ESTILO_CABECALHO)
+                for col_idx, col_name in enumerate(df.columns):
+                    ws.write(1, col_idx, col_name, cabecalho)
+                ws.merge_range(0, 0, 0, df.shape[1] - 1, sheet, criar_formato(writer.book, ESTILO_TITULO_ESCOLA))
+            n_formatos = len(writer.book.formats)
+        dados = out.getvalue()
+        with zipfile.ZipFile(BytesIO(dados)) as z:
+            styles = z.getinfo('xl/styles.xml').file_size
+        return n_formatos, len(dados), styles
+
+    print(f"{'modo':>14} {'tempo (s)':>10} {'Formats':>8} {'arquivo (KB)':>13} {'styles.xml (KB)':>16}")
+    for nome, criar in [('add_format', lambda book, props: book.add_format(props)),
+                        ('obter_formato', obter_formato)]:
+        t0 = time.perf_counter()
+        n_formatos, tamanho, styles = escrever(criar)
+        dt = time.perf_counter() - t0
+        print(f"{nome:>14} {dt:>10.3f} {n_formatos:>8} {tamanho / 1024:>13.1f} {styles / 1024:>16.1f}")
+
+
+# ------------------ Leitura (motor + projeção de colunas) ------------------
+def _planilha_combinada_sintetica(n_abas, n_linhas, colunas_extras, seed=0):
+    """Arquivo no formato do 'Combinar Abas': 2 linhas de cabeçalho + 7 colunas (+ extras) por aba."""
+    caminho = os.path.join(tempfile.gettempdir(), f"bench_leitura_{n_abas}_{n_linhas}_{colunas_extras}.xlsx")
+    if os.path.exists(caminho):
+        return caminho
+    por_aba = n_linhas // n_abas
+    df = _classificatoria_sintetica(1, por_aba, seed).drop(columns=['Tempo_seg'])
+    for i in range(colunas_extras):
+        df[f"Questão {i + 1}"] = 'A'
+    topo = pd.DataFrame([['TÍTULO'] * df.shape[1], list(df.columns)], columns=df.columns)
+    dados = pd.concat([topo, df.astype(object)], ignore_index=True)
+    with pd.ExcelWriter(caminho, engine='xlsxwriter') as writer:
+        for i in range(n_abas):
+            dados.to_excel(writer, sheet_name=f"ESCOLA {i}", index=False, header=False)
+    return caminho
+
+def bench_leitura(n_abas, n_linhas, colunas_extras):
+    """Todas as abas (sheet_name=None): openpyxl x calamine, com e sem projeção das 7 colunas."""
+    caminho = _planilha_combinada_sintetica(n_abas, n_linhas, colunas_extras)
+    with open(caminho, 'rb') as f:
+        conteudo = f.read()
+    print(f"arquivo: {n_abas} abas, {n_linhas} linhas, {7 + colunas_extras} colunas, {len(conteudo) / 2**20:.1f} MB")
+
+    motores = ['openpyxl'] + (['calamine'] if MOTOR_PADRAO == 'calamine' else [])
+    print(f"{'motor':>10} {'colunas':>9} {'tempo (s)':>10}")
+    for motor in motores:
+        for nome, usecols in [('todas', None), ('7', list(range(7)))]:
+            t0 = time.perf_counter()
+            ler_planilha(conteudo, sheet_name=None, header=None, usecols=usecols, motor=motor)
+            print(f"{motor:>10} {nome:>9} {time.perf_counter() - t0:>10.2f}")
+    if MOTOR_PADRAO != 'calamine':
+        print("(python-calamine não instalado: só openpyxl)")
+
+
+# ------------------ Combinar abas ------------------
+def _combinar_abas_laco(all_sheets):
+    """Versão anterior: pd.concat dentro do laço + applymap célula a célula (O(n²) em linhas)."""
+    all_data = pd.DataFrame(columns=colunas_desejadas)
+    for sheet_name, data in all_sheets.items():
+        data = data.iloc[2:].reset_index(drop=True)
+        data.columns = colunas_desejadas
+        data = data.map(lambda x: x.upper() if isinstance(x, str) else x)
+        all_data = pd.concat([all_data, data], ignore_index=True)
+    return all_data
+
+def bench_combinar(abas_lista, linhas_por_aba):
+    """concat acumulado no laço x um único concat + maiúsculas vetorizadas."""
+    print(f"{'abas':>6} {'linhas':>9} {'laço (s)':>9} {'único (s)':>10} {'ganho':>7}")
+    for n_abas in abas_lista:
+        base = _classificatoria_sintetica(1, linhas_por_aba + 2).drop(columns=['Tempo_seg'])
+        base = base.astype(object).set_axis(range(base.shape[1]), axis=1)
+        all_sheets = {f"ESCOLA {i}": base for i in range(n_abas)}
+
+        t_laco = _cronometrar(lambda: _combinar_abas_laco(all_sheets), repeticoes=1)
+        t_unico = _cronometrar(lambda: combinar_abas(all_sheets))
+        print(f"{n_abas:>6} {n_abas * linhas_por_aba:>9} {t_laco:>9.3f} {t_unico:>10.3f} {t_laco / t_unico:>6.1f}x")
+
+
+# ------------------ Modo incremental ------------------
+def bench_incremental(n_linhas, n_escolas, n_novas):
+    """Reprocessar tudo x atualizar o Parquet e gerar só as escolas alteradas, com n_novas respostas novas."""
+    formulario = _formulario_sintetico(n_linhas + n_novas, n_escolas)
+    anterior, atual = formulario.iloc[:n_linhas], formulario
+    etapa = '1° CLASSIFICATÓRIA'
+    pasta = tempfile.mkdtemp(prefix='bench_incremental_')
+    try:
+        atualizar_classificatoria(anterior, etapa, pasta)  # estado salvo do upload anterior
+
+        t0 = time.perf_counter()
+        completo = gerar_classificatoria(atual, etapa)
+        t_classif = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        salvar_excels(completo)
+        t_escrita = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        resultado = atualizar_classificatoria(atual, etapa, pasta)
+        t_classif_inc = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        salvar_excels(resultado.classificatoria, escolas=resultado.escolas_alteradas)
+        t_escrita_inc = time.perf_counter() - t0
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    print(f"{n_linhas} respostas + {n_novas} novas, {n_escolas} escolas "
+          f"({len(resultado.escolas_alteradas)} alteradas)")
+    print(f"{'':>12} {'classif. (s)':>13} {'escrita (s)':>12} {'total (s)':>10}")
+    print(f"{'completo':>12} {t_classif:>13.3f} {t_escrita:>12.3f} {t_classif + t_escrita:>10.3f}")
+    print(f"{'incremental':>12} {t_classif_inc:>13.3f} {t_escrita_inc:>12.3f} {t_classif_inc + t_escrita_inc:>10.3f}")
+
+
+# ------------------ Ranking (top-N por ano) ------------------
+def bench_ranking(n_abas, linhas_por_aba, top_n):
+    """sort completo + groupby.head em cada aba x seleção parcial de todas as abas numa passada."""
+    base = _classificatoria_sintetica(1, linhas_por_aba).drop(columns=['Tempo_seg'])
+    abas = {f"ESCOLA {i}": base.sample(frac=1, random_state=i, ignore_index=True) for i in range(n_abas)}
+
+    def sort_por_aba():
+        for df in abas.values():
+            df.sort_values(by=['Ano', 'Pontuação', 'Tempo'], ascending=[True, False, True]).groupby('Ano').head(top_n)
+
+    def selecao_unica():
+        top_n_por_aba(abas, ['Ano'], ['Pontuação', 'Tempo'], top_n, ascending=[False, True])
+
+    t_sort = _cronometrar(sort_por_aba)
+    t_sel = _cronometrar(selecao_unica)
+    print(f"{n_abas} abas x {linhas_por_aba} linhas, top {top_n}: "
+          f"sort por aba {t_sort:.3f}s, seleção única {t_sel:.3f}s ({t_sort / t_sel:.1f}x)")
+
+
+# ------------------ Semifinal ------------------
+def bench_semifinal(n_escolas, linhas_por_escola):
+    """concat + sort por escola (laço) x tabela longa com uma única ordenação (+ ranking geral)."""
+    def etapa(seed):
+        df = _classificatoria_sintetica(1, n_escolas * linhas_por_escola, seed).drop(columns=['Tempo_seg'])
+        df['Tempo'] = df['Pontuação'].map(lambda p: f"00:{p % 60:02d}:00")
+        return {f"ESCOLA {i}": df.iloc[i::n_escolas].reset_index(drop=True) for i in range(n_escolas)}
+    sheets_1, sheets_2 = etapa(1), etapa(2)
+
+    def laco_por_escola():
+        for nome in sheets_1:
+            partes = [sheets_1[nome].assign(Etapa='1ª'), sheets_2[nome].assign(Etapa='2ª')]
+            df_total = adicionar_tempo_seg(pd.concat(partes, ignore_index=True))
+            df_total.sort_values(by=['Ano', 'Pontuação', 'Tempo_seg', 'Etapa'], ascending=[True, False, True, True])
+
+    def tabela_longa():
+        longa = montar_tabela_longa(sheets_1, sheets_2)[0]
+        ordenada = ordenar_tabela_longa(longa)
+        cortes = np.searchsorted(ordenada['Aba'].cat.codes.to_numpy(), np.arange(n_escolas + 1))
+        for i in range(n_escolas):
+            ordenada.iloc[cortes[i]:cortes[i + 1]]
+
+    t_laco = _cronometrar(laco_por_escola)
+    t_longa = _cronometrar(tabela_longa)
+    longa = montar_tabela_longa(sheets_1, sheets_2)[0]
+    t_ranking = _cronometrar(lambda: ranking_geral(longa))
+    print(f"{n_escolas} escolas x {linhas_por_escola} linhas x 2 etapas: laço por escola {t_laco:.3f}s, "
+          f"tabela longa {t_longa:.3f}s ({t_laco / t_longa:.1f}x); ranking geral +{t_ranking:.3f}s")
+
+
+# ------------------ Cabeçalhos ------------------
+def _canonizar_laco(c):
+    key = _norm(c)
+    if key in _COL_CANON:
+        return _COL_CANON[key]
+    for k, v in _COL_CANON.items():
+        if k in key:
+            return v
+    return None
+
+
+def bench_cabecalhos(questoes_lista):
+    """
+    mapear_colunas: varredura linear das chaves por coluna x resolvedor.
+    frio: cabeçalhos nunca vistos; por coluna: tupla nova com cabeçalhos já vistos; memo: mesma tupla (rerun).
+    """
+    print(f"{'colunas':>8} {'laço (ms)':>10} {'frio (ms)':>10} {'por coluna (ms)':>16} {'memo (ms)':>10}")
+    for questoes in questoes_lista:
+        cabecalhos = tuple(_formulario_sintetico(10, 5, questoes=questoes).columns)
+        t_laco = _cronometrar(lambda: {c: _canonizar_laco(c) or c for c in cabecalhos})
+        resolvedor = ResolvedorCabecalhos(_COL_CANON, _norm)
+
+        def frio():
+            resolvedor.coluna.cache_clear()
+            resolvedor.colunas.cache_clear()
+            resolvedor.colunas(cabecalhos)
+
+        def por_coluna():
+            resolvedor.colunas.cache_clear()
+            resolvedor.colunas(cabecalhos)
+        t_frio = _cronometrar(frio)
+        t_coluna = _cronometrar(por_coluna)
+        t_memo = _cronometrar(lambda: resolvedor.colunas(cabecalhos))
+        print(f"{len(cabecalhos):>8} {t_laco * 1e3:>10.3f} {t_frio * 1e3:>10.3f} {t_coluna * 1e3:>16.3f} "
+              f"{t_memo * 1e3:>10.4f}")
+
+
+# ------------------ Divisão Olimpíada/Paralimpíada (memória) ------------------
+VARIANTES_DIVISAO = ('copias', 'mascaras', 'escrita')
+
+
+def _divisao_copias(base):
+    """Como era antes: um DataFrame por arquivo e, em cada um, a cópia sem Tempo_seg e a agrupada por escola."""
+    sem_def = mascara_sem_deficiencia(base['Deficiência/Transtorno'])
+    particao = particionar_por_escola(base)
+    colunas = _colunas_exportacao(base)
+    arquivos = [(base[sem_def], _reindexar_particao(filtrar_particao(particao, sem_def), sem_def)),
+                (base[~sem_def], _reindexar_particao(filtrar_particao(particao, ~sem_def), ~sem_def)),
+                (base, particao)]
+    for df, p in arquivos:
+        geral = df.drop(columns=['Tempo_seg'])
+        abas = df.iloc[p.ordem, colunas]
+        del geral, abas
+
+
+def _divisao_mascaras(base):
+    """A divisão de salvar_excels (máscaras + partições) e a leitura em blocos de cada aba, sem o xlsxwriter."""
+    sem_def = mascara_sem_deficiencia(base['Deficiência/Transtorno'])
+    particao = particionar_por_escola(base)
+    colunas = _colunas_exportacao(base)
+    for mascara in (sem_def, ~sem_def, np.ones(len(base), dtype=bool)):
+        p = filtrar_particao(particao, mascara)
+        for _ in _blocos(base, np.flatnonzero(mascara), colunas, TAMANHO_BLOCO_ESCRITA):
+            pass
+        for i in range(len(p.escolas)):
+            for _ in _blocos(base, p.ordem[p.limites[i]:p.limites[i + 1]], colunas, TAMANHO_BLOCO_ESCRITA):
+                pass
+
+
+def _zerar_pico_rss():
+    """
+    Linux: devolve ao sistema a memória livre do heap (senão as cópias reaproveitam a sobra da carga
+    da base sem aparecer no RSS) e faz o pico de RSS voltar ao RSS atual.
+    """
+    gc.collect()
+    try:
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _medir_divisao(caminho, variante):
+    """(segundos, RSS com a base carregada, pico de RSS ao fim), num processo que só carregou a base."""
+    base = pd.read_pickle(caminho)
+    _zerar_pico_rss()
+    rss_base = pico_rss_mb()
+    t0 = time.perf_counter()
+    if variante == 'copias':
+        _divisao_copias(base)
+    elif variante == 'mascaras':
+        _divisao_mascaras(base)
+    else:
+        salvar_excels(base, modo='serial', streaming=True)
+    return time.perf_counter() - t0, rss_base, pico_rss_mb()
+
+
+def bench_divisao(n_linhas, n_escolas, variantes=VARIANTES_DIVISAO):
+    """
+    Memória da divisão Olimpíada/Paralimpíada/JUNÇÃO: cópias por arquivo (antes) x máscaras sobre
+    uma base só, e a escrita completa (streaming). Cada variante roda num processo novo que só
+    carrega a base; 'extra' é o pico de RSS acima disso, em múltiplos do tamanho da base.
+    Fora do Linux o pico não pode ser zerado e inclui o dos imports (extra fica subestimado).
+    """
+    base = gerar_classificatoria(_formulario_sintetico(n_linhas, n_escolas), ETAPA_SUITE)
+    tamanho_mb = base.memory_usage(deep=True).sum() / 2 ** 20
+    print(f"base: {len(base)} linhas, {tamanho_mb:.1f} MB")
+    print(f"{'variante':<10} {'tempo (s)':>10} {'RSS base (MB)':>14} {'RSS pico (MB)':>14} {'extra (x base)':>15}")
+    contexto = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'base.pkl')
+        base.to_pickle(caminho)
+        del base
+        for variante in variantes:
+            with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+                segundos, rss_base, rss_pico = executor.submit(_medir_divisao, caminho, variante).result()
+            if rss_base is None:  # Windows: sem pico de RSS
+                print(f"{variante:<10} {segundos:>10.2f} {'-':>14} {'-':>14} {'-':>15}")
+                continue
+            print(f"{variante:<10} {segundos:>10.2f} {rss_base:>14.1f} {rss_pico:>14.1f} "
+                  f"{(rss_pico - rss_base) / tamanho_mb:>15.2f}", flush=True)
+
+
+# ------------------ Artefato Parquet x .xlsx entre páginas ------------------
+def bench_artefato(n_linhas, n_escolas):
+    """Arquivo JUNÇÃO da Tabulação lido pela página seguinte: .xlsx (abas + Tempo_seg) x artefato Parquet."""
+    classificatoria = gerar_classificatoria(_formulario_sintetico(n_linhas, n_escolas), ETAPA_SUITE)
+    t0 = time.perf_counter()
+    xlsx = salvar_excels(classificatoria)[2].getvalue()
+    t_xlsx = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    parquet = salvar_artefatos(classificatoria)[2]
+    t_parquet = time.perf_counter() - t0
+
+    def ler_xlsx():
+        abas = ler_planilha(xlsx, sheet_name=None, header=1)
+        return {nome: adicionar_tempo_seg(df) for nome, df in abas.items() if 'Tempo' in df.columns}
+
+    def ler_parquet():
+        return artefatos.abas(artefatos.ler(parquet), incluir_derivadas=True)
+
+    t_ler_xlsx = _cronometrar(ler_xlsx, repeticoes=1)
+    t_ler_parquet = _cronometrar(ler_parquet)
+    print(f"{n_linhas} linhas, {n_escolas} escolas (motor {MOTOR_PADRAO})")
+    print(f"{'':>9} {'tamanho (MB)':>13} {'gerar (s)':>10} {'ler (s)':>9}")
+    print(f"{'xlsx':>9} {len(xlsx) / 2**20:>13.2f} {t_xlsx:>10.3f} {t_ler_xlsx:>9.3f}")
+    print(f"{'parquet':>9} {len(parquet) / 2**20:>13.2f} {t_parquet:>10.3f} {t_ler_parquet:>9.3f}")
+
+
+# ------------------ Leitura do formulário em blocos ------------------
+VARIANTES_BLOCOS = ('inteiro', 'blocos', 'csv')
+
+
+def _medir_blocos(caminho, variante, tamanho_bloco):
+    """(segundos, RSS com o arquivo lido, pico de RSS ao fim, MB da classificação), num processo novo."""
+    with open(caminho, 'rb') as f:
+        conteudo = f.read()
+    _zerar_pico_rss()
+    rss_base = pico_rss_mb()
+    t0 = time.perf_counter()
+    if variante == 'inteiro':
+        classificatoria = gerar_classificatoria(ler_planilha(conteudo, usecols=coluna_canonica), ETAPA_SUITE)
+    else:
+        formato = 'csv' if variante == 'csv' else 'xlsx'
+        respostas = normalizar_em_blocos(ler_em_blocos(conteudo, formato, usecols=coluna_canonica,
+                                                       tamanho_bloco=tamanho_bloco)).respostas
+        classificatoria = ordenar_classificatoria(respostas, ETAPA_SUITE)
+    segundos = time.perf_counter() - t0
+    return segundos, rss_base, pico_rss_mb(), classificatoria.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def bench_blocos(n_linhas, n_escolas, tamanho_bloco, variantes=VARIANTES_BLOCOS):
+    """
+    Formulário grande (com as colunas de questões) até a classificação: leitura inteira (motor
+    padrão) x ler_em_blocos + normalização por bloco, do .xlsx e do mesmo formulário em .csv.
+    Cada variante roda num processo novo; 'extra' é o pico de RSS acima do arquivo já carregado.
+    """
+    formulario = _formulario_sintetico(n_linhas, n_escolas, questoes=30)
+    contexto = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as pasta:
+        caminhos = {'xlsx': os.path.join(pasta, 'formulario.xlsx'), 'csv': os.path.join(pasta, 'formulario.csv')}
+        formulario.to_excel(caminhos['xlsx'], index=False)
+        formulario.to_csv(caminhos['csv'], index=False)
+        del formulario
+        print(f"{n_linhas} linhas, {n_escolas} escolas; xlsx {os.path.getsize(caminhos['xlsx']) / 2 ** 20:.1f} MB, "
+              f"csv {os.path.getsize(caminhos['csv']) / 2 ** 20:.1f} MB (motor {MOTOR_PADRAO}, bloco {tamanho_bloco})")
+        print(f"{'variante':<10} {'tempo (s)':>10} {'RSS base (MB)':>14} {'RSS pico (MB)':>14} {'extra (MB)':>11} "
+              f"{'resultado (MB)':>15}")
+        for variante in variantes:
+            caminho = caminhos['csv' if variante == 'csv' else 'xlsx']
+            with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+                segundos, rss_base, rss_pico, resultado_mb = executor.submit(
+                    _medir_blocos, caminho, variante, tamanho_bloco).result()
+            if rss_base is None:  # Windows: sem pico de RSS
+                print(f"{variante:<10} {segundos:>10.2f} {'-':>14} {'-':>14} {'-':>11} {resultado_mb:>15.1f}")
+                continue
+            print(f"{variante:<10} {segundos:>10.2f} {rss_base:>14.1f} {rss_pico:>14.1f} {rss_pico - rss_base:>11.1f} "
+                  f"{resultado_mb:>15.1f}", flush=True)
+
+
+# ------------------ Respostas repetidas ------------------
+_PRENOMES = ['João', 'Maria', 'José', 'Ana', 'Antônio', 'Luíza', 'Francisco', 'Raimunda', 'Pedro', 'Letícia',
+             'Lucas', 'Gabriela', 'Mateus', 'Isabela', 'Davi', 'Sofia', 'Miguel', 'Heloísa', 'Arthur', 'Valentina',
+             'Enzo', 'Alice', 'Gustavo', 'Beatriz', 'Rafael', 'Larissa', 'Thiago', 'Yasmin', 'Kauã', 'Thaís']
+_SOBRENOMES = ['da Silva', 'dos Santos', 'de Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira',
+               'Lima', 'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'de Almeida', 'Lopes', 'Soares',
+               'Fernandes', 'Vieira', 'Barbosa', 'da Conceição', 'Nascimento', 'Araújo', 'Cavalcanti', 'Brandão',
+               'Mendes', 'Freitas', 'Moreira', 'Cardoso', 'Teixeira']
+
+
+def _nomes_realistas(n, rng):
+    """Prenome, segundo prenome (40%) e dois sobrenomes, sorteados das listas acima."""
+    prenome = rng.choice(_PRENOMES, n)
+    meio = np.where(rng.random(n) < 0.4, rng.choice(_PRENOMES, n), '')
+    sobrenomes = rng.choice(_SOBRENOMES, (n, 2))
+    return [' '.join(filter(None, partes)) for partes in zip(prenome, meio, sobrenomes[:, 0], sobrenomes[:, 1])]
+
+
+def _com_erro(nome, sorteio):
+    """Erro de digitação: letra trocada, letra a menos ou (com 3+ palavras) o nome do meio a menos."""
+    palavras = nome.split()
+    if sorteio % 3 == 2 and len(palavras) > 2:
+        return ' '.join(palavras[:1] + palavras[2:])
+    palavra = max(range(len(palavras)), key=lambda k: len(palavras[k]))
+    letras = list(palavras[palavra])
+    posicao = 1 + sorteio % (len(letras) - 1)
+    if sorteio % 3 == 0:
+        letras[posicao] = 'x' if letras[posicao] != 'x' else 'y'
+    else:
+        del letras[posicao]
+    palavras[palavra] = ''.join(letras)
+    return ' '.join(palavras)
+
+
+def bench_duplicatas(linhas_lista, linhas_por_escola, fracao_repetidas=0.03, fracao_erros=0.01, seed=0):
+    """
+    remover_duplicatas na classificação de n respostas com nomes realistas, mais fracao_repetidas
+    reenviadas (mesmo nome, outra pontuação, Data/Hora depois) e fracao_erros com erro de
+    digitação no nome. O número de escolas cresce com n (turmas do mesmo tamanho em qualquer
+    escala). 'achados' = erros marcados como nomes parecidos. 'todos os pares' estima comparar
+    todos os nomes de cada bloco (escola + ano) com o mesmo SequenceMatcher.
+    """
+    print(f"{linhas_por_escola} respostas por escola, {fracao_repetidas:.0%} reenviadas, "
+          f"{fracao_erros:.0%} com erro de digitação")
+    print(f"{'linhas':>8} {'escolas':>8} {'removidas':>10} {'pares':>7} {'achados':>8} {'melhor (s)':>11} "
+          f"{'última (s)':>11} {'parecidos (s)':>14} {'todos os pares (s)':>19} {'µs/linha':>9}")
+    for n in linhas_lista:
+        rng = np.random.default_rng(seed)
+        n_escolas = max(n // linhas_por_escola, 1)
+        base = _formulario_sintetico(n, n_escolas, seed=seed, questoes=0)
+        col_nome, col_data, col_pontos = base.columns[2], base.columns[0], base.columns[6]
+        base[col_nome] = _nomes_realistas(n, rng)
+        sorteadas = rng.permutation(n)
+        reenvios = base.iloc[sorteadas[:int(n * fracao_repetidas)]].copy()
+        reenvios[col_pontos] = rng.integers(0, 51, len(reenvios))
+        reenvios[col_data] = reenvios[col_data] + pd.Timedelta(hours=1)
+        originais = sorteadas[len(reenvios):len(reenvios) + int(n * fracao_erros)]
+        erros = base.iloc[originais].copy()
+        erros[col_nome] = [_com_erro(nome, s) for nome, s in zip(erros[col_nome], rng.integers(0, 999, len(erros)))]
+        formulario = pd.concat([base, reenvios, erros], ignore_index=True)
+        esperados = set(zip(originais.tolist(), range(n + len(reenvios), len(formulario))))
+
+        classificatoria = gerar_classificatoria(formulario, ETAPA_SUITE)
+        datas = datas_resposta(formulario)
+        t0 = time.perf_counter()
+        resultado = remover_duplicatas(classificatoria, 'melhor')
+        t_melhor = time.perf_counter() - t0
+        t_ultima = _cronometrar(lambda: remover_duplicatas(classificatoria, 'ultima', datas), repeticoes=1)
+
+        # só a passada de nomes parecidos, sobre um nome por aluno
+        aluno, bloco, nome_normal = _codigos_aluno(classificatoria)
+        entradas = np.unique(aluno[aluno >= 0], return_index=True)[1]
+        t_pares = _cronometrar(lambda: pares_parecidos(bloco[entradas], nome_normal.iloc[entradas]), repeticoes=1)
+        pares = resultado.parecidos
+        marcados = set(zip(*np.sort(pares[['Linha no formulário', 'Linha (nome parecido)']].to_numpy() - 2,
+                                    axis=1).T.tolist()))
+        achados = len(esperados & marcados) / max(len(esperados), 1)
+
+        # todos os pares de cada bloco: custo médio de uma comparação x número de pares
+        tamanhos = np.bincount(pd.factorize(bloco[entradas])[0])
+        todos = int((tamanhos * (tamanhos - 1) // 2).sum())
+        nomes = nome_normal.iloc[entradas].to_numpy(dtype=object)
+        ordem = np.argsort(bloco[entradas], kind='stable')
+        amostra = [(nomes[a], nomes[b]) for a, b in zip(ordem[:-1], ordem[1:])][:20_000]
+        t0 = time.perf_counter()
+        for a, b in amostra:
+            SequenceMatcher(None, a, b).ratio()
+        t_todos = (time.perf_counter() - t0) / max(len(amostra), 1) * todos
+
+        print(f"{len(formulario):>8} {n_escolas:>8} {len(classificatoria) - len(resultado.classificatoria):>10} "
+              f"{len(pares):>7} {achados:>8.0%} {t_melhor:>11.2f} {t_ultima:>11.2f} {t_pares:>14.2f} {t_todos:>19.0f} "
+              f"{t_melhor / len(formulario) * 1e6:>9.1f}", flush=True)
+
+
+# ------------------ Suíte (comparação entre execuções) ------------------
+ETAPAS_SUITE = ('classificatoria', 'escrita', 'combinar', 'melhores', 'semifinal')
+ETAPA_SUITE = '1° CLASSIFICATÓRIA'
+CAMPOS_SUITE = ['etapa', 'linhas', 'escolas', 'segundos', 'linhas_por_s', 'rss_base_mb', 'rss_pico_mb',
+                'data', 'commit', 'python', 'pandas', 'motor', 'seed', 'repeticoes']
+
+
+def _abas_por_escola(classificatoria):
+    """{escola: DataFrame} como as abas por escola dos arquivos da Tabulação (sem Tempo_seg)."""
+    particao = particionar_por_escola(classificatoria)
+    df = classificatoria.drop(columns=['Tempo_seg']).iloc[particao.ordem]
+    return {escola: df.iloc[particao.limites[i]:particao.limites[i + 1]].reset_index(drop=True)
+            for i, escola in enumerate(particao.escolas)}
+
+
+def _abas_combinar(abas):
+    """Abas como a página Combinar Abas as lê (header=None): 2 linhas de cabeçalho + as 7 colunas."""
+    resultado = {}
+    for escola, df in abas.items():
+        corpo = df[['Ano', 'Nome', 'Escola', 'Pontuação', 'Tempo', 'Deficiência/Transtorno', 'ETAPA']].astype(object)
+        cabecalho = pd.DataFrame([[escola] + [None] * 6, colunas_desejadas], columns=corpo.columns)
+        resultado[escola] = pd.concat([cabecalho, corpo], ignore_index=True).set_axis(range(7), axis=1)
+    return resultado
+
+
+def _preparar_suite(etapa, n_linhas, n_escolas, seed):
+    """Gera as entradas da etapa (fora da medição) e devolve a função medida."""
+    formulario = _formulario_sintetico(n_linhas, n_escolas, seed)
+    if etapa == 'classificatoria':
+        return lambda: gerar_classificatoria(formulario, ETAPA_SUITE)
+    classificatoria = gerar_classificatoria(formulario, ETAPA_SUITE)
+    del formulario
+    if etapa == 'escrita':
+        return lambda: salvar_excels(classificatoria, modo='serial')
+    abas = _abas_por_escola(classificatoria)
+    if etapa == 'combinar':
+        abas_combinar = _abas_combinar(abas)
+        return lambda: combinar_abas(abas_combinar)
+    if etapa == 'melhores':
+        return lambda: [filtrar_melhores_alunos(df, 5) for df in abas.values()]
+
+    # semifinal: a 2ª classificatória é outro formulário do mesmo tamanho, nas mesmas escolas
+    abas_2 = _abas_por_escola(gerar_classificatoria(_formulario_sintetico(n_linhas, n_escolas, seed + 1),
+                                                    ETAPA_SUITE))
+
+    def semifinal():
+        longa = montar_tabela_longa(abas, abas_2)[0]
+        ordenar_tabela_longa(longa)
+        ranking_geral(longa)
+    return semifinal
+
+
+def _medir_suite(etapa, n_linhas, n_escolas, seed, repeticoes):
+    """(melhor tempo, pico de RSS antes da etapa, pico de RSS ao fim) no processo atual."""
+    func = _preparar_suite(etapa, n_linhas, n_escolas, seed)
+    rss_base = pico_rss_mb()
+    segundos = _cronometrar(func, repeticoes)
+    return segundos, rss_base, pico_rss_mb()
+
+
+def _metadados_suite(seed, repeticoes):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {'data': datetime.now().isoformat(timespec='seconds'), 'commit': commit,
+            'python': platform.python_version(), 'pandas': pd.__version__, 'motor': MOTOR_PADRAO,
+            'seed': seed, 'repeticoes': repeticoes}
+
+
+def _comparar_suite(resultados, caminho, tolerancia):
+    """Tempo atual x o de um CSV anterior da suíte, para as mesmas etapa/linhas/escolas."""
+    with open(caminho, newline='', encoding='utf-8') as f:
+        anteriores = {(r['etapa'], int(r['linhas']), int(r['escolas'])): r for r in csv.DictReader(f)}
+    print(f"\ncomparação com {caminho}")
+    print(f"{'etapa':<16} {'linhas':>9} {'escolas':>8} {'antes (s)':>10} {'agora (s)':>10} {'variação':>9}")
+    for r in resultados:
+        anterior = anteriores.get((r['etapa'], r['linhas'], r['escolas']))
+        if anterior is None:
+            continue
+        antes = float(anterior['segundos'])
+        variacao = r['segundos'] / antes - 1 if antes > 0 else 0.0
+        alerta = '  <- mais lento' if variacao > tolerancia else ''
+        print(f"{r['etapa']:<16} {r['linhas']:>9} {r['escolas']:>8} {antes:>10.3f} {r['segundos']:>10.3f} "
+              f"{variacao:>+9.1%}{alerta}")
+
+
+def bench_suite(linhas_lista, escolas_lista, etapas, repeticoes, seed, saida=None, comparar=None,
+                tolerancia=0.10, isolar=True):
+    """
+    Cada etapa do pipeline em cada escala, com formulários sintéticos reprodutíveis (seed).
+    Com isolar=True cada medição roda num processo novo: o pico de RSS é o daquela etapa
+    (inclui as entradas geradas, cujo pico aparece em rss_base_mb).
+    """
+    metadados = _metadados_suite(seed, repeticoes)
+    contexto = multiprocessing.get_context('spawn')
+    resultados = []
+    print(f"{'etapa':<16} {'linhas':>9} {'escolas':>8} {'tempo (s)':>10} {'linhas/s':>11} "
+          f"{'RSS base (MB)':>14} {'RSS pico (MB)':>14}")
+    for n_linhas in linhas_lista:
+        for n_escolas in escolas_lista:
+            for etapa in etapas:
+                argumentos = (etapa, n_linhas, n_escolas, seed, repeticoes)
+                if isolar:
+                    with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+                        segundos, rss_base, rss_pico = executor.submit(_medir_suite, *argumentos).result()
+                else:
+                    segundos, rss_base, rss_pico = _medir_suite(*argumentos)
+                registro = dict(etapa=etapa, linhas=n_linhas, escolas=n_escolas, segundos=segundos,
+                                linhas_por_s=n_linhas / segundos if segundos > 0 else float('inf'),
+                                rss_base_mb=rss_base, rss_pico_mb=rss_pico, **metadados)
+                resultados.append(registro)
+                rss = [f"{v:>14.1f}" if v is not None else f"{'-':>14}" for v in (rss_base, rss_pico)]
+                print(f"{etapa:<16} {n_linhas:>9} {n_escolas:>8} {segundos:>10.3f} "
+                      f"{registro['linhas_por_s']:>11.0f} {rss[0]} {rss[1]}", flush=True)
+
+    if saida:
+        with open(saida, 'w', newline='', encoding='utf-8') as f:
+            escritor = csv.DictWriter(f, fieldnames=CAMPOS_SUITE)
+            escritor.writeheader()
+            escritor.writerows(resultados)
+        print(f"\nresultados gravados em {saida}")
+    if comparar:
+        _comparar_suite(resultados, comparar, tolerancia)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline de tabulação")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_part = sub.add_parser('particao', help="escrever_por_escola: filtro por escola x partição única")
+    p_part.add_argument('--escolas', type=int, nargs='+', default=[100, 250, 500, 1000])
+    p_part.add_argument('--linhas-por-escola', type=int, default=200)
+
+    p_est = sub.add_parser('estilos', help="add_format por aba x registro de formatos por workbook")
+    p_est.add_argument('--abas', type=int, default=300)
+    p_est.add_argument('--linhas-por-aba', type=int, default=50)
+
+    p_leit = sub.add_parser('leitura', help="leitura de todas as abas: motor e projeção de colunas")
+    p_leit.add_argument('--abas', type=int, default=50)
+    p_leit.add_argument('--linhas', type=int, default=200_000)
+    p_leit.add_argument('--colunas-extras', type=int, default=20)
+
+    p_comb = sub.add_parser('combinar', help="Combinar Abas: concat no laço x concat único")
+    p_comb.add_argument('--abas', type=int, nargs='+', default=[50, 100, 200, 400])
+    p_comb.add_argument('--linhas-por-aba', type=int, default=500)
+
+    p_inc = sub.add_parser('incremental', help="reprocessar tudo x modo incremental (Parquet)")
+    p_inc.add_argument('--linhas', type=int, default=100_000)
+    p_inc.add_argument('--escolas', type=int, default=300)
+    p_inc.add_argument('--novas', type=int, default=50)
+
+    p_rank = sub.add_parser('ranking', help="top-N por ano: sort por aba x seleção parcial única")
+    p_rank.add_argument('--abas', type=int, default=300)
+    p_rank.add_argument('--linhas-por-aba', type=int, default=2000)
+    p_rank.add_argument('--top', type=int, default=5)
+
+    p_semi = sub.add_parser('semifinal', help="semifinal: laço por escola x tabela longa única")
+    p_semi.add_argument('--escolas', type=int, default=300)
+    p_semi.add_argument('--linhas-por-escola', type=int, default=200)
+
+    p_cab = sub.add_parser('cabecalhos', help="mapear_colunas: laço nas chaves x autômato com memo")
+    p_cab.add_argument('--questoes', type=int, nargs='+', default=[50, 200, 1000])
+
+    p_div = sub.add_parser('divisao', help="memória da divisão Olimpíada/Paralimpíada: cópias x máscaras")
+    p_div.add_argument('--linhas', type=int, default=1_000_000)
+    p_div.add_argument('--escolas', type=int, default=500)
+    p_div.add_argument('--variantes', nargs='+', choices=VARIANTES_DIVISAO, default=list(VARIANTES_DIVISAO))
+
+    p_art = sub.add_parser('artefato', help="entre páginas: reler o .xlsx x ler o artefato Parquet")
+    p_art.add_argument('--linhas', type=int, default=100_000)
+    p_art.add_argument('--escolas', type=int, default=300)
+
+    p_blo = sub.add_parser('blocos', help="formulário grande: leitura inteira x leitura e normalização em blocos")
+    p_blo.add_argument('--linhas', type=int, default=300_000)
+    p_blo.add_argument('--escolas', type=int, default=500)
+    p_blo.add_argument('--tamanho-bloco', type=int, default=TAMANHO_BLOCO_LEITURA)
+    p_blo.add_argument('--variantes', nargs='+', choices=VARIANTES_BLOCOS, default=list(VARIANTES_BLOCOS))
+
+    p_dup = sub.add_parser('duplicatas', help="respostas repetidas: índice exato + nomes parecidos por bloco")
+    p_dup.add_argument('--linhas', type=int, nargs='+', default=[50_000, 100_000, 500_000])
+    p_dup.add_argument('--linhas-por-escola', type=int, default=1000)
+
+    p_suite = sub.add_parser('suite', help="tempo, linhas/s e pico de RSS de cada etapa, por escala")
+    p_suite.add_argument('--linhas', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                         help="respostas do formulário (até 1_000_000)")
+    p_suite.add_argument('--escolas', type=int, nargs='+', default=[10, 100], help="escolas (até 1000)")
+    p_suite.add_argument('--etapas', nargs='+', choices=ETAPAS_SUITE, default=list(ETAPAS_SUITE))
+    p_suite.add_argument('--repeticoes', type=int, default=3, help="vale o melhor tempo")
+    p_suite.add_argument('--seed', type=int, default=0)
+    p_suite.add_argument('--saida', help="grava os resultados em CSV (com commit, versões e data)")
+    p_suite.add_argument('--comparar', help="CSV de uma execução anterior da suíte")
+    p_suite.add_argument('--tolerancia', type=float, default=0.10,
+                         help="variação acima da qual a etapa é marcada como mais lenta")
+    p_suite.add_argument('--mesmo-processo', action='store_true',
+                         help="mede tudo no processo atual (mais rápido; o pico de RSS deixa de ser por etapa)")
+
+    args = parser.parse_args()
+    if args.comando == 'particao':
+        bench_particao(args.escolas, args.linhas_por_escola)
+    elif args.comando == 'estilos':
+        bench_estilos(args.abas, args.linhas_por_aba)
+    elif args.comando == 'leitura':
+        bench_leitura(args.abas, args.linhas, args.colunas_extras)
+    elif args.comando == 'combinar':
+        bench_combinar(args.abas, args.linhas_por_aba)
+    elif args.comando == 'incremental':
+        bench_incremental(args.linhas, args.escolas, args.novas)
+    elif args.comando == 'ranking':
+        bench_ranking(args.abas, args.linhas_por_aba, args.top)
+    elif args.comando == 'semifinal':
+        bench_semifinal(args.escolas, args.linhas_por_escola)
+    elif args.comando == 'cabecalhos':
+        bench_cabecalhos(args.questoes)
+    elif args.comando == 'divisao':
+        bench_divisao(args.linhas, args.escolas, args.variantes)
+    elif args.comando == 'artefato':
+        bench_artefato(args.linhas, args.escolas)
+    elif args.comando == 'blocos':
+        bench_blocos(args.linhas, args.escolas, args.tamanho_bloco, args.variantes)
+    elif args.comando == 'duplicatas':
+        bench_duplicatas(args.linhas, args.linhas_por_escola)
+    elif args.comando == 'suite':
+        bench_suite(args.linhas, args.escolas, args.etapas, args.repeticoes, args.seed, args.saida, args.comparar,
+                    args.tolerancia, isolar=not args.mesmo_processo)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# Reconhecimento de cabeçalhos (nome da coluna no formulário -> nome canônico)
+# - Chave exata (depois de normalizar) tem prioridade
+# - Sem chave exata, vale a primeira chave do dicionário contida no cabeçalho (mesma regra
+#   do laço antigo), achada com um autômato Aho-Corasick: uma passada pelo texto do
+#   cabeçalho encontra todas as chaves de uma vez, em vez de testar chave por chave
+# - Cabeçalho que contém chaves de nomes canônicos diferentes é ambíguo: continua valendo a
+#   primeira, mas vira aviso; várias colunas com o mesmo nome canônico também
+# - Resultados memorizados por cabeçalho e pela tupla de cabeçalhos inteira (reruns)
+
+import functools
+from collections import deque
+from typing import NamedTuple
+
+
+class Automato(NamedTuple):
+    transicoes: list  # estado -> {caractere: próximo estado}
+    falha: list       # estado -> maior sufixo próprio que também é prefixo de alguma chave
+    saidas: list      # estado -> índices das chaves que terminam neste estado (inclui as da falha)
+
+
+def construir_automato(padroes) -> Automato:
+    transicoes, falha, saidas = [{}], [0], [[]]
+    for indice, padrao in enumerate(padroes):
+        estado = 0
+        for caractere in padrao:
+            proximo = transicoes[estado].get(caractere)
+            if proximo is None:
+                proximo = len(transicoes)
+                transicoes[estado][caractere] = proximo
+                transicoes.append({})
+                falha.append(0)
+                saidas.append([])
+            estado = proximo
+        saidas[estado].append(indice)
+
+    # falhas em largura: o estado de falha de um nó sempre é mais raso que ele
+    fila = deque(transicoes[0].values())
+    while fila:
+        estado = fila.popleft()
+        for caractere, proximo in transicoes[estado].items():
+            fila.append(proximo)
+            recuo = falha[estado]
+            while recuo and caractere not in transicoes[recuo]:
+                recuo = falha[recuo]
+            destino = transicoes[recuo].get(caractere, 0)
+            falha[proximo] = destino if destino != proximo else 0
+            saidas[proximo].extend(saidas[falha[proximo]])
+    return Automato(transicoes, falha, [tuple(s) for s in saidas])
+
+
+def buscar(automato: Automato, texto: str) -> set:
+    """Índices de todas as chaves que aparecem em texto (uma passada)."""
+    transicoes, falha, saidas = automato
+    estado = 0
+    achadas = set()
+    for caractere in texto:
+        while estado and caractere not in transicoes[estado]:
+            estado = falha[estado]
+        estado = transicoes[estado].get(caractere, 0)
+        if saidas[estado]:
+            achadas.update(saidas[estado])
+    return achadas
+
+
+class ResolucaoCabecalho(NamedTuple):
+    canonico: str | None
+    candidatos: tuple  # nomes canônicos distintos encontrados, na ordem das chaves; mais de um = ambíguo
+
+
+_NAO_RECONHECIDO = ResolucaoCabecalho(None, ())
+
+
+class ResolucaoColunas(NamedTuple):
+    renomear: dict  # cabeçalho -> nome canônico (só os reconhecidos)
+    avisos: tuple
+
+
+class ResolvedorCabecalhos:
+    """Resolve cabeçalhos contra {chave normalizada: nome canônico}; normalizar é aplicado ao cabeçalho."""
+
+    def __init__(self, chaves: dict, normalizar, tamanho_memo=4096):
+        self.chaves = dict(chaves)
+        self.normalizar = normalizar
+        self._padroes = list(self.chaves)
+        self._automato = construir_automato(self._padroes)
+        self.coluna = functools.lru_cache(maxsize=tamanho_memo)(self._resolver_coluna)
+        self.colunas = functools.lru_cache(maxsize=64)(self._resolver_colunas)
+
+    def _resolver_coluna(self, cabecalho) -> ResolucaoCabecalho:
+        chave = self.normalizar(cabecalho)
+        if chave in self.chaves:
+            return ResolucaoCabecalho(self.chaves[chave], (self.chaves[chave],))
+        achadas = buscar(self._automato, chave)
+        if not achadas:  # caso comum: coluna de questão, e-mail...
+            return _NAO_RECONHECIDO
+        candidatos = []
+        for indice in sorted(achadas):
+            canonico = self.chaves[self._padroes[indice]]
+            if canonico not in candidatos:
+                candidatos.append(canonico)
+        return ResolucaoCabecalho(candidatos[0], tuple(candidatos))
+
+    def _resolver_colunas(self, cabecalhos: tuple) -> ResolucaoColunas:
+        """Para a tupla de cabeçalhos de um DataFrame: mapeamento + avisos (ambíguos e repetidos)."""
+        renomear, avisos, por_canonico = {}, [], {}
+        for cabecalho in cabecalhos:
+            resolucao = self.coluna(cabecalho)
+            if resolucao.canonico is None:
+                continue
+            renomear[cabecalho] = resolucao.canonico
+            por_canonico.setdefault(resolucao.canonico, []).append(cabecalho)
+            if len(resolucao.candidatos) > 1:
+                avisos.append(f"Coluna '{cabecalho}' corresponde a mais de um campo "
+                              f"({', '.join(resolucao.candidatos)}); usando '{resolucao.canonico}'.")
+        for canonico, origem in por_canonico.items():
+            if len(origem) > 1:
+                avisos.append(f"Mais de uma coluna reconhecida como '{canonico}': "
+                              f"{', '.join(repr(str(c)) for c in origem)}.")
+        return ResolucaoColunas(renomear, tuple(avisos))
@@ -0,0 +1,72 @@
+# Cache de resultados entre reruns do Streamlit
+# - Cada interação com um widget reexecuta a página inteira; aqui as etapas caras
+#   (leitura do upload, classificação, geração dos arquivos) ficam em st.cache_data
+# - A chave é o hash do conteúdo enviado + os parâmetros da etapa: só recalcula
+#   o que teve entrada alterada
+# - Argumentos com "_" na frente não entram no hash do Streamlit (já usamos a chave)
+
+import hashlib
+import types
+
+import streamlit as st
+
+import artefatos
+from leitura import ler_planilha
+from perfil import etapa
+
+# Entradas mantidas por função cacheada (LRU do st.cache_data)
+MAX_ENTRADAS = 8
+
+def hash_bytes(dados: bytes) -> str:
+    return hashlib.sha256(dados).hexdigest()
+
+def hash_upload(arquivo) -> str:
+    """Hash do conteúdo de um arquivo do st.file_uploader (calculado uma vez por upload)."""
+    memo = st.session_state.setdefault('_hash_uploads', {})
+    file_id = getattr(arquivo, 'file_id', None)
+    if file_id is not None and file_id in memo:
+        return memo[file_id]
+    chave = hash_bytes(arquivo.getvalue())
+    if file_id is not None:
+        memo[file_id] = chave
+    return chave
+
+def _codigo(code) -> tuple:
+    # bytecode + constantes; funções internas (lambda dentro da lambda) entram pelo próprio código
+    return code.co_code, tuple(_codigo(c) if isinstance(c, types.CodeType) else repr(c) for c in code.co_consts)
+
+def _nome_funcao(func) -> tuple:
+    """
+    usecols pode ser uma função (filtro por nome de coluna): entra na chave pelo nome qualificado,
+    pelo código e pelos valores que ela captura. Só o nome não basta: toda lambda se chama <lambda>
+    e duas closures da mesma função (lambda c: c in colunas) diferem só nos valores capturados.
+    """
+    capturados = tuple(repr(celula.cell_contents) for celula in func.__closure__ or ())
+    return f"{func.__module__}.{func.__qualname__}", _codigo(func.__code__), repr(func.__defaults__), capturados
+
+@st.cache_data(max_entries=MAX_ENTRADAS, show_spinner="Lendo planilha...",
+               hash_funcs={types.FunctionType: _nome_funcao})
+def ler_excel(chave: str, _conteudo: bytes, sheet_name=0, header=0, usecols=None):
+    """Leitura do conteúdo enviado (leitura.ler_planilha), cacheada pelo hash + parâmetros."""
+    with etapa('leitura') as medicao:
+        dados = ler_planilha(_conteudo, sheet_name=sheet_name, header=header, usecols=usecols)
+        medicao.linhas = sum(map(len, dados.values())) if isinstance(dados, dict) else len(dados)
+    return dados
+
+@st.cache_data(max_entries=MAX_ENTRADAS, show_spinner="Lendo artefato...")
+def ler_artefato(chave: str, _conteudo: bytes) -> artefatos.Artefato:
+    """Artefato Parquet enviado (artefatos.ler), cacheado pelo hash."""
+    with etapa('leitura artefato') as medicao:
+        artefato = artefatos.ler(_conteudo)
+        medicao.linhas = len(artefato.tabela)
+    return artefato
+
+@st.cache_data(max_entries=MAX_ENTRADAS, show_spinner=False)
+def _abas_artefato(chave: str, _conteudo: bytes) -> dict:
+    return artefatos.abas(ler_artefato(chave, _conteudo))
+
+def ler_todas_abas(chave: str, conteudo: bytes, header=0) -> dict:
+    """{aba: DataFrame} do upload: um .xlsx (sheet_name=None) ou o artefato Parquet equivalente."""
+    if artefatos.eh_artefato(conteudo):
+        return _abas_artefato(chave, conteudo)
+    return ler_excel(chave, conteudo, sheet_name=None, header=header)
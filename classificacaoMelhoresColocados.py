@@ -4,68 +4,114 @@ import streamlit as st
 import pandas as pd
 from io import BytesIO
 import plotly.express as px
+from estilos_excel import obter_formato
+from cache_resultados import MAX_ENTRADAS, hash_upload, ler_todas_abas
+import artefatos
+from ranking import top_n_por_aba, top_n_por_grupo
+from duracao import COLUNA_TEMPO_SEG, adicionar_tempo_seg
+from perfil import etapa
+
+# Critérios da classificação: por ano, pontuação (decrescente) e tempo (crescente, em segundos)
+COLUNAS_CLASSIFICACAO = ["Ano", "Pontuação", "Tempo"]
+ORDEM_CLASSIFICACAO = ["Pontuação", COLUNA_TEMPO_SEG]
+TIPOS_POSICAO = {"Competição (1, 1, 3)": 'competicao', "Densa (1, 1, 2)": 'densa'}
+
+# Padroniza os cabeçalhos de uma aba (sem alterar o DataFrame original, que vem do cache)
+# e converte o Tempo para segundos (Tempo_seg, int32) uma única vez
+def normalizar_colunas(df):
+    df = df.set_axis(df.columns.str.strip().str.title(), axis=1)  # Remove espaços e coloca em Title Case
+    df = df.rename(columns={"Ano Escolar": "Ano"})
+    if "Tempo" in df.columns:
+        df = adicionar_tempo_seg(df)
+    return df
 
 # Função para filtrar os melhores alunos de cada ano em uma aba específica
-def filtrar_melhores_alunos(df, top_n):
-    df.columns = df.columns.str.strip().str.title()  # Remove espaços e coloca em Title Case
-    df = df.rename(columns={
-        "Ano Escolar": "Ano",
-        "Pontuação": "Pontuação",
-        "Tempo": "Tempo"
-    })
-    
-    # Ordena pelo ano, pontuação (decrescente), e tempo (crescente)
-    df = df.sort_values(by=["Ano", "Pontuação", "Tempo"], ascending=[True, False, True])
-    
-    # Seleciona os melhores alunos de cada ano
-    top_alunos_df = df.groupby("Ano").head(top_n)
-    
-    return top_alunos_df
+def filtrar_melhores_alunos(df, top_n, empates=False, metodo='competicao'):
+    top_alunos_df = top_n_por_grupo(normalizar_colunas(df), ["Ano"], ORDEM_CLASSIFICACAO, top_n,
+                                    ascending=[False, True], empates=empates, metodo=metodo)
+    return top_alunos_df.drop(columns=[COLUNA_TEMPO_SEG])
+
+# Gera o Excel com os melhores de cada aba; devolve (bytes, contagem por ano, erros, melhores)
+# melhores: {aba: DataFrame} ainda com Tempo_seg (vai para o artefato Parquet, não para o Excel)
+def gerar_excel_classificacao(all_sheets, top_n, empates=False, metodo='competicao'):
+    output = BytesIO()
+    erros = []
+
+    # Todas as abas válidas são classificadas juntas, numa única passada
+    validas = {}
+    with etapa('normalizacao', linhas=sum(map(len, all_sheets.values()))):
+        for sheet_name, df in all_sheets.items():
+            df = normalizar_colunas(df)
+            faltando = [c for c in COLUNAS_CLASSIFICACAO if c not in df.columns]
+            if faltando:
+                erros.append(f"Erro na aba {sheet_name}: Coluna '{faltando[0]}' não encontrada.")
+            else:
+                validas[sheet_name] = df
+    with etapa('ranking top-N') as medicao:
+        melhores = top_n_por_aba(validas, ["Ano"], ORDEM_CLASSIFICACAO, top_n, ascending=[False, True],
+                                 empates=empates, metodo=metodo)
+        medicao.linhas = sum(map(len, melhores.values()))
+
+    with etapa('escrita', linhas=medicao.linhas), pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        format_center_bold = obter_formato(writer.book, {'align': 'center', 'bold': True})
+        for sheet_name, top_alunos_df in melhores.items():
+            # Insere o nome da escola como a primeira linha (cabeçalho)
+            exportado = top_alunos_df.drop(columns=[COLUNA_TEMPO_SEG])
+            exportado.to_excel(writer, sheet_name=sheet_name, index=False, startrow=1)
+
+            # Adiciona o nome da escola na primeira linha, sobre todas as colunas escritas (com Posição)
+            worksheet = writer.sheets[sheet_name]
+            if exportado.shape[1] > 1:
+                worksheet.merge_range(0, 0, 0, exportado.shape[1] - 1, sheet_name, format_center_bold)
+            else:
+                worksheet.write(0, 0, sheet_name, format_center_bold)
+
+    # Contagem total de alunos selecionados por ano escolar
+    if melhores:
+        total_counts = pd.concat([df['Ano'] for df in melhores.values()]).value_counts()
+        total_counts = total_counts[total_counts > 0]  # Ano categórico (artefato): sem os anos não selecionados
+    else:
+        total_counts = pd.Series(dtype=int)
+
+    return output.getvalue(), total_counts, erros, melhores
+
+# Cacheado pelo hash do upload + opções: trocar top_n não relê o arquivo
+@st.cache_data(max_entries=MAX_ENTRADAS, show_spinner="Classificando...")
+def _classificacao_cache(chave, top_n, empates, metodo, _all_sheets):
+    return gerar_excel_classificacao(_all_sheets, top_n, empates, metodo)
+
+@st.cache_data(max_entries=MAX_ENTRADAS, show_spinner=False)
+def _artefato_cache(chave, top_n, empates, metodo, _melhores):
+    return artefatos.exportar(_melhores, 'classificacao', derivadas=[COLUNA_TEMPO_SEG])
 
 # Função principal do aplicativo
 def main():
     st.title("Classificação dos Melhores Alunos por escola")
     
     # Passo 1: Upload do arquivo
-    uploaded_file = st.file_uploader("Carregue o arquivo Excel com os dados dos alunos", type=["xlsx"])
+    uploaded_file = st.file_uploader("Carregue o arquivo Excel com os dados dos alunos (ou o artefato Parquet "
+                                     "da Tabulação)", type=["xlsx", artefatos.EXTENSAO])
     
     if uploaded_file is not None:
         # Carrega todas as sheets em um dicionário de DataFrames
-        all_sheets = pd.read_excel(uploaded_file, sheet_name=None, header=1)  # Pula a primeira linha de cabeçalho extra
+        chave = hash_upload(uploaded_file)
+        try:
+            all_sheets = ler_todas_abas(chave, uploaded_file.getvalue(), header=1)  # Pula a primeira linha de cabeçalho extra
+        except (ImportError, ValueError) as e:
+            st.error(f"Erro ao ler o arquivo: {e}")
+            return
         
         # Seleção do número de melhores alunos por ano para exibir
         top_n = st.selectbox("Escolha o número de melhores alunos por ano para exibir", [1, 2, 3, 4, 5])
+        empates = st.checkbox("Incluir alunos empatados com a última posição", value=False,
+                              help="Sem esta opção, o empate na última vaga é decidido pela ordem da planilha.")
+        tipo_posicao = st.radio("Numeração da coluna Posição", list(TIPOS_POSICAO), horizontal=True)
         
         # Processamento dos dados e criação do arquivo Excel para download
-        output = BytesIO()
-        total_counts = pd.Series(dtype=int)  # Série para armazenar a contagem total de cada ano escolar
-        
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            # Itera sobre cada aba e aplica a filtragem
-            for sheet_name, df in all_sheets.items():
-                try:
-                    # Extrai o nome da escola da aba atual
-                    nome_escola = sheet_name
-                    
-                    # Filtra os melhores alunos
-                    top_alunos_df = filtrar_melhores_alunos(df, top_n)
-                    
-                    # Atualiza a contagem total de alunos por ano
-                    total_counts = total_counts.add(top_alunos_df['Ano'].value_counts(), fill_value=0)
-                    
-                    # Insere o nome da escola como a primeira linha (cabeçalho)
-                    top_alunos_df.to_excel(writer, sheet_name=sheet_name, index=False, startrow=1)
-                    
-                    # Adiciona o nome da escola na primeira linha com formatação
-                    worksheet = writer.sheets[sheet_name]
-                    format_center_bold = writer.book.add_format({'align': 'center', 'bold': True})
-                    worksheet.merge_range('A1:G1', nome_escola, format_center_bold)
-                    
-                except KeyError as e:
-                    st.error(f"Erro na aba {sheet_name}: Coluna {str(e)} não encontrada.")
-        
-        # Mover o ponteiro para o início do buffer
-        output.seek(0)
+        output, total_counts, erros, melhores = _classificacao_cache(chave, top_n, empates,
+                                                                     TIPOS_POSICAO[tipo_posicao], all_sheets)
+        for erro in erros:
+            st.error(erro)
         
         # Botão para download do arquivo Excel gerado
         st.download_button(
@@ -74,6 +120,13 @@ def main():
             file_name="melhores_alunos_classificados.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         )
+        if artefatos.PYARROW_DISPONIVEL:
+            st.download_button(
+                label="Baixar em Parquet (para a Semifinal/Final)",
+                data=_artefato_cache(chave, top_n, empates, TIPOS_POSICAO[tipo_posicao], melhores),
+                file_name=f"melhores_alunos_classificados.{artefatos.EXTENSAO}",
+                mime=artefatos.MIME
+            )
         
         # Exibir gráfico de quantidade de alunos por unidade organizacional (Org Unit Path) interativo
         st.write("Quantidade total de alunos por Org Unit Path:")
@@ -0,0 +1,197 @@
+# Tabulação em lote, sem o Streamlit
+# Processa uma pasta de exportações do formulário (um arquivo por município, por exemplo)
+# com as mesmas funções da página de Tabulação e grava os 3 arquivos de cada entrada em
+# <saida>/<nome da entrada>/ (entradas com o mesmo nome ganham um sufixo do caminho, para não
+# se sobrescreverem). Os arquivos de entrada são distribuídos entre processos.
+#
+# Uso: python cli_tabulacao.py ENTRADA [ENTRADA ...] --saida PASTA [--etapa "1° CLASSIFICATÓRIA"]
+#          [--banner imagem.png] [--banner-altura 110] [--banner-linhas 3]
+#          [--workers N] [--baixa-memoria] [--em-blocos] [--duplicatas melhor|ultima] [--padrao "*.xlsx" ...]
+# ENTRADA pode ser um arquivo ou uma pasta (arquivos que casam com --padrao; padrão: .xlsx e .csv).
+# Entradas .csv (e as .xlsx, com --em-blocos) são lidas e normalizadas em blocos.
+# Com --duplicatas, fica uma resposta por aluno e a revisão vai para revisao_repetidas.xlsx.
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import NamedTuple
+
+from leitura import ler_em_blocos, ler_planilha
+from tabulacaoOlimpiadasEParalimpada import (CRITERIOS_DUPLICATAS, coluna_canonica, datas_resposta,
+                                             gerar_classificatoria, gerar_excel_duplicatas, normalizar_em_blocos,
+                                             ordenar_classificatoria, remover_duplicatas, salvar_excels)
+
+# Mesmos nomes dos botões de download da página
+NOMES_SAIDA = ('classificatoria_olimpiada.xlsx', 'classificatoria_paralimpiada.xlsx', 'classificatoria_juncao.xlsx')
+NOME_REVISAO = 'revisao_repetidas.xlsx'
+ETAPAS = ('leitura', 'classificacao', 'escrita')
+PADROES_ENTRADA = ('*.xlsx', '*.csv')  # os formatos que a leitura aceita
+
+
+class ResultadoArquivo(NamedTuple):
+    entrada: str
+    linhas: int
+    tempos: dict  # etapa -> segundos
+    erro: str = ''
+
+
+def listar_entradas(caminhos, padroes=PADROES_ENTRADA):
+    """Arquivos a processar, em ordem; pastas são expandidas com os padrões (sem recursão)."""
+    padroes = [padroes] if isinstance(padroes, str) else list(padroes)
+    entradas = []
+    for caminho in map(Path, caminhos):
+        if caminho.is_dir():
+            encontrados = {p for padrao in padroes for p in caminho.glob(padrao)}
+            entradas.extend(sorted(p for p in encontrados if p.is_file() and not p.name.startswith('~$')))
+        else:
+            entradas.append(caminho)
+    return list(dict.fromkeys(entradas))
+
+
+def nomes_saida(entradas) -> tuple[dict, list]:
+    """
+    Subpasta de saída de cada entrada: o nome do arquivo sem extensão. Entradas com o mesmo nome
+    (de pastas diferentes, ou .xlsx e .csv) ganham um sufixo do caminho completo, para não se
+    sobrescreverem. Devolve ({entrada: subpasta}, grupos de entradas que colidiram).
+    """
+    grupos = {}
+    for entrada in map(Path, entradas):
+        grupos.setdefault(entrada.stem.lower(), []).append(entrada)  # .lower(): pastas sem distinção de caixa
+    nomes, colisoes = {}, []
+    for mesmas in grupos.values():
+        if len(mesmas) == 1:
+            nomes[mesmas[0]] = mesmas[0].stem
+            continue
+        colisoes.append(mesmas)
+        for entrada in mesmas:
+            sufixo = hashlib.sha256(str(entrada.resolve()).encode()).hexdigest()[:8]
+            nomes[entrada] = f"{entrada.stem}_{sufixo}"
+    return nomes, colisoes
+
+
+def processar_arquivo(entrada, pasta_saida, etapa, image_bytes=None, banner_rows=3, banner_h_px=110,
+                      streaming=False, em_blocos=False, duplicatas=None, nome_saida=None) -> ResultadoArquivo:
+    """
+    Lê, classifica e grava os 3 workbooks de uma entrada em <pasta_saida>/<nome_saida> (padrão: o nome
+    do arquivo sem extensão). Erros voltam no resultado, não derrubam o lote.
+    """
+    entrada = Path(entrada)
+    formato = entrada.suffix.lower().lstrip('.')
+    tempos = {}
+    linhas = 0
+    try:
+        if formato == 'csv' or em_blocos:
+            # leitura e normalização juntas, bloco a bloco (entram no tempo de leitura)
+            t0 = time.perf_counter()
+            respostas = normalizar_em_blocos(ler_em_blocos(entrada.read_bytes(), formato, usecols=coluna_canonica))
+            tempos['leitura'] = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            classificatoria_df = ordenar_classificatoria(respostas.respostas, etapa)
+            datas = respostas.datas
+            del respostas
+        else:
+            t0 = time.perf_counter()
+            formulario_df = ler_planilha(entrada.read_bytes(), usecols=coluna_canonica)
+            tempos['leitura'] = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            classificatoria_df = gerar_classificatoria(formulario_df, etapa)
+            datas = datas_resposta(formulario_df) if duplicatas else None
+            del formulario_df
+        revisao = None
+        if duplicatas:  # entra no tempo da classificação
+            resultado = remover_duplicatas(classificatoria_df, duplicatas, datas)
+            classificatoria_df = resultado.classificatoria
+            revisao = gerar_excel_duplicatas(resultado)
+        linhas = len(classificatoria_df)
+        tempos['classificacao'] = time.perf_counter() - t0
+
+        # O paralelismo do lote é por arquivo; dentro de cada um os 3 workbooks saem em série
+        t0 = time.perf_counter()
+        destino = Path(pasta_saida) / (nome_saida or entrada.stem)
+        destino.mkdir(parents=True, exist_ok=True)
+        if revisao is not None:
+            (destino / NOME_REVISAO).write_bytes(revisao)
+        saidas = salvar_excels(classificatoria_df, image_bytes=image_bytes, banner_rows=banner_rows,
+                               banner_h_px=banner_h_px, modo='serial', streaming=streaming)
+        for nome, buffer in zip(NOMES_SAIDA, saidas):
+            (destino / nome).write_bytes(buffer.getbuffer())
+        tempos['escrita'] = time.perf_counter() - t0
+    except Exception as e:
+        return ResultadoArquivo(str(entrada), linhas, tempos, f"{type(e).__name__}: {e}")
+    return ResultadoArquivo(str(entrada), linhas, tempos)
+
+
+def _linha_resultado(r: ResultadoArquivo) -> str:
+    colunas = ' '.join(f"{r.tempos[e]:>13.2f}" if e in r.tempos else f"{'-':>13}" for e in ETAPAS)
+    status = f"ERRO {r.erro}" if r.erro else 'ok'
+    return f"{Path(r.entrada).name[:40]:<40} {r.linhas:>8} {colunas} {sum(r.tempos.values()):>8.2f}  {status}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tabulação Olimpíada/Paralimpíada em lote")
+    parser.add_argument('entradas', nargs='+', help="arquivos .xlsx/.csv do formulário ou pastas com eles")
+    parser.add_argument('--saida', required=True, help="pasta de saída (uma subpasta por entrada)")
+    parser.add_argument('--etapa', default="1° CLASSIFICATÓRIA")
+    parser.add_argument('--banner', help="imagem PNG/JPG para o topo das abas (opcional)")
+    parser.add_argument('--banner-altura', type=int, default=110)
+    parser.add_argument('--banner-linhas', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="processos em paralelo (1 = tudo no processo atual)")
+    parser.add_argument('--baixa-memoria', action='store_true',
+                        help="grava as linhas em blocos (constant_memory), para entradas muito grandes")
+    parser.add_argument('--em-blocos', action='store_true',
+                        help="lê e normaliza os .xlsx em blocos (memória limitada; os .csv já são lidos assim)")
+    parser.add_argument('--duplicatas', choices=CRITERIOS_DUPLICATAS,
+                        help="uma resposta por aluno: a melhor tentativa ou a última enviada "
+                             "(grava também revisao_repetidas.xlsx)")
+    parser.add_argument('--padrao', action='append',
+                        help="padrão de arquivos ao varrer pastas (pode repetir; padrão: *.xlsx e *.csv)")
+    args = parser.parse_args(argv)
+
+    entradas = listar_entradas(args.entradas, args.padrao or PADROES_ENTRADA)
+    if not entradas:
+        print("Nenhum arquivo de entrada encontrado.", file=sys.stderr)
+        return 2
+    nomes, colisoes = nomes_saida(entradas)
+    for mesmas in colisoes:
+        print(f"Aviso: {len(mesmas)} entradas com o nome '{mesmas[0].stem}'; saídas separadas em "
+              + ', '.join(f"{e} -> {nomes[e]}/" for e in mesmas), file=sys.stderr)
+
+    image_bytes = Path(args.banner).read_bytes() if args.banner else None
+    opcoes = dict(pasta_saida=args.saida, etapa=args.etapa, image_bytes=image_bytes,
+                  banner_rows=args.banner_linhas, banner_h_px=args.banner_altura, streaming=args.baixa_memoria,
+                  em_blocos=args.em_blocos, duplicatas=args.duplicatas)
+
+    print(f"{'arquivo':<40} {'linhas':>8} {'leitura (s)':>13} {'classif. (s)':>13} {'escrita (s)':>13} "
+          f"{'total (s)':>8}")
+    inicio = time.perf_counter()
+    resultados = []
+    if args.workers <= 1:
+        for entrada in entradas:
+            resultados.append(processar_arquivo(entrada, nome_saida=nomes[entrada], **opcoes))
+            print(_linha_resultado(resultados[-1]), flush=True)
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(entradas))) as executor:
+            futuros = [executor.submit(processar_arquivo, entrada, nome_saida=nomes[entrada], **opcoes)
+                       for entrada in entradas]
+            for futuro in as_completed(futuros):
+                resultados.append(futuro.result())
+                print(_linha_resultado(resultados[-1]), flush=True)
+    decorrido = time.perf_counter() - inicio
+
+    falhas = [r for r in resultados if r.erro]
+    somas = {e: sum(r.tempos.get(e, 0.0) for r in resultados) for e in ETAPAS}
+    print(f"\n{len(resultados) - len(falhas)}/{len(resultados)} arquivos ok, "
+          f"{sum(r.linhas for r in resultados)} linhas em {decorrido:.2f}s "
+          f"(soma por etapa: " + ', '.join(f"{e} {t:.2f}s" for e, t in somas.items()) + ")")
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
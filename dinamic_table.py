@@ -14,14 +14,15 @@ def criar_tabela_dinamica(dados):
         columns='Ano',         # Ano será a coluna
         values='Nome',         # Vamos contar os alunos (coluna 'Nome')
         aggfunc='count',       # Contar o número de alunos por combinação
-        fill_value=0           # Preencher valores ausentes com 0
+        fill_value=0,          # Preencher valores ausentes com 0
+        observed=True          # Escola/Ano categóricos (artefato Parquet): só as combinações presentes
     )
     
     return tabela_dinamica
 
 def gerar_grafico(dados):
     # Agrupar os dados para contar a quantidade total de anos escolares
-    total_anos_escolares = dados.groupby(['Ano']).size().reset_index(name="Quantidade de Anos")
+    total_anos_escolares = dados.groupby(['Ano'], observed=True).size().reset_index(name="Quantidade de Anos")
 
     # Criar o gráfico de barras
     fig = px.bar(
@@ -0,0 +1,170 @@
+# Respostas repetidas (o mesmo aluno enviado mais de uma vez pelo formulário)
+# - Índice exato: cada resposta recebe um código de aluno (escola, ano e nome já normalizados
+#   viram uma chave inteira via factorize, O(linhas)); de cada grupo fica uma só resposta,
+#   escolhida por uma chave de preferência (uma passada de mínimo por grupo, sem ordenar)
+# - Nomes parecidos (erro de digitação, nome do meio a menos, palavras em outra ordem) não são
+#   removidos: viram pares para revisão. Só se comparam nomes do mesmo bloco (escola + ano) que
+#   dividem uma chave (esqueleto fonético, primeiro + último nome, dois últimos nomes) ou ficam
+#   vizinhos na ordem alfabética do bloco; nunca todos contra todos
+# - O SequenceMatcher (lento, em Python) só roda nos pares que passam do limiar pelos caracteres
+#   em comum, calculados em numpy para todos os candidatos de uma vez
+# - Os nomes chegam normalizados (sem acentos, maiúsculos, espaços simples)
+
+from difflib import SequenceMatcher
+
+import numpy as np
+import pandas as pd
+
+from ranking import chave_composta, selecionar_top_n
+
+LIMIAR_SEMELHANCA = 0.85  # SequenceMatcher.ratio mínimo para vizinhos com grafia diferente
+LIMITE_GRUPO = 20         # grupos de uma chave maiores que isso não geram pares (nome comum demais)
+
+MOTIVO_ORDEM = 'mesmas palavras em outra ordem'
+MOTIVO_NOME_MEIO = 'nome a mais ou a menos'
+MOTIVO_GRAFIA = 'grafia parecida'
+
+_PARTICULAS = {'DA', 'DE', 'DO', 'DAS', 'DOS', 'E'}
+# grafias que soam igual nos nomes em português (o texto já vem sem acentos e maiúsculo)
+_FONETICA = [
+    (r'PH', 'F'), (r'TH', 'T'), (r'[CS]H', 'X'), (r'LH', 'L'), (r'NH', 'N'), (r'H', ''),
+    (r'Y', 'I'), (r'W', 'V'), (r'K', 'C'), (r'Z', 'S'), (r'C(?=[EI])', 'S'), (r'G(?=[EI])', 'J'),
+    (r'M\b', 'N'), (r'([A-Z])\1+', r'\1'), (r'[^A-Z0-9 ]', ''),
+]
+
+
+def manter_uma_por_grupo(grupos: np.ndarray, preferencia: np.ndarray) -> np.ndarray:
+    """
+    Máscara das linhas que ficam: a de menor preferencia em cada grupo (empate: a primeira linha).
+    grupos: código int por linha; negativo = linha sem grupo (sempre fica).
+    """
+    mantidas = grupos < 0
+    mantidas[selecionar_top_n(grupos, preferencia, 1).posicoes] = True
+    return mantidas
+
+
+def esqueleto_fonetico(nomes: pd.Series) -> pd.Series:
+    """Nome reduzido ao som: SOUZA/SOUSA, ISABELLA/IZABELA e THAIS/TAIS ficam iguais."""
+    texto = nomes.astype(str)
+    for padrao, troca in _FONETICA:
+        texto = texto.str.replace(padrao, troca, regex=True)
+    return texto
+
+
+def _palavras(nomes: pd.Series) -> list:
+    return [[p for p in nome.split() if p not in _PARTICULAS] for nome in nomes]
+
+
+def _fonetica_palavras(palavras: list) -> list:
+    """esqueleto_fonetico de cada palavra, calculado uma vez por palavra distinta (os nomes repetem muito)."""
+    distintas = pd.Series(sorted({p for nome in palavras for p in nome}), dtype=object)
+    som = {p: s for p, s in zip(distintas, esqueleto_fonetico(distintas)) if s and s not in _PARTICULAS}
+    return [[som[p] for p in nome if p in som] for nome in palavras]
+
+
+def _limite_semelhanca(texto: list, pares: np.ndarray) -> np.ndarray:
+    """
+    quick_ratio do SequenceMatcher de cada par (caracteres em comum, sem olhar a ordem), em
+    numpy: é um limite superior do ratio, então quem fica abaixo do limiar nem é comparado.
+    """
+    if not len(pares):
+        return np.zeros(0)
+    usados, posicao = np.unique(pares, return_inverse=True)
+    matriz = np.array([texto[k] for k in usados], dtype=str).view('uint32').reshape(len(usados), -1)
+    caracteres = np.unique(matriz)
+    # coluna de zeros no fim: nomes vazios também têm uma linha (0 caracteres)
+    contagem = np.stack([(matriz == c).sum(axis=1, dtype='uint8') for c in caracteres[caracteres != 0]]
+                        + [np.zeros(len(usados), dtype='uint8')], axis=1)
+    posicao = posicao.reshape(pares.shape)
+    a, b = contagem[posicao[:, 0]], contagem[posicao[:, 1]]
+    comuns = np.minimum(a, b).sum(axis=1, dtype='int64')
+    total = a.sum(axis=1, dtype='int64') + b.sum(axis=1, dtype='int64')
+    return np.divide(2 * comuns, total, out=np.ones(len(total)), where=total > 0)  # dois vazios: iguais, como no ratio
+
+
+def _pares_mesma_chave(bloco: np.ndarray, chave: pd.Series, limite_grupo: int):
+    """(i, j) com i < j das entradas do mesmo bloco e com a mesma chave, sem os grupos grandes demais."""
+    fator = pd.factorize(chave.replace('', np.nan))[0].astype('int64')  # chave vazia não forma par
+    validas = np.flatnonzero(fator >= 0)
+    codigo = chave_composta([bloco[validas], fator[validas]])
+    ordem = validas[np.argsort(codigo, kind='stable')]
+    ordenado = np.sort(codigo, kind='stable')
+    inicio = np.r_[True, ordenado[1:] != ordenado[:-1]]
+    tamanho = np.diff(np.r_[np.flatnonzero(inicio), len(ordenado)])
+    tamanho_linha = np.repeat(tamanho, tamanho)
+    ordem, ordenado = ordem[tamanho_linha <= limite_grupo], ordenado[tamanho_linha <= limite_grupo]
+
+    pares = []
+    for d in range(1, min(int(tamanho.max(initial=1)), limite_grupo)):
+        mesmo = np.flatnonzero(ordenado[:-d] == ordenado[d:])
+        pares.append(np.column_stack((ordem[mesmo], ordem[mesmo + d])))
+    if not pares:
+        return np.zeros((0, 2), dtype='int64')
+    pares = np.concatenate(pares)
+    return np.sort(pares, axis=1)
+
+
+def pares_parecidos(bloco: np.ndarray, nomes: pd.Series, limiar=LIMIAR_SEMELHANCA,
+                    limite_grupo=LIMITE_GRUPO) -> pd.DataFrame:
+    """
+    Pares de nomes diferentes e parecidos dentro do mesmo bloco. bloco: código int por entrada
+    (escola + ano); nomes: nome normalizado de cada entrada (entradas = alunos distintos).
+    Devolve as colunas i, j (posições, i < j), Motivo e Semelhança (0 a 1), na ordem de i.
+    Candidatos: mesmo esqueleto fonético das palavras em ordem alfabética (sempre valem), mesmo
+    primeiro + último nome ou mesmos dois últimos nomes e vizinhos na ordem alfabética do bloco
+    com o mesmo primeiro nome (valem se as palavras de um estiverem todas no outro ou com
+    semelhança >= limiar).
+    """
+    vazio = pd.DataFrame({'i': np.zeros(0, 'int64'), 'j': np.zeros(0, 'int64'), 'Motivo': [],
+                          'Semelhança': np.zeros(0)})
+    if len(nomes) < 2:
+        return vazio
+    nomes = nomes.reset_index(drop=True).astype(str)
+    bloco = np.asarray(bloco, dtype='int64')
+    palavras = _palavras(nomes)
+    fonetica = _fonetica_palavras(palavras)
+
+    sons = pd.Series([' '.join(sorted(p)) for p in fonetica])
+    pontas = pd.Series([f"{p[0]} {p[-1]}" if p else '' for p in fonetica])
+    sobrenomes = pd.Series([' '.join(p[-2:]) if len(p) > 1 else '' for p in fonetica])
+    por_som = _pares_mesma_chave(bloco, sons, limite_grupo)
+    por_nomes = np.concatenate((_pares_mesma_chave(bloco, pontas, limite_grupo),
+                                _pares_mesma_chave(bloco, sobrenomes, limite_grupo)))
+
+    # vizinhos na ordem alfabética do bloco, com o mesmo primeiro nome
+    primeiro = np.array([p[0] if p else '' for p in palavras], dtype=object)
+    ordem = np.lexsort((nomes.to_numpy(dtype=object), bloco))
+    vizinhos = np.flatnonzero((bloco[ordem[1:]] == bloco[ordem[:-1]]) & (primeiro[ordem[1:]] == primeiro[ordem[:-1]]))
+    por_vizinhos = np.sort(np.column_stack((ordem[vizinhos], ordem[vizinhos + 1])), axis=1)
+
+    # cada par uma vez, no primeiro critério que o encontrou
+    candidatos = np.concatenate((por_som, por_nomes, por_vizinhos))
+    origem = np.repeat([0, 1, 2], [len(por_som), len(por_nomes), len(por_vizinhos)])
+    _, primeiros = np.unique(candidatos, axis=0, return_index=True)
+    primeiros.sort()
+    candidatos, origem = candidatos[primeiros], origem[primeiros]
+    if not len(candidatos):  # ex.: cada nome sozinho no seu bloco
+        return vazio
+
+    texto = nomes.tolist()
+    possivel = (origem == 0) | (_limite_semelhanca(texto, candidatos) >= limiar)
+    linhas = []
+    for (i, j), o, p in zip(candidatos.tolist(), origem.tolist(), possivel.tolist()):
+        a, b = set(fonetica[i]), set(fonetica[j])
+        if o == 0:  # mesmo som; se as palavras forem as mesmas, mudou só a ordem (ou DA/DE/DO)
+            trocadas = sorted(palavras[i]) == sorted(palavras[j]) and palavras[i] != palavras[j]
+            motivo = MOTIVO_ORDEM if trocadas else MOTIVO_GRAFIA
+        elif a < b or b < a:
+            motivo = MOTIVO_NOME_MEIO
+        elif p:
+            motivo = MOTIVO_GRAFIA
+        else:
+            continue
+        semelhanca = SequenceMatcher(None, texto[i], texto[j]).ratio()
+        if motivo == MOTIVO_GRAFIA and o > 0 and semelhanca < limiar:
+            continue
+        linhas.append((i, j, motivo, semelhanca))
+    if not linhas:
+        return vazio
+    pares = pd.DataFrame(linhas, columns=['i', 'j', 'Motivo', 'Semelhança'])
+    return pares.sort_values(['i', 'j'], kind='stable').reset_index(drop=True)
@@ -0,0 +1,40 @@
+# Tempo de realização -> segundos (int32), calculado uma vez na leitura
+# - Mesmo parser da Tabulação (parse_tempo_serie: 'hh:mm:ss', 'mm:ss', 'ss', números,
+#   horas do Excel), resolvido por valor distinto
+# - Durações do Excel lidas como timedelta também são aceitas
+# - Tempo ausente/inválido vira TEMPO_AUSENTE (maior int32): fica por último nas
+#   ordenações crescentes, sem NaN na chave
+# - Ordenar por Tempo_seg é numérico ("9:00" < "12:30") e barato
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from tabulacaoOlimpiadasEParalimpada import parse_tempo_serie
+
+COLUNA_TEMPO_SEG = 'Tempo_seg'
+TEMPO_AUSENTE = np.iinfo('int32').max
+
+def tempo_em_segundos(serie: pd.Series) -> pd.Series:
+    """Segundos inteiros (int32, arredondados) de cada Tempo; TEMPO_AUSENTE quando não dá para ler."""
+    codigos, unicos = pd.factorize(serie)  # cada valor distinto é lido uma única vez
+    unicos = pd.Series(unicos)
+    if pd.api.types.is_timedelta64_dtype(unicos):
+        segundos = unicos.dt.total_seconds()
+    else:
+        segundos = parse_tempo_serie(unicos)
+        if unicos.dtype == object:
+            delta = unicos.map(lambda v: isinstance(v, timedelta)).to_numpy(bool)
+            if delta.any():
+                segundos[delta] = pd.to_timedelta(unicos[delta]).dt.total_seconds().to_numpy()
+
+    segundos = np.rint(segundos.to_numpy(dtype='float64'))
+    validos = np.isfinite(segundos) & (segundos >= 0) & (segundos < TEMPO_AUSENTE)
+    por_valor = np.full(len(unicos) + 1, TEMPO_AUSENTE, dtype='int32')  # último slot = NaN (código -1)
+    por_valor[:-1][validos] = segundos[validos]
+    return pd.Series(por_valor[codigos], index=serie.index, name=COLUNA_TEMPO_SEG)
+
+def adicionar_tempo_seg(df: pd.DataFrame, coluna='Tempo') -> pd.DataFrame:
+    """Cópia rasa de df com a coluna Tempo_seg (int32) no fim."""
+    return df.assign(**{COLUNA_TEMPO_SEG: tempo_em_segundos(df[coluna])})
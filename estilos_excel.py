@@ -0,0 +1,16 @@
+# Registro de formatos (xlsxwriter) compartilhado pelas páginas que geram Excel
+# - Um registro por workbook: formatos iguais (mesmo dicionário de propriedades)
+#   são criados uma única vez e reaproveitados em todas as abas
+
+import weakref
+
+_REGISTROS = weakref.WeakKeyDictionary()
+
+def obter_formato(book, props: dict):
+    """Retorna o Format de `book` para `props`, criando-o só na primeira chamada."""
+    registro = _REGISTROS.setdefault(book, {})
+    chave = tuple(sorted(props.items()))
+    fmt = registro.get(chave)
+    if fmt is None:
+        fmt = registro[chave] = book.add_format(props)
+    return fmt
@@ -1,10 +1,260 @@
-import streamlit as st
+# Final: junta as classificações de várias escolas/etapas e classifica toda a rede
+# - Recebe N planilhas (saídas da Semifinal, da Classificação ou da Tabulação)
+# - Lê aba por aba (leitura.ler_abas): de cada aba só ficam as colunas usadas, então a
+#   memória não cresce com o número de abas/arquivos enviados
+# - Artefatos Parquet (artefatos.py) das outras páginas entram inteiros, já tipados
+# - Normaliza com as mesmas funções da Tabulação (escola, pontuação, tempo, ordem dos anos)
+# - O mesmo aluno (nome sem acentos/maiúsculas + escola + ano) entra uma vez, com a
+#   melhor pontuação (desempate: menor tempo; depois o primeiro arquivo enviado)
+# - Posição por categoria (Olimpíada/Paralimpíada) e ano, entre todas as escolas
+
+from io import BytesIO
+
+import numpy as np
 import pandas as pd
+import streamlit as st
+
+import artefatos
+from cache_resultados import MAX_ENTRADAS, hash_upload
+from duracao import COLUNA_TEMPO_SEG, tempo_em_segundos
+from leitura import ler_abas
+from perfil import medir
+from previa import previa
+from ranking import chave_composta, posicoes_em_ordem, posto_valores, selecionar_top_n
+from tabulacaoOlimpiadasEParalimpada import (COLUNA_ORDEM_ANO, _norm, abas_por_linha, codificar_escolas,
+                                            escrever_geral, escrever_por_escola, mascara_sem_deficiencia,
+                                            ordem_ano_codigos, padronizar_nome_aluno_serie,
+                                            padronizar_pontuacao_serie, particionar_por_escola)
+
+ABA_FINAL = 'RANKING FINAL'
+ABAS_IGNORADAS = {'GERAL', 'RANKING GERAL', ABA_FINAL}  # resumos: as abas por escola já trazem todos os alunos
+CATEGORIAS = ('OLIMPÍADA', 'PARALIMPÍADA')
+COLUNAS_OBRIGATORIAS = ['Ano', 'Nome', 'Pontuação']
+COLUNAS_LIDAS = ['Ano', 'Nome', 'Escola', 'Pontuação', 'Tempo', 'Deficiência/Transtorno', 'Etapa']
+COLUNAS_SAIDA = ['Posição', 'Categoria', 'Ano', 'Nome', 'Escola', 'Pontuação', 'Tempo', 'Deficiência/Transtorno',
+                 'Etapa', 'Arquivo', 'Ocorrências', COLUNA_TEMPO_SEG]
+LINHAS_BUSCA_CABECALHO = 10  # banner/título acima do cabeçalho (Tabulação com banner: 4 linhas)
+
+# cabeçalho normalizado (_norm: sem acentos, minúsculo, sem ':'/'?' no fim) -> coluna da Final;
+# se repetir, vale a primeira da aba
+_CABECALHOS = {
+    'ano': 'Ano', 'ano escolar': 'Ano',
+    'nome': 'Nome',
+    'escola': 'Escola', 'escola (aba)': 'Escola',
+    'pontuacao': 'Pontuação',
+    'tempo': 'Tempo',
+    'deficiencia/transtorno': 'Deficiência/Transtorno',
+    'etapa': 'Etapa', 'melhor etapa': 'Etapa',
+}
+
+def _chave_cabecalho(valor):
+    return _norm(valor) if isinstance(valor, str) else None
+
+def _colunas_da_linha(linha) -> dict:
+    """{coluna da Final: posição} reconhecidas numa linha da planilha."""
+    colunas = {}
+    for pos, valor in enumerate(linha):
+        destino = _CABECALHOS.get(_chave_cabecalho(valor))
+        if destino and destino not in colunas:
+            colunas[destino] = pos
+    return colunas
+
+def alunos_da_aba(bruto: pd.DataFrame, aba: str):
+    """
+    Reduz uma aba lida sem cabeçalho (header=None) às COLUNAS_LIDAS. O cabeçalho é a primeira
+    linha (entre as LINHAS_BUSCA_CABECALHO) com Ano, Nome e Pontuação; None se não houver.
+    Sem coluna Escola, o nome da aba é a escola.
+    """
+    for linha in range(min(LINHAS_BUSCA_CABECALHO, len(bruto))):
+        colunas = _colunas_da_linha(bruto.iloc[linha])
+        if all(c in colunas for c in COLUNAS_OBRIGATORIAS):
+            break
+    else:
+        return None
+    dados = bruto.iloc[linha + 1:, list(colunas.values())]
+    dados.columns = list(colunas)
+    dados = dados[dados['Nome'].notna()].infer_objects()  # header=None deixa tudo object
+    if 'Escola' not in colunas:
+        dados = dados.assign(Escola=aba)
+    return dados.reindex(columns=COLUNAS_LIDAS)
+
+def alunos_do_artefato(artefato: artefatos.Artefato):
+    """
+    Mesmo resultado de alunos_da_aba para todas as abas de um artefato de uma vez (a tabela já
+    tem cabeçalho e tipos). Linhas sem aba por escola ficam de fora, como no .xlsx.
+    """
+    tabela = artefato.tabela
+    colunas = _colunas_da_linha(tabela.columns)
+    if not all(c in colunas for c in COLUNAS_OBRIGATORIAS):
+        return None
+    manter = tabela.iloc[:, colunas['Nome']].notna().to_numpy()
+    aba = tabela[artefatos.COLUNA_ABA] if artefatos.COLUNA_ABA in tabela.columns else None
+    if aba is not None:
+        manter &= aba.notna().to_numpy()
+    posicoes = np.flatnonzero(manter)
+    if aba is not None:  # aba por aba, como no .xlsx (a ordem de leitura desempata a melhor participação)
+        posicoes = posicoes[np.argsort(aba.cat.codes.to_numpy()[posicoes], kind='stable')]
+    dados = tabela.iloc[posicoes].iloc[:, list(colunas.values())].set_axis(list(colunas), axis=1)
+    if 'Escola' not in colunas:
+        dados = dados.assign(Escola=artefato.tipo if aba is None else aba.iloc[posicoes].to_numpy())
+    return dados.reindex(columns=COLUNAS_LIDAS)
+
+@medir('leitura', linhas=lambda r: len(r[0]))
+def ler_alunos(arquivos):
+    """
+    arquivos: sequência de (nome, bytes). Devolve (alunos de todas as abas com a coluna Arquivo, avisos).
+    Cada aba é reduzida às colunas usadas antes da próxima ser lida.
+    """
+    partes, origem, avisos = [], [], []
+    nomes = []
+    for i, (nome_arquivo, conteudo) in enumerate(arquivos):
+        nomes.append(nome_arquivo)
+        if artefatos.eh_artefato(conteudo):
+            dados = alunos_do_artefato(artefatos.ler(conteudo))
+            if dados is None:
+                avisos.append(f"{nome_arquivo}: artefato ignorado (sem as colunas {COLUNAS_OBRIGATORIAS}).")
+            else:
+                partes.append(dados)
+                origem.append(i)
+            continue
+        for aba, bruto in ler_abas(conteudo, header=None):
+            if aba.strip().upper() in ABAS_IGNORADAS:
+                continue
+            dados = alunos_da_aba(bruto, aba)
+            if dados is None:
+                avisos.append(f"{nome_arquivo}: aba '{aba}' ignorada (sem as colunas {COLUNAS_OBRIGATORIAS}).")
+                continue
+            partes.append(dados)
+            origem.append(i)
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS_LIDAS + ['Arquivo']), avisos
+
+    alunos = pd.concat(partes, ignore_index=True)
+    # nomes de arquivo repetidos (mesmo nome, conteúdos diferentes) ganham o número do upload
+    rotulos = [n if nomes.count(n) == 1 else f"{n} ({i + 1})" for i, n in enumerate(nomes)]
+    alunos['Arquivo'] = pd.Categorical.from_codes(np.repeat(origem, [len(p) for p in partes]), categories=rotulos)
+    return alunos, avisos
+
+@medir('classificacao', linhas=len)
+def classificar_final(alunos: pd.DataFrame) -> pd.DataFrame:
+    """Um registro por aluno (a melhor participação) com a Posição por categoria e ano na rede."""
+    if alunos.empty:
+        return pd.DataFrame(columns=COLUNAS_SAIDA)
+    escola = codificar_escolas(alunos['Escola'])
+    ano = ordem_ano_codigos(alunos['Ano']).astype('int64')
+    nome = pd.factorize(padronizar_nome_aluno_serie(alunos['Nome']))[0]
+    pontuacao = padronizar_pontuacao_serie(alunos['Pontuação'])
+    tempo = tempo_em_segundos(alunos['Tempo'])
+
+    aluno = posto_valores(pd.Series(chave_composta([escola.cat.codes.to_numpy().astype('int64') + 1, ano,
+                                                    nome + 1])))
+    aluno[nome < 0] = -1
+    desempenho = chave_composta([posto_valores(pontuacao, ascending=False), tempo.to_numpy().astype('int64')])
+    melhor = selecionar_top_n(aluno, desempenho, 1).posicoes
+    ocorrencias = np.bincount(aluno[aluno >= 0])[aluno[melhor]]
+
+    # mesma regra da Tabulação: só quem declara não ter deficiência/transtorno é Olimpíada (vazio é Paralimpíada)
+    paralimpiada = ~mascara_sem_deficiencia(alunos['Deficiência/Transtorno'])
+    ranking = alunos.iloc[melhor].assign(**{
+        'Categoria': pd.Categorical.from_codes(paralimpiada[melhor].astype('int8'), categories=list(CATEGORIAS)),
+        'Escola': escola.iloc[melhor],
+        'Pontuação': pontuacao.iloc[melhor],
+        'Ocorrências': ocorrencias,
+        COLUNA_TEMPO_SEG: tempo.iloc[melhor],
+    })
+
+    grupo = chave_composta([paralimpiada[melhor].astype('int64'), ano[melhor]])
+    chave = desempenho[melhor]
+    ordem = np.lexsort((np.arange(len(ranking)), chave, grupo))
+    ranking = ranking.iloc[ordem]
+    ranking.insert(0, 'Posição', posicoes_em_ordem(grupo[ordem], chave[ordem]))
+    return ranking.reset_index(drop=True)[COLUNAS_SAIDA]
+
+@medir('escrita')
+def gerar_excel_final(ranking: pd.DataFrame, image_bytes=None, banner_rows=3, banner_h_px=110) -> bytes:
+    """Aba RANKING FINAL com a rede inteira + uma aba por escola, no estilo dos arquivos da Tabulação."""
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        escrever_geral(writer, ranking, image_bytes=image_bytes, banner_rows=banner_rows, banner_h_px=banner_h_px,
+                       sheet=ABA_FINAL)
+        escrever_por_escola(writer, ranking, image_bytes=image_bytes, banner_rows=banner_rows,
+                            banner_h_px=banner_h_px, abas_reservadas=(ABA_FINAL,))
+    return output.getvalue()
+
+@medir('artefato')
+def gerar_artefato_final(ranking: pd.DataFrame) -> bytes:
+    """O ranking em Parquet, com a aba por escola de cada aluno (a mesma de gerar_excel_final)."""
+    tabela = ranking.assign(**{
+        COLUNA_ORDEM_ANO: ordem_ano_codigos(ranking['Ano']),
+        artefatos.COLUNA_ABA: abas_por_linha(len(ranking), particionar_por_escola(ranking), (ABA_FINAL,)),
+    })
+    return artefatos.exportar(tabela, 'final', derivadas=[COLUNA_TEMPO_SEG, COLUNA_ORDEM_ANO], aba_geral=ABA_FINAL)
+
+# Cacheado pelos hashes dos uploads (na ordem enviada: o desempate entre participações usa essa ordem)
+@st.cache_data(max_entries=MAX_ENTRADAS, show_spinner="Lendo e classificando as planilhas...")
+def _final_cache(chaves, nomes, _arquivos):
+    alunos, avisos = ler_alunos((nome, arquivo.getvalue()) for nome, arquivo in zip(nomes, _arquivos))
+    return classificar_final(alunos), len(alunos), avisos
+
+@st.cache_data(max_entries=MAX_ENTRADAS, show_spinner="Gerando arquivo...")
+def _excel_final_cache(chaves, chave_banner, _ranking, _image_bytes):
+    return gerar_excel_final(_ranking, image_bytes=_image_bytes)
+
+@st.cache_data(max_entries=MAX_ENTRADAS, show_spinner=False)
+def _artefato_final_cache(chaves, _ranking):
+    return gerar_artefato_final(_ranking)
 
 def main():
-    st.title('Final')
+    st.title("Final: Classificação de Toda a Rede")
+
+    st.write("Carregue as planilhas das escolas e etapas (arquivos da Semifinal, da Classificação ou da "
+             "Tabulação, em .xlsx ou nos artefatos Parquet dessas páginas). Cada aluno entra uma vez, com a "
+             "melhor participação, e recebe a posição no ano entre todas as escolas.")
+
+    arquivos = st.file_uploader("Upload das planilhas", type=["xlsx", artefatos.EXTENSAO], accept_multiple_files=True)
+    if not arquivos:
+        return
+
+    chaves = tuple(hash_upload(a) for a in arquivos)
+    nomes = tuple(a.name for a in arquivos)
+    try:
+        ranking, lidos, avisos = _final_cache(chaves, nomes, arquivos)
+    except Exception as e:
+        st.error(f"Erro ao processar as planilhas: {e}")
+        return
+    for aviso in avisos:
+        st.warning(aviso)
+    if ranking.empty:
+        st.error("Nenhum aluno encontrado nas planilhas enviadas.")
+        return
+
+    st.info(f"{lidos} registros lidos em {len(arquivos)} arquivo(s); {len(ranking)} alunos após remover "
+            f"{lidos - len(ranking)} repetidos.")
+    previa(ranking, chaves, 'final', filtros=('Categoria', 'Escola', 'Ano'), ocultar=(COLUNA_TEMPO_SEG,))
 
+    image_bytes = None
+    chave_banner = None
+    if st.checkbox("Adicionar imagem no topo (todas as abas)", value=False):
+        img_file = st.file_uploader("Envie a imagem (PNG/JPG), opcional", type=["png", "jpg", "jpeg"])
+        if img_file is not None:
+            image_bytes = img_file.getvalue()
+            chave_banner = hash_upload(img_file)
 
+    if st.button("Gerar Arquivo Final"):
+        output = _excel_final_cache(chaves, chave_banner, ranking, image_bytes)
+        st.download_button(
+            label="Baixar Classificação Final",
+            data=output,
+            file_name="classificacao_final_rede.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+        if artefatos.PYARROW_DISPONIVEL:
+            st.download_button(
+                label="Baixar em Parquet",
+                data=_artefato_final_cache(chaves, ranking),
+                file_name=f"classificacao_final_rede.{artefatos.EXTENSAO}",
+                mime=artefatos.MIME
+            )
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
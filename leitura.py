@@ -0,0 +1,167 @@
+# Leitura das planilhas enviadas (camada única usada por todas as páginas)
+# - Usa o motor calamine (python-calamine, em Rust) quando instalado: bem mais
+#   rápido que o openpyxl em arquivos grandes / com muitas abas
+# - Sem calamine, ou se ele falhar com o arquivo, cai no openpyxl
+# - usecols permite ler só as colunas que a página realmente usa
+# - ler_em_blocos lê a primeira aba (openpyxl read_only) ou um .csv aos poucos, para
+#   formulários grandes demais para caber inteiros na memória; o resultado é o mesmo
+#   com qualquer tamanho de bloco
+
+import re
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+try:
+    import python_calamine  # noqa: F401
+    MOTOR_PADRAO = 'calamine'
+except ImportError:
+    MOTOR_PADRAO = 'openpyxl'
+
+MOTOR_RESERVA = 'openpyxl'
+TAMANHO_BLOCO_LEITURA = 50_000  # linhas por bloco em ler_em_blocos
+_NUMERO_CSV = re.compile(r'\s*[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?\s*')
+_INTEIRO_CSV = re.compile(r'\s*[+-]?\d+\s*')
+_CARACTERES_NUMERO = np.array([ord(c) for c in '\x000123456789+-.eE \t'], dtype=np.uint32)  # \x00: preenchimento
+_TAMANHO_FILTRO = 40  # textos até esse tamanho passam pelo filtro vetorizado antes do regex
+
+def ler_planilha(conteudo: bytes, sheet_name=0, header=0, usecols=None, motor=None):
+    """
+    pd.read_excel sobre os bytes enviados, com o motor mais rápido disponível.
+    usecols: None (todas), lista de posições/nomes ou função nome -> bool.
+    """
+    motor = motor or MOTOR_PADRAO
+    try:
+        return pd.read_excel(BytesIO(conteudo), sheet_name=sheet_name, header=header,
+                             usecols=usecols, engine=motor)
+    except Exception:
+        if motor == MOTOR_RESERVA:
+            raise
+        return pd.read_excel(BytesIO(conteudo), sheet_name=sheet_name, header=header,
+                             usecols=usecols, engine=MOTOR_RESERVA)
+
+def ler_abas(conteudo: bytes, header=0, motor=None):
+    """
+    Gera (nome da aba, DataFrame) uma aba por vez, em vez do dicionário inteiro de
+    sheet_name=None: quem consome pode reduzir cada aba antes de ler a próxima.
+    """
+    motor = motor or MOTOR_PADRAO
+    try:
+        arquivo = pd.ExcelFile(BytesIO(conteudo), engine=motor)
+    except Exception:
+        if motor == MOTOR_RESERVA:
+            raise
+        arquivo = pd.ExcelFile(BytesIO(conteudo), engine=MOTOR_RESERVA)
+    with arquivo:
+        for nome in arquivo.sheet_names:
+            yield nome, arquivo.parse(nome, header=header)
+
+def _nomes_colunas(cabecalho) -> list:
+    """Nomes como o read_excel dá: 'Unnamed: i' para célula vazia e '.1', '.2'... nos repetidos."""
+    nomes, vistos = [], {}
+    for i, valor in enumerate(cabecalho):
+        nome = f"Unnamed: {i}" if valor is None or valor == '' else valor
+        if nome in vistos:
+            vistos[nome] += 1
+            nome = f"{nome}.{vistos[nome]}"
+        vistos.setdefault(nome, 0)
+        nomes.append(nome)
+    return nomes
+
+def _valor_celula(valor):
+    """Mesma conversão do leitor openpyxl do pandas: número inteiro em float vira int."""
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+def _blocos_xlsx(conteudo, usecols, tamanho_bloco):
+    from openpyxl import load_workbook
+
+    livro = load_workbook(BytesIO(conteudo), read_only=True, data_only=True)
+    try:
+        aba = livro.worksheets[0]
+        aba.reset_dimensions()  # a dimensão gravada no arquivo pode estar errada; lê até a última linha
+        linhas = aba.iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        nomes = _nomes_colunas(cabecalho)
+        posicoes = [i for i, nome in enumerate(nomes) if usecols is None or usecols(nome)]
+        colunas = [nomes[i] for i in posicoes]
+
+        bloco, vazias, inicio = [], [], 0
+        for linha in linhas:
+            valores = [_valor_celula(linha[i]) if i < len(linha) else None for i in posicoes]
+            if all(v is None for v in linha):
+                vazias.append(valores)  # linhas vazias só contam se vier uma preenchida depois (como no read_excel)
+                continue
+            bloco.extend(vazias)
+            vazias.clear()
+            bloco.append(valores)
+            if len(bloco) >= tamanho_bloco:
+                yield pd.DataFrame(bloco, columns=colunas, index=pd.RangeIndex(inicio, inicio + len(bloco)))
+                inicio += len(bloco)
+                bloco = []
+        if bloco or not inicio:
+            yield pd.DataFrame(bloco, columns=colunas, index=pd.RangeIndex(inicio, inicio + len(bloco)))
+    finally:
+        livro.close()
+
+def _separador_csv(conteudo: bytes) -> str:
+    """',' (Google Forms) ou ';' (CSV do Excel em português), pelo que aparece mais no cabeçalho."""
+    primeira = conteudo[:conteudo.find(b'\n')] if b'\n' in conteudo else conteudo
+    return ';' if primeira.count(b';') > primeira.count(b',') else ','
+
+def _sao_numeros(texto: np.ndarray) -> np.ndarray:
+    """
+    Quais textos são números (_NUMERO_CSV). O regex só roda nos que têm apenas dígitos, sinal, ponto,
+    expoente e espaços (filtro vetorizado); nomes e datas, a maioria dos valores distintos, saem antes.
+    """
+    tamanhos = np.fromiter(map(len, texto), dtype='int64', count=len(texto))
+    curtos = tamanhos <= _TAMANHO_FILTRO  # limita a matriz de caracteres; textos longos (raros) vão ao regex
+    candidatos = ~curtos
+    if curtos.any():
+        caracteres = np.array(texto[curtos].tolist(), dtype=str)
+        codigos = caracteres.view(np.uint32).reshape(len(caracteres), -1)
+        candidatos[curtos] = np.isin(codigos, _CARACTERES_NUMERO).all(axis=1)
+    numeros = np.zeros(len(texto), dtype=bool)
+    posicoes = np.flatnonzero(candidatos)
+    numeros[posicoes] = [_NUMERO_CSV.fullmatch(texto[i]) is not None for i in posicoes]
+    return numeros
+
+def _tipar_csv(bloco: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tipos do bloco CSV decididos valor a valor: o read_csv infere os de cada bloco ('539' vira 539 num
+    bloco só de números e continua texto num bloco com '00:10:00'), e o resultado dependeria de onde
+    caem os cortes. Nas colunas que ficaram como texto, cada valor distinto que é um número vira int/float.
+    """
+    for coluna in bloco.columns:
+        if bloco[coluna].dtype != object:
+            continue  # o read_csv já leu a coluna inteira como número
+        codigos, unicos = pd.factorize(bloco[coluna])
+        unicos = np.asarray(unicos, dtype=object)
+        posicoes = np.flatnonzero(_sao_numeros(unicos))
+        if not len(posicoes):
+            continue  # só texto
+        inteiro = np.array([_INTEIRO_CSV.fullmatch(unicos[i]) is not None for i in posicoes], dtype=bool)
+        valores = np.append(unicos, np.nan)
+        valores[posicoes[inteiro]] = [int(v) for v in unicos[posicoes[inteiro]]]  # int: sem perder dígitos no float
+        valores[posicoes[~inteiro]] = [float(v) for v in unicos[posicoes[~inteiro]]]
+        bloco[coluna] = pd.Series(valores[codigos], index=bloco.index).infer_objects()
+    return bloco
+
+def ler_em_blocos(conteudo: bytes, formato='xlsx', usecols=None, tamanho_bloco=TAMANHO_BLOCO_LEITURA):
+    """
+    Gera DataFrames de até tamanho_bloco linhas da primeira aba (xlsx) ou do CSV (formato='csv'),
+    com o índice contínuo entre os blocos (0..n-1, como numa leitura inteira). usecols: função
+    nome -> bool, aplicada ao cabeçalho. A memória depende do bloco, não do tamanho do arquivo.
+    O resultado não depende de tamanho_bloco (no CSV, os tipos são decididos por valor).
+    """
+    if formato == 'csv':
+        with pd.read_csv(BytesIO(conteudo), sep=_separador_csv(conteudo), encoding='utf-8-sig', usecols=usecols,
+                         chunksize=tamanho_bloco) as leitor:
+            for bloco in leitor:
+                yield _tipar_csv(bloco)
+        return
+    yield from _blocos_xlsx(conteudo, usecols, tamanho_bloco)
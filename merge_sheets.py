@@ -4,8 +4,83 @@ import streamlit as st
 import pandas as pd
 from io import BytesIO
 from dinamic_table import criar_tabela_dinamica, gerar_grafico
-
-
+from cache_resultados import MAX_ENTRADAS, hash_upload, ler_artefato, ler_excel
+import artefatos
+from perfil import etapa, medir
+from previa import previa
+
+
+# Nome das colunas que você deseja extrair
+colunas_desejadas = [
+    "Ano", "Nome", "Escola", "Pontuação", "Tempo", 
+    "Se for aluno com deficiência/transtorno:", "Etapa de Classificação"
+]
+
+# Coluna acrescentada ao resultado com o nome da aba de onde veio cada linha
+COLUNA_ABA = "Aba de Origem"
+TIPO_ARTEFATO = 'combinado'
+
+def _maiusculas(df, colunas):
+    """Converte para maiúsculas, coluna a coluna, só os textos das colunas object (números/horas ficam como estão)."""
+    for col in colunas:
+        serie = df[col]
+        if serie.dtype != object:
+            continue
+        if pd.api.types.infer_dtype(serie, skipna=True) not in ('string', 'mixed', 'mixed-integer'):
+            continue  # nenhum texto na coluna
+        maiusc = serie.str.upper()  # não-textos viram NaN aqui...
+        df[col] = maiusc.where(maiusc.notna(), serie)  # ...e voltam ao valor original
+    return df
+
+@medir('combinar_abas', linhas=len)
+def combinar_abas(all_sheets):
+    """Empilha todas as abas (ignorando as 2 linhas de cabeçalho de cada uma) em um único DataFrame.
+
+    As abas são juntadas com um só pd.concat, então o custo é linear no total de linhas
+    mesmo com centenas de abas. A última coluna (COLUNA_ABA) guarda o nome da aba de origem.
+    """
+    partes = []
+    for sheet_name, data in all_sheets.items():
+        # Ignorar as duas primeiras linhas
+        data = data.iloc[2:]
+
+        # Renomear as colunas para garantir que estamos pegando as corretas
+        data = data.set_axis(colunas_desejadas, axis=1)
+        data[COLUNA_ABA] = sheet_name
+        partes.append(data)
+
+    if not partes:
+        return pd.DataFrame(columns=colunas_desejadas + [COLUNA_ABA])
+
+    all_data = pd.concat(partes, ignore_index=True)
+
+    # Converter todos os textos para maiúsculas (a coluna da aba mantém o nome original)
+    return _maiusculas(all_data, colunas_desejadas)
+
+def dados_do_artefato(artefato: artefatos.Artefato) -> pd.DataFrame:
+    """Os dados combinados guardados num artefato desta página (ValueError para o de outra página)."""
+    if artefato.tipo != TIPO_ARTEFATO:
+        raise ValueError(f"Artefato gerado pela página '{artefato.tipo}'; aqui são esperados os dados combinados.")
+    return artefato.tabela
+
+# Combina as abas (cacheado pelo hash do upload: widgets não refazem o trabalho)
+@st.cache_data(max_entries=MAX_ENTRADAS, show_spinner="Combinando abas...")
+def _combinar_cache(chave, _all_sheets):
+    return combinar_abas(_all_sheets)
+
+# Gera o XLSX em memória (cacheado pelo hash do upload + aba/índice)
+@st.cache_data(max_entries=MAX_ENTRADAS, show_spinner=False)
+def _xlsx_cache(chave, sheet_name, index, _df):
+    xlsx_buffer = BytesIO()  # Criar um buffer em memória
+    with etapa(f'exportacao xlsx ({sheet_name})', linhas=len(_df)), \
+            pd.ExcelWriter(xlsx_buffer, engine='openpyxl') as writer:
+        _df.to_excel(writer, index=index, sheet_name=sheet_name)
+    return xlsx_buffer.getvalue()
+
+@st.cache_data(max_entries=MAX_ENTRADAS, show_spinner=False)
+def _parquet_cache(chave, _df):
+    with etapa('exportacao parquet', linhas=len(_df)):
+        return artefatos.exportar(_df, TIPO_ARTEFATO)
 
 # Função principal
 def main():
@@ -26,39 +101,31 @@ def main():
     st.table(exemplo_df)
 
     # Carregar o arquivo Excel via upload
-    uploaded_file = st.file_uploader("Carregue o arquivo do Google Sheets em formato Excel (.xlsx)", type="xlsx")
+    uploaded_file = st.file_uploader("Carregue o arquivo do Google Sheets em formato Excel (.xlsx) ou os dados "
+                                     "combinados em Parquet", type=["xlsx", artefatos.EXTENSAO])
 
     if uploaded_file is not None:
-        # Nome das colunas que você deseja extrair
-        colunas_desejadas = [
-            "Ano", "Nome", "Escola", "Pontuação", "Tempo", 
-            "Se for aluno com deficiência/transtorno:", "Etapa de Classificação"
-        ]
-
-        # Inicializar um DataFrame vazio para armazenar todos os dados
-        all_data = pd.DataFrame(columns=colunas_desejadas)
-
-        # Carregar todas as sheets do arquivo
-        all_sheets = pd.read_excel(uploaded_file, sheet_name=None, header=None)  # Usando header=None para ignorar as linhas de cabeçalho
-
-        # Iterar sobre cada sheet
-        for sheet_name, data in all_sheets.items():
-            # Ignorar as duas primeiras linhas
-            data = data.iloc[2:].reset_index(drop=True)
-
-            # Renomear as colunas para garantir que estamos pegando as corretas
-            data.columns = colunas_desejadas
-
-            # Converter todos os dados para maiúsculas
-            data = data.applymap(lambda x: x.upper() if isinstance(x, str) else x)
+        chave = hash_upload(uploaded_file)
+        conteudo = uploaded_file.getvalue()
+
+        if artefatos.eh_artefato(conteudo):
+            # dados já combinados (baixados desta página): nada a refazer
+            try:
+                all_data = dados_do_artefato(ler_artefato(chave, conteudo))
+            except (ImportError, ValueError) as e:
+                st.error(f"Erro ao ler o arquivo: {e}")
+                return
+        else:
+            # Carregar todas as sheets do arquivo
+            all_sheets = ler_excel(chave, conteudo, sheet_name=None, header=None,  # Usando header=None para ignorar as linhas de cabeçalho
+                                   usecols=list(range(len(colunas_desejadas))))  # só as 7 colunas desejadas
 
-            # Concatenar a sheet ao DataFrame principal
-            all_data = pd.concat([all_data, data], ignore_index=True)
+            all_data = _combinar_cache(chave, all_sheets)
 
         # Exibir os dados combinados no Streamlit
         if not all_data.empty:
             st.write("Dados combinados de todas as sheets:")
-            st.dataframe(all_data)
+            previa(all_data, chave, 'merge_sheets')
 
             # Botão para download do DataFrame combinado em CSV
             csv = all_data.to_csv(index=False).encode('utf-8')
@@ -70,11 +137,7 @@ def main():
             )
 
             # Gerar o arquivo XLSX em memória e permitir o download
-            xlsx_buffer = BytesIO()  # Criar um buffer em memória
-            with pd.ExcelWriter(xlsx_buffer, engine='openpyxl') as writer:
-                all_data.to_excel(writer, index=False, sheet_name='Dados Combinados')
-
-            xlsx_buffer.seek(0)  # Voltar para o início do buffer após escrever
+            xlsx_buffer = _xlsx_cache(chave, 'Dados Combinados', False, all_data)
 
             st.download_button(
                 label="Baixar dados combinados em XLSX",
@@ -83,8 +146,18 @@ def main():
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             )
 
+            # Parquet tipado: reenviado a esta página, é lido sem refazer a combinação
+            if artefatos.PYARROW_DISPONIVEL:
+                st.download_button(
+                    label="Baixar dados combinados em Parquet",
+                    data=_parquet_cache(chave, all_data),
+                    file_name=f"dados_combinados.{artefatos.EXTENSAO}",
+                    mime=artefatos.MIME,
+                )
+
             # Gerar a tabela dinâmica com os dados combinados
-            tabela_dinamica = criar_tabela_dinamica(all_data)
+            with etapa('tabela dinamica', linhas=len(all_data)):
+                tabela_dinamica = criar_tabela_dinamica(all_data)
 
             # Exibir a tabela dinâmica no Streamlit
             st.write("Tabela Dinâmica de Alunos por Escola e Ano:")
@@ -100,11 +173,7 @@ def main():
             )
 
             # Gerar o arquivo XLSX da tabela dinâmica em memória e permitir o download
-            xlsx_tabela_buffer = BytesIO()  # Criar um buffer para a tabela dinâmica
-            with pd.ExcelWriter(xlsx_tabela_buffer, engine='openpyxl') as writer:
-                tabela_dinamica.to_excel(writer, index=True, sheet_name='Tabela Dinâmica')
-
-            xlsx_tabela_buffer.seek(0)  # Voltar para o início do buffer após escrever
+            xlsx_tabela_buffer = _xlsx_cache(chave, 'Tabela Dinâmica', True, tabela_dinamica)
 
             st.download_button(
                 label="Baixar Tabela Dinâmica em XLSX",
@@ -0,0 +1,226 @@
+# Medição das etapas das páginas (tempo, linhas e memória)
+# - with etapa('leitura') as m: ...; m.linhas = len(df)    ou    @medir('classificacao', linhas=len)
+# - Cada etapa vira um log estruturado (logger 'tabulacao.perfil', campos chave=valor) e,
+#   dentro de coletar(), entra no relatório da execução que o painel() mostra
+# - Memória: pico do RSS do processo (barato, sempre) e, com coletar(memoria=True), o pico
+#   alocado pelo Python dentro da etapa (tracemalloc: deixa a execução mais lenta). O tracemalloc
+#   é do processo inteiro: uma sessão por vez o usa (_TRAVA_MEMORIA); as outras ficam sem o pico
+# - perfilar(True) roda o cProfile durante uma execução e devolve o dump (.prof) e um resumo
+# Etapas que rodam em outra thread/processo (salvar_excels em 'threads'/'processos') saem só
+# no log; no relatório entram dentro da etapa que as envolve.
+
+import contextlib
+import contextvars
+import cProfile
+import functools
+import io
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import NamedTuple
+
+import pandas as pd
+import streamlit as st
+
+try:
+    import resource
+except ImportError:  # Windows: sem pico de RSS
+    resource = None
+
+logger = logging.getLogger('tabulacao.perfil')
+if os.environ.get('TABULACAO_LOG_PERFIL'):
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+MB = 2 ** 20
+LINHAS_RESUMO_PERFIL = 40
+
+
+class MedicaoEtapa(NamedTuple):
+    caminho: str                  # etapas externas + etapa, ex.: 'escrita/abas por escola/banner'
+    nivel: int
+    inicio: float                 # time.perf_counter() no início
+    segundos: float
+    linhas: int | None
+    pico_python_mb: float | None  # só com tracemalloc ligado
+    rss_mb: float | None          # pico do RSS do processo ao fim da etapa
+
+
+class Relatorio(list):
+    """MedicaoEtapa da execução, em ordem de término; erro: por que o pico do Python não foi medido."""
+    erro = ''
+
+
+_RELATORIO = contextvars.ContextVar('perfil_relatorio', default=None)
+_PILHA = contextvars.ContextVar('perfil_pilha', default=())
+_MEMORIA = contextvars.ContextVar('perfil_memoria', default=False)  # este contexto é o dono do tracemalloc
+_TRAVA_MEMORIA = threading.Lock()
+
+
+def pico_rss_mb():
+    """Maior RSS do processo até agora, em MB (None no Windows)."""
+    try:  # Linux: VmHWM é só deste processo (ru_maxrss herda o pico do processo pai no spawn)
+        with open('/proc/self/status') as f:
+            for linha in f:
+                if linha.startswith('VmHWM:'):
+                    return int(linha.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / MB if sys.platform == 'darwin' else pico / 1024  # macOS em bytes, Linux em KB
+
+
+@contextlib.contextmanager
+def etapa(nome: str, linhas=None):
+    """Mede o bloco; o objeto devolvido aceita .linhas quando o tamanho só é conhecido no fim."""
+    medicao = SimpleNamespace(nome=nome, linhas=linhas, pico=0)
+    pilha = _PILHA.get()
+    memoria = _MEMORIA.get() and tracemalloc.is_tracing()  # reset_peak de outra sessão estragaria o pico da dona
+    if memoria:
+        if pilha:  # o pico até aqui pertence à etapa externa
+            pilha[-1].pico = max(pilha[-1].pico, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        inicio_mem = tracemalloc.get_traced_memory()[0]
+    token = _PILHA.set(pilha + (medicao,))
+    inicio = time.perf_counter()
+    try:
+        yield medicao
+    finally:
+        segundos = time.perf_counter() - inicio
+        _PILHA.reset(token)
+        pico_python = None
+        if memoria and tracemalloc.is_tracing():
+            pico = max(medicao.pico, tracemalloc.get_traced_memory()[1])
+            pico_python = max(pico - inicio_mem, 0) / MB
+            if pilha:
+                pilha[-1].pico = max(pilha[-1].pico, pico)
+        caminho = '/'.join([m.nome for m in pilha] + [nome])
+        _registrar(MedicaoEtapa(caminho, len(pilha), inicio, segundos, medicao.linhas, pico_python,
+                                pico_rss_mb()))
+
+
+def _registrar(medicao: MedicaoEtapa):
+    relatorio = _RELATORIO.get()
+    if relatorio is not None:
+        relatorio.append(medicao)
+    if logger.isEnabledFor(logging.INFO):
+        campos = {k: (round(v, 4) if isinstance(v, float) else v) for k, v in medicao._asdict().items()}
+        logger.info(' '.join(f"{k}={v!r}" if isinstance(v, str) else f"{k}={v}" for k, v in campos.items()),
+                    extra={'perfil': campos})
+
+
+def medir(nome=None, linhas=None):
+    """Decorador: mede cada chamada como uma etapa; linhas(resultado) informa o tamanho processado."""
+    def decorador(func):
+        rotulo = nome or func.__name__
+
+        @functools.wraps(func)
+        def medida(*args, **kwargs):
+            with etapa(rotulo) as m:
+                resultado = func(*args, **kwargs)
+                if linhas is not None:
+                    m.linhas = linhas(resultado)
+                return resultado
+        return medida
+    return decorador
+
+
+@contextlib.contextmanager
+def coletar(memoria=False):
+    """
+    Relatório (Relatorio, lista de MedicaoEtapa) das etapas executadas no bloco; memoria=True liga o
+    tracemalloc. Se outra sessão já estiver medindo a memória, esta sai sem o pico do Python
+    (relatorio.erro diz por quê) e não mexe no tracemalloc da outra; só desliga quem ligou.
+    """
+    relatorio = Relatorio()
+    token = _RELATORIO.set(relatorio)
+    dono = memoria and _TRAVA_MEMORIA.acquire(blocking=False)
+    if memoria and not dono:
+        relatorio.erro = "outra execução está medindo a memória agora; tente de novo em seguida."
+    ligou = dono and not tracemalloc.is_tracing()  # já ligado por fora (python -X tracemalloc): fica ligado
+    if ligou:
+        tracemalloc.start()
+    token_memoria = _MEMORIA.set(dono)
+    try:
+        yield relatorio
+    finally:
+        _MEMORIA.reset(token_memoria)
+        _RELATORIO.reset(token)
+        if ligou:
+            tracemalloc.stop()
+        if dono:
+            _TRAVA_MEMORIA.release()
+
+
+@contextlib.contextmanager
+def perfilar(ativo=True):
+    """cProfile do bloco. No fim: .dump (bytes de um .prof, para snakeviz/pstats), .texto e .erro."""
+    resultado = SimpleNamespace(dump=b'', texto='', erro='')
+    if not ativo:
+        yield resultado
+        return
+    perfil = cProfile.Profile()
+    try:
+        perfil.enable()
+    except ValueError as e:  # outro profiler ativo (ex.: outra sessão perfilando ao mesmo tempo)
+        resultado.erro = str(e)
+        yield resultado
+        return
+    try:
+        yield resultado
+    finally:
+        perfil.disable()
+        perfil.create_stats()
+        resultado.dump = marshal.dumps(perfil.stats)  # mesmo formato do dump_stats
+        texto = io.StringIO()
+        pstats.Stats(perfil, stream=texto).sort_stats('cumulative').print_stats(LINHAS_RESUMO_PERFIL)
+        resultado.texto = texto.getvalue()
+
+
+def tabela(relatorio) -> pd.DataFrame:
+    """Relatório agrupado por caminho (etapas repetidas, como o banner de cada aba, somam)."""
+    colunas = ['Etapa', 'Chamadas', 'Tempo (s)', 'Linhas', 'Pico Python (MB)', 'Pico RSS (MB)']
+    if not relatorio:
+        return pd.DataFrame(columns=colunas)
+    df = pd.DataFrame(relatorio, columns=MedicaoEtapa._fields)
+    grupos = df.groupby('caminho', sort=False)
+    resumo = pd.DataFrame({
+        'inicio': grupos['inicio'].min(),
+        'nivel': grupos['nivel'].first(),
+        'Chamadas': grupos.size(),
+        'Tempo (s)': grupos['segundos'].sum().round(3),
+        'Linhas': grupos['linhas'].sum(min_count=1).astype('Int64'),
+        'Pico Python (MB)': grupos['pico_python_mb'].max().round(1),
+        'Pico RSS (MB)': grupos['rss_mb'].max().round(1),
+    }).reset_index()
+    # pela ordem de início: a etapa externa (registrada depois das internas) vem antes delas
+    resumo = resumo.sort_values('inicio', kind='stable')
+    resumo['Etapa'] = ['· ' * n + c.rsplit('/', 1)[-1] for n, c in zip(resumo['nivel'], resumo['caminho'])]
+    return resumo[colunas]
+
+
+def painel(relatorio, perfil=None):
+    """Painel recolhível com as etapas desta execução e, se houver, o perfil do cProfile."""
+    with st.expander("Desempenho desta execução"):
+        if relatorio:
+            st.dataframe(tabela(relatorio), hide_index=True)
+        else:
+            st.write("Nenhuma etapa medida nesta execução (resultados reaproveitados do cache).")
+        if getattr(relatorio, 'erro', ''):
+            st.warning(f"Pico de memória do Python não medido: {relatorio.erro}")
+        if perfil is not None and perfil.erro:
+            st.warning(f"Perfil não gerado: {perfil.erro}")
+        elif perfil is not None and perfil.dump:
+            st.download_button("Baixar perfil (cProfile .prof)", perfil.dump, "perfil.prof",
+                               "application/octet-stream")
+            st.code(perfil.texto)
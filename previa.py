@@ -0,0 +1,104 @@
+# Prévia paginada das tabelas grandes (st.dataframe só da página visível)
+# - st.dataframe(df) inteiro manda todas as linhas para o navegador a cada rerun; com
+#   centenas de milhares de linhas a página trava e a memória do servidor dispara
+# - Aqui filtro (escola/ano), ordenação e paginação são feitos no servidor, sobre o
+#   DataFrame que já está no cache, e só a fatia da página é enviada
+# - As posições filtradas/ordenadas ficam em st.cache_data pela chave do DataFrame +
+#   filtros + ordenação: trocar de página não refaz nada
+# - Em vez do despejo das linhas, a prévia mostra contagens (linhas, escolas, por ano)
+
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from cache_resultados import MAX_ENTRADAS
+from ranking import posto_valores
+
+FILTROS_PADRAO = ('Escola', 'Ano')
+LINHAS_POR_PAGINA = (25, 50, 100, 200)
+SEM_ORDENACAO = '(ordem da tabela)'
+
+
+class VisaoPrevia(NamedTuple):
+    posicoes: np.ndarray  # linhas (iloc) que passam nos filtros, na ordem pedida
+    contagens: dict       # coluna de filtro -> Series com a quantidade de linhas por valor
+
+
+def _contar(valores: pd.Series) -> pd.Series:
+    codigos, unicos = pd.factorize(valores, sort=True)  # tipos misturados não quebram a ordenação
+    return pd.Series(np.bincount(codigos[codigos >= 0], minlength=len(unicos)), index=unicos)
+
+
+@st.cache_data(max_entries=MAX_ENTRADAS, show_spinner=False)
+def _opcoes(chave, coluna, _df) -> list:
+    """Valores distintos (ordenados) de uma coluna, para o filtro."""
+    return pd.factorize(_df[coluna].dropna(), sort=True)[1].tolist()
+
+
+@st.cache_data(max_entries=MAX_ENTRADAS * 4, show_spinner=False)
+def _visao(chave, filtros, ordenar_por, crescente, _df) -> VisaoPrevia:
+    """filtros: ((coluna, (valores...)), ...); sem valores = sem filtro naquela coluna."""
+    mascara = np.ones(len(_df), dtype=bool)
+    for coluna, valores in filtros:
+        if valores:
+            mascara &= _df[coluna].isin(valores).to_numpy()
+    posicoes = np.flatnonzero(mascara)
+    if ordenar_por is not None:
+        posto = posto_valores(_df[ordenar_por].iloc[posicoes], ascending=crescente)  # NaN por último
+        posicoes = posicoes[np.argsort(posto, kind='stable')]
+    contagens = {coluna: _contar(_df[coluna].iloc[posicoes]) for coluna, _ in filtros}
+    return VisaoPrevia(posicoes, contagens)
+
+
+def previa(df: pd.DataFrame, chave, nome: str, filtros=FILTROS_PADRAO, ocultar=()):
+    """
+    Prévia paginada de df. chave identifica o conteúdo de df (hash do upload + parâmetros) e
+    nome separa os widgets de cada página. ocultar: colunas removidas só da fatia exibida.
+    """
+    filtros = [c for c in filtros if c in df.columns]
+    colunas = st.columns(len(filtros)) if filtros else []
+    escolhidos = []
+    for coluna, lugar in zip(filtros, colunas):
+        with lugar:
+            valores = st.multiselect(f"Filtrar por {coluna}", _opcoes(chave, coluna, df),
+                                     key=f"previa_{nome}_filtro_{coluna}")
+        escolhidos.append((coluna, tuple(valores)))
+
+    col_ordem, col_sentido, col_tamanho = st.columns(3)
+    visiveis = [c for c in df.columns if c not in ocultar]
+    with col_ordem:
+        ordenar_por = st.selectbox("Ordenar por", [SEM_ORDENACAO] + visiveis, key=f"previa_{nome}_ordem")
+    with col_sentido:
+        decrescente = st.checkbox("Decrescente", value=False, key=f"previa_{nome}_decrescente")
+    with col_tamanho:
+        por_pagina = st.selectbox("Linhas por página", LINHAS_POR_PAGINA, index=1, key=f"previa_{nome}_tamanho")
+
+    visao = _visao(chave, tuple(escolhidos), None if ordenar_por == SEM_ORDENACAO else ordenar_por,
+                   not decrescente, df)
+    total = len(visao.posicoes)
+
+    metricas = st.columns(1 + len(filtros))
+    metricas[0].metric("Linhas", total,
+                       help=None if total == len(df) else f"de {len(df)} no total")
+    for coluna, lugar in zip(filtros, metricas[1:]):
+        lugar.metric(f"{coluna} (distintos)", int((visao.contagens[coluna] > 0).sum()))
+    if 'Ano' in visao.contagens and len(visao.contagens['Ano']):
+        with st.expander("Quantidade de linhas por Ano"):
+            st.dataframe(visao.contagens['Ano'].rename('Linhas').rename_axis('Ano').to_frame())
+
+    if total == 0:
+        st.write("Nenhuma linha com os filtros escolhidos.")
+        return
+
+    paginas = -(-total // por_pagina)
+    chave_pagina = f"previa_{nome}_pagina"
+    if st.session_state.get(chave_pagina, 1) > paginas:  # filtros mudaram: volta ao intervalo válido
+        st.session_state[chave_pagina] = paginas
+    pagina = st.number_input(f"Página (1 a {paginas})", min_value=1, max_value=paginas, step=1, key=chave_pagina)
+
+    inicio = (pagina - 1) * por_pagina
+    fatia = df.iloc[visao.posicoes[inicio:inicio + por_pagina]]
+    st.dataframe(fatia.drop(columns=[c for c in ocultar if c in fatia.columns]), hide_index=True)
+    st.caption(f"Linhas {inicio + 1}–{inicio + len(fatia)} de {total}.")
@@ -0,0 +1,152 @@
+# Ranking dos melhores por grupo (escola, ano...) sem ordenar tudo
+# - Cada critério (ano, pontuação, tempo) vira um posto inteiro: só os valores
+#   DISTINTOS são ordenados (poucas pontuações/tempos diferentes), o resto é factorize
+# - Os postos formam uma chave int64 única (menor = melhor)
+# - O top-N sai de até N passadas de "mínimo por grupo" sobre a chave: O(linhas × N),
+#   em vez do sort completo de cada aba; empates são tratados explicitamente
+# - Várias abas entram juntas (só as colunas-chave são concatenadas)
+
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+METODOS_POSICAO = ('competicao', 'densa')  # 1,1,3 x 1,1,2
+
+
+class SelecaoTopN(NamedTuple):
+    """Linhas escolhidas (posições no array de entrada), na ordem de classificação de cada grupo."""
+    posicoes: np.ndarray
+    competicao: np.ndarray  # posição estilo competição (empatados dividem; a seguinte pula)
+    densa: np.ndarray       # posição densa (empatados dividem; a seguinte não pula)
+
+
+def posto_valores(serie: pd.Series, ascending=True) -> np.ndarray:
+    """
+    Posto denso (int64) de cada valor na ordem do sort_values (tipos misturados: números antes
+    de textos, como no pandas); NaN fica por último. Só os valores distintos são ordenados.
+    """
+    codigos, unicos = pd.factorize(serie, sort=True)
+    codigos = codigos.astype('int64')
+    if not ascending:
+        codigos = np.where(codigos >= 0, len(unicos) - 1 - codigos, codigos)
+    return np.where(codigos >= 0, codigos, len(unicos))  # código -1 (NaN) -> último posto
+
+
+def chave_composta(postos) -> np.ndarray:
+    """Combina postos (critério mais importante primeiro) numa chave int64 lexicográfica."""
+    chave = np.zeros(len(postos[0]), dtype='int64')
+    for posto in postos:
+        base = int(posto.max()) + 1 if len(posto) else 1
+        if chave.size and int(chave.max()) >= np.iinfo('int64').max // base:
+            chave = np.unique(chave, return_inverse=True)[1].astype('int64')  # recompacta antes de estourar
+        chave = chave * base + posto
+    return chave
+
+
+def selecionar_top_n(grupos: np.ndarray, chave: np.ndarray, top_n: int, empates=False) -> SelecaoTopN:
+    """
+    Top-N de cada grupo pela chave (menor = melhor), com até top_n passadas de mínimo por grupo.
+    grupos: código int por linha (negativo = linha fora de qualquer grupo).
+    empates=False: no máximo top_n linhas por grupo; empate na fronteira é decidido pela ordem das linhas.
+    empates=True: quem empata com a posição top_n também entra.
+    """
+    n_grupos = int(grupos.max()) + 1 if len(grupos) else 0
+    ativo = grupos >= 0
+    escolhidos = np.zeros(n_grupos, dtype='int64')  # linhas já escolhidas por grupo
+    passos = np.zeros(n_grupos, dtype='int64')      # níveis de empate já escolhidos por grupo
+    competicao = np.zeros(len(grupos), dtype='int64')
+    densa = np.zeros(len(grupos), dtype='int64')
+    sentinela = np.iinfo('int64').max
+
+    for _ in range(top_n):
+        if not ativo.any():
+            break
+        idx = np.flatnonzero(ativo)
+        g = grupos[idx]
+        minimo = np.full(n_grupos, sentinela, dtype='int64')
+        np.minimum.at(minimo, g, chave[idx])
+        vencedores = idx[chave[idx] == minimo[g]]
+        gv = grupos[vencedores]
+
+        if not empates:
+            # respeita a vaga restante do grupo: primeiros pela ordem das linhas
+            ordem_no_grupo = pd.Series(gv).groupby(gv, sort=False).cumcount().to_numpy()
+            vencedores = vencedores[ordem_no_grupo < top_n - escolhidos[gv]]
+            gv = grupos[vencedores]
+
+        competicao[vencedores] = escolhidos[gv] + 1
+        densa[vencedores] = passos[gv] + 1
+        np.add.at(escolhidos, gv, 1)
+        passos[np.unique(gv)] += 1
+
+        ativo[vencedores] = False
+        ativo &= escolhidos[np.maximum(grupos, 0)] < top_n  # grupo completo sai
+
+    posicoes = np.flatnonzero(competicao)
+    ordem = np.lexsort((posicoes, chave[posicoes], grupos[posicoes]))
+    posicoes = posicoes[ordem]
+    return SelecaoTopN(posicoes, competicao[posicoes], densa[posicoes])
+
+
+def top_n_por_grupo(df: pd.DataFrame, grupos, ordem, top_n: int, ascending=None, empates=False,
+                    metodo='competicao', coluna_posicao='Posição') -> pd.DataFrame:
+    """
+    Equivalente a df.sort_values(grupos + ordem).groupby(grupos).head(top_n), sem ordenar o df inteiro,
+    com a coluna coluna_posicao (método 'competicao' ou 'densa'). Linhas com grupo NaN ficam de fora.
+    """
+    if metodo not in METODOS_POSICAO:
+        raise ValueError(f"Método de posição inválido: {metodo!r}. Use um de {METODOS_POSICAO}.")
+    ascending = [True] * len(ordem) if ascending is None else list(ascending)
+    # códigos densos dos grupos, na ordem dos valores (a saída sai agrupada nessa ordem)
+    codigos_grupo = posto_valores(pd.Series(chave_composta([posto_valores(df[c]) for c in grupos])))
+    codigos_grupo[df[grupos].isna().any(axis=1).to_numpy()] = -1
+    chave = chave_composta([posto_valores(df[c], asc) for c, asc in zip(ordem, ascending)])
+
+    selecao = selecionar_top_n(codigos_grupo, chave, top_n, empates)
+    resultado = df.iloc[selecao.posicoes].copy()
+    resultado[coluna_posicao] = selecao.competicao if metodo == 'competicao' else selecao.densa
+    return resultado
+
+
+def top_n_por_aba(abas: dict, grupos, ordem, top_n: int, ascending=None, empates=False, metodo='competicao',
+                  coluna_posicao='Posição') -> dict:
+    """
+    top_n_por_grupo de cada aba ({nome: DataFrame}) numa única passada vetorizada: só as colunas
+    usadas na chave são concatenadas; cada aba devolve as próprias linhas (dtypes intactos).
+    """
+    nomes = list(abas)
+    if not nomes:
+        return {}
+    tamanhos = np.array([len(abas[nome]) for nome in nomes], dtype='int64')
+    inicios = np.concatenate(([0], np.cumsum(tamanhos)))
+    chaves = pd.concat([abas[nome][list(grupos) + list(ordem)] for nome in nomes], ignore_index=True)
+    chaves['__aba'] = np.repeat(np.arange(len(nomes)), tamanhos)
+
+    selecionadas = top_n_por_grupo(chaves, ['__aba'] + list(grupos), ordem, top_n, ascending=ascending,
+                                   empates=empates, metodo=metodo, coluna_posicao=coluna_posicao)
+    posicoes = selecionadas.index.to_numpy()
+    aba = selecionadas['__aba'].to_numpy()
+    posicao = selecionadas[coluna_posicao].to_numpy()
+    cortes = np.searchsorted(aba, np.arange(len(nomes) + 1))  # saída vem agrupada por aba
+
+    resultado = {}
+    for i, nome in enumerate(nomes):
+        fatia = slice(cortes[i], cortes[i + 1])
+        df = abas[nome].iloc[posicoes[fatia] - inicios[i]].copy()
+        df[coluna_posicao] = posicao[fatia]
+        resultado[nome] = df
+    return resultado
+
+
+def posicoes_em_ordem(grupos: np.ndarray, chave: np.ndarray) -> np.ndarray:
+    """Posição estilo competição (1, 1, 3) de linhas JÁ ordenadas por (grupo, chave)."""
+    n = len(chave)
+    if n == 0:
+        return np.zeros(0, dtype='int64')
+    linhas = np.arange(n)
+    novo_grupo = np.r_[True, grupos[1:] != grupos[:-1]]
+    novo_valor = novo_grupo | np.r_[True, chave[1:] != chave[:-1]]
+    inicio_grupo = np.maximum.accumulate(np.where(novo_grupo, linhas, 0))
+    inicio_empate = np.maximum.accumulate(np.where(novo_valor, linhas, 0))
+    return inicio_empate - inicio_grupo + 1
@@ -4,15 +4,134 @@
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 from io import BytesIO
+from estilos_excel import obter_formato
+from cache_resultados import MAX_ENTRADAS, hash_upload, ler_todas_abas
+import artefatos
+from duracao import COLUNA_TEMPO_SEG, tempo_em_segundos
+from ranking import chave_composta, posicoes_em_ordem, posto_valores, selecionar_top_n
+from tabulacaoOlimpiadasEParalimpada import ordem_ano_codigos, padronizar_nome_aluno_serie, padronizar_pontuacao_serie
+from perfil import etapa, medir
+from previa import previa
 
-# Função para carregar e ordenar os dados de uma sheet específica
-def carregar_e_ordenar_dados_por_sheet(df, etapa):
-    # Adicionar coluna para identificar a fase
-    df['Etapa'] = etapa
-    
-    # Retorna o DataFrame sem ordenação aqui para realizar a ordenação final após concatenação
-    return df
+ETAPAS = ('1ª CLASSIFICATÓRIA', '2ª CLASSIFICATÓRIA')
+COLUNAS_OBRIGATORIAS = ["Ano", "Nome", "Pontuação", "Tempo"]
+ABAS_IGNORADAS = {'GERAL'}  # aba-resumo da Tabulação: as abas por escola já trazem todos os alunos
+ABA_RANKING = 'RANKING GERAL'
+ESTILO_TITULO = {'align': 'center', 'bold': True, 'bg_color': '#4F81BD', 'font_color': 'white'}
+
+# Junta as duas etapas de todas as escolas numa única tabela (colunas Aba e Etapa)
+# Devolve (tabela, colunas de cada escola, avisos); os DataFrames de entrada não são alterados
+@medir('montar_tabela_longa', linhas=lambda r: len(r[0]))
+def montar_tabela_longa(sheets_1, sheets_2):
+    avisos = []
+    escolas = {}
+    for sheet_name in sheets_1.keys():
+        if sheet_name in ABAS_IGNORADAS:
+            continue
+        # Verifica se a sheet está presente em ambos os arquivos
+        if sheet_name not in sheets_2:
+            avisos.append(f"Sheet '{sheet_name}' não encontrada em ambos os arquivos.")
+            continue
+        df1, df2 = sheets_1[sheet_name], sheets_2[sheet_name]
+        faltando = [c for c in COLUNAS_OBRIGATORIAS if c not in df1.columns or c not in df2.columns]
+        if faltando:
+            avisos.append(f"Sheet '{sheet_name}' ignorada: coluna(s) {faltando} não encontrada(s).")
+            continue
+        escolas[sheet_name] = [c for c in df1.columns.union(df2.columns, sort=False) if c != 'Etapa'] + ['Etapa']
+
+    partes = [sheets[nome] for sheets in (sheets_1, sheets_2) for nome in escolas]
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS_OBRIGATORIAS + ['Etapa', 'Aba', COLUNA_TEMPO_SEG]), escolas, avisos
+
+    tamanhos = [len(p) for p in partes]
+    n_escolas = len(escolas)
+    longa = pd.concat(partes, ignore_index=True)
+    # Adicionar colunas para identificar a fase e a escola (aba de origem)
+    longa['Etapa'] = pd.Categorical.from_codes(np.repeat(np.arange(len(partes)) // n_escolas, tamanhos),
+                                               categories=list(ETAPAS))
+    longa['Aba'] = pd.Categorical.from_codes(np.repeat(np.arange(len(partes)) % n_escolas, tamanhos),
+                                             categories=list(escolas))
+    longa[COLUNA_TEMPO_SEG] = tempo_em_segundos(longa['Tempo'])
+    return longa, escolas, avisos
+
+# Uma única ordenação para todas as escolas: Aba (ordem do arquivo), Ano, Pontuação (descendente),
+# Tempo (ascendente, em segundos) e Etapa
+@medir('ordenacao', linhas=len)
+def ordenar_tabela_longa(longa):
+    return longa.sort_values(by=['Aba', "Ano", "Pontuação", COLUNA_TEMPO_SEG, "Etapa"],
+                             ascending=[True, True, False, True, True], kind='stable')
+
+# Chave de cada aluno: nome normalizado (sem acentos/espaços extras, maiúsculo) + escola (aba)
+def codigos_aluno(longa):
+    nome_normal = pd.factorize(padronizar_nome_aluno_serie(longa['Nome']))[0]
+    aluno = posto_valores(pd.Series(chave_composta([longa['Aba'].cat.codes.to_numpy().astype('int64'),
+                                                    nome_normal + 1])))
+    aluno[nome_normal < 0] = -1  # sem nome: fica fora do ranking
+    return aluno
+
+# Ranking da rede: a melhor etapa de cada aluno, com a posição por ano entre todas as escolas
+# Pontuação e Ano passam pela mesma padronização da Final ('8' = 8; '1º ANO' = '1° ANO')
+@medir('ranking_geral', linhas=len)
+def ranking_geral(longa):
+    aluno = codigos_aluno(longa)
+    pontos = padronizar_pontuacao_serie(longa['Pontuação'])
+    pontuacao = posto_valores(pontos, ascending=False)
+    tempo = longa[COLUNA_TEMPO_SEG].to_numpy().astype('int64')
+    melhor = selecionar_top_n(aluno, chave_composta([pontuacao, tempo, longa['Etapa'].cat.codes.to_numpy()]), 1)
+
+    # etapas distintas de cada aluno (duas respostas na mesma etapa contam uma vez)
+    validos = np.flatnonzero(aluno >= 0)
+    par = chave_composta([aluno[validos], longa['Etapa'].cat.codes.to_numpy()[validos]])
+    primeiros = validos[np.unique(par, return_index=True)[1]]
+    etapas_feitas = np.bincount(aluno[primeiros], minlength=int(aluno.max()) + 1 if len(aluno) else 0)
+    ranking = longa.iloc[melhor.posicoes].assign(**{'Pontuação': pontos.to_numpy()[melhor.posicoes],
+                                                    'Etapas Realizadas': etapas_feitas[aluno[melhor.posicoes]]})
+
+    ano = ordem_ano_codigos(ranking['Ano']).astype('int64')
+    chave = chave_composta([pontuacao[melhor.posicoes], tempo[melhor.posicoes]])
+    ordem = np.lexsort((np.arange(len(ranking)), chave, ano))
+    ranking = ranking.iloc[ordem]
+    ranking.insert(0, 'Posição', posicoes_em_ordem(ano[ordem], chave[ordem]))
+    return ranking.drop(columns=[COLUNA_TEMPO_SEG]).rename(columns={'Aba': 'Escola (aba)', 'Etapa': 'Melhor Etapa'})
+
+def _escrever_aba(writer, sheet_name, df, titulo):
+    # Escreve o título como cabeçalho e a tabela ordenada
+    df.to_excel(writer, sheet_name=sheet_name, index=False, startrow=1)
+    worksheet = writer.sheets[sheet_name]
+    formato = obter_formato(writer.book, ESTILO_TITULO)
+    if df.shape[1] > 1:
+        worksheet.merge_range(0, 0, 0, df.shape[1] - 1, titulo, formato)
+    else:
+        worksheet.write(0, 0, titulo, formato)
+
+# Une as duas etapas de todas as escolas; devolve (bytes do Excel, avisos, ranking geral, artefato)
+# artefato: as abas por escola em Parquet (None sem pyarrow); o RANKING GERAL sai delas de novo
+def gerar_excel_semifinal(sheets_1, sheets_2):
+    output = BytesIO()
+    longa, escolas, avisos = montar_tabela_longa(sheets_1, sheets_2)
+    ordenada = ordenar_tabela_longa(longa)
+    ranking = ranking_geral(longa) if escolas else pd.DataFrame()
+
+    # cada escola é um bloco contíguo da tabela ordenada
+    cortes = np.searchsorted(ordenada['Aba'].cat.codes.to_numpy(), np.arange(len(escolas) + 1)) if escolas else []
+    with etapa('escrita', linhas=len(ordenada)), pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        if escolas:
+            _escrever_aba(writer, ABA_RANKING, ranking, ABA_RANKING)
+        for i, (sheet_name, colunas) in enumerate(escolas.items()):
+            _escrever_aba(writer, sheet_name, ordenada.iloc[cortes[i]:cortes[i + 1]][colunas], sheet_name)
+
+    artefato = None
+    if artefatos.PYARROW_DISPONIVEL:
+        with etapa('artefato', linhas=len(ordenada)):
+            artefato = artefatos.exportar(ordenada, 'semifinal', derivadas=[COLUNA_TEMPO_SEG])
+    return output.getvalue(), avisos, ranking, artefato
+
+# Cacheado pelo hash dos dois uploads
+@st.cache_data(max_entries=MAX_ENTRADAS, show_spinner="Organizando classificatórias...")
+def _semifinal_cache(chave1, chave2, _sheets_1, _sheets_2):
+    return gerar_excel_semifinal(_sheets_1, _sheets_2)
 
 # Função principal do aplicativo
 def main():
@@ -21,38 +140,28 @@ def main():
     st.write("Carregue os arquivos Excel das 1ª e 2ª classificatórias.")
     
     # Upload dos arquivos
-    arquivo1 = st.file_uploader("Upload da 1ª Classificatória", type=["xlsx"])
-    arquivo2 = st.file_uploader("Upload da 2ª Classificatória", type=["xlsx"])
+    # .xlsx ou o artefato Parquet da Tabulação/Classificação
+    arquivo1 = st.file_uploader("Upload da 1ª Classificatória", type=["xlsx", artefatos.EXTENSAO])
+    arquivo2 = st.file_uploader("Upload da 2ª Classificatória", type=["xlsx", artefatos.EXTENSAO])
     
     # Verifica se ambos os arquivos foram carregados
     if arquivo1 and arquivo2:
         # Carrega todas as sheets em dicionários de DataFrames
-        sheets_1 = pd.read_excel(arquivo1, sheet_name=None, header=1)
-        sheets_2 = pd.read_excel(arquivo2, sheet_name=None, header=1)
+        chave1, chave2 = hash_upload(arquivo1), hash_upload(arquivo2)
+        try:
+            sheets_1 = ler_todas_abas(chave1, arquivo1.getvalue(), header=1)
+            sheets_2 = ler_todas_abas(chave2, arquivo2.getvalue(), header=1)
+        except (ImportError, ValueError) as e:
+            st.error(f"Erro ao ler os arquivos: {e}")
+            return
         
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            for sheet_name in sheets_1.keys():
-                # Verifica se a sheet está presente em ambos os arquivos
-                if sheet_name in sheets_2:
-                    # Carrega e processa cada sheet
-                    df1 = carregar_e_ordenar_dados_por_sheet(sheets_1[sheet_name], '1ª CLASSIFICATÓRIA')
-                    df2 = carregar_e_ordenar_dados_por_sheet(sheets_2[sheet_name], '2ª CLASSIFICATÓRIA')
-                    
-                    # Concatenar as duas etapas
-                    df_total = pd.concat([df1, df2], ignore_index=True)
-                    
-                    # Ordenar por Ano, Pontuação (descendente), Tempo (ascendente), e Etapa
-                    df_total = df_total.sort_values(by=["Ano", "Pontuação", "Tempo", "Etapa"], ascending=[True, False, True, True])
-                    
-                    # Escreve o nome da escola como cabeçalho e a tabela ordenada para cada aba
-                    df_total.to_excel(writer, sheet_name=sheet_name, index=False, startrow=1)
-                    worksheet = writer.sheets[sheet_name]
-                    worksheet.merge_range('A1:G1', sheet_name, writer.book.add_format({'align': 'center', 'bold': True, 'bg_color': '#4F81BD', 'font_color': 'white'}))
-                else:
-                    st.warning(f"Sheet '{sheet_name}' não encontrada em ambos os arquivos.")
-        
-        output.seek(0)
+        output, avisos, ranking, artefato = _semifinal_cache(chave1, chave2, sheets_1, sheets_2)
+        for aviso in avisos:
+            st.warning(aviso)
+
+        if not ranking.empty:
+            st.write("Ranking geral da rede (melhor etapa de cada aluno):")
+            previa(ranking, (chave1, chave2), 'semifinal', filtros=('Escola (aba)', 'Ano'))
         
         # Botão para download do arquivo organizado
         st.download_button(
@@ -61,6 +170,13 @@ def main():
             file_name="classificacao_organizada_todas_escolas.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         )
+        if artefato is not None:
+            st.download_button(
+                label="Baixar em Parquet (para a Final)",
+                data=artefato,
+                file_name=f"classificacao_organizada_todas_escolas.{artefatos.EXTENSAO}",
+                mime=artefatos.MIME
+            )
 
 if __name__ == "__main__":
     main()
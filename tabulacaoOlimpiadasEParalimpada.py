@@ -9,23 +9,46 @@ import pandas as pd
 import xlsxwriter
 from xlsxwriter.utility import xl_col_to_name
 from io import BytesIO
+import contextlib
+import functools
+import multiprocessing
+import os
+import queue
 import re
+import threading
 import numpy as np
 import unicodedata
+from datetime import date, datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import NamedTuple
 from PIL import Image  # para dimensionar a imagem do banner com precisão
+from estilos_excel import obter_formato
+from cache_resultados import MAX_ENTRADAS, hash_upload, ler_artefato, ler_excel
+from leitura import ler_em_blocos
+import artefatos
+from perfil import etapa as medir_etapa, medir  # "etapa" aqui é a etapa da olimpíada
+from cabecalhos import ResolvedorCabecalhos
+from duplicatas import manter_uma_por_grupo, pares_parecidos
+from ranking import chave_composta, posto_valores
+from previa import previa
+import tarefas
 
 # ------------------ Utilitários ------------------
 def _strip_accents(s: str) -> str:
     s = unicodedata.normalize("NFKD", s)
     return "".join(ch for ch in s if not unicodedata.combining(ch))
 
+_RE_ESPACOS = re.compile(r"\s+")
+_RE_PONTUACAO_FINAL = re.compile(r"[:?;.!]+$")
+
 def _norm(s: str) -> str:
     if s is None:
         return ""
     s = str(s)
     s = _strip_accents(s).lower().strip()
-    s = re.sub(r"\s+", " ", s)
-    s = re.sub(r"[:?;.!]+$", "", s)
+    s = _RE_ESPACOS.sub(" ", s)
+    s = _RE_PONTUACAO_FINAL.sub("", s)
     return s
 
 def padronizar_nome_escola(nome):
@@ -86,6 +109,198 @@ def obter_ordem_ano(ano):
         return int(m3.group(1))
     return float('inf')
 
+# ------------------ Normalização vetorizada ------------------
+# Mesmos resultados das funções acima, mas operando na coluna inteira:
+# cada valor distinto é tratado uma única vez (pd.factorize) com pandas .str /
+# NumPy e o resultado é espalhado de volta para as linhas via take.
+_RE_EMEF = r'\b[Ee]\s*\.?\s*[Mm]\s*\.?\s*[Ee]\s*\.?\s*[Ff]\s*\.?\s*\b'
+_RE_TEMPO_RAPIDO = r'^(\d+(?:\.\d+)?)(?::(\d+(?:\.\d+)?))?(?::(\d+(?:\.\d+)?))?$'
+
+_TIPOS_COM_STR = ('string', 'empty', 'bytes', 'mixed', 'mixed-integer')  # os que o .str do pandas aceita
+_MAIOR_INTEIRO_EXATO = 2.0 ** 53  # acima disso o float64 perde dígitos: vai para padronizar_pontuacao
+
+def _eh_texto(serie: pd.Series) -> bool:
+    return serie.dtype == object or isinstance(serie.dtype, pd.StringDtype)
+
+def _aceita_str(serie: pd.Series) -> bool:
+    """Coluna de texto com algum texto (object só com números, comum em blocos pequenos, não aceita .str)."""
+    return _eh_texto(serie) and pd.api.types.infer_dtype(serie, skipna=True) in _TIPOS_COM_STR
+
+def _em_valores_unicos(serie: pd.Series, func) -> pd.Series:
+    """Aplica func (vetorizada) só nos valores distintos e expande para as linhas."""
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=False)
+    if len(unicos) == len(serie):
+        return func(serie)
+    res = func(pd.Series(unicos, dtype=serie.dtype if _eh_texto(serie) else None))
+    return pd.Series(res.to_numpy()[codigos], index=serie.index, dtype=res.dtype)
+
+def _padronizar_nome_escola_vet(serie: pd.Series) -> pd.Series:
+    if not _aceita_str(serie):
+        return pd.Series("", index=serie.index, dtype=object)
+    out = (serie.str.replace(_RE_EMEF, '', regex=True)
+                .str.replace(r'\s+', ' ', regex=True)
+                .str.strip()
+                .str.upper())
+    return out.fillna("").astype(object)
+
+def _padronizar_pontuacao_vet(serie: pd.Series) -> pd.Series:
+    if _aceita_str(serie):
+        # texto: mantém só os dígitos; demais valores: conversão numérica
+        digitos = serie.str.replace(r'[^\d]', '', regex=True)
+        eh_texto = digitos.notna().to_numpy()
+        de_texto = digitos.where(digitos != '').astype('float64')
+        outros = pd.to_numeric(serie.where(~eh_texto), errors='coerce')
+        valores = np.where(eh_texto, de_texto.to_numpy(), outros.to_numpy(dtype=float))
+    else:
+        valores = pd.to_numeric(serie, errors='coerce').to_numpy(dtype=float)
+    valores = np.trunc(valores)
+    valores[~np.isfinite(valores)] = 0
+    grandes = np.abs(valores) >= _MAIOR_INTEIRO_EXATO
+    if not grandes.any():
+        return pd.Series(valores.astype('int64'), index=serie.index)
+    # raros (números absurdos digitados): a função escalar dá o inteiro exato
+    exatos = [padronizar_pontuacao(v) for v in serie[grandes]]
+    valores[grandes] = 0
+    resultado = valores.astype('int64')
+    limites = np.iinfo('int64')
+    if all(limites.min <= v <= limites.max for v in exatos):
+        resultado[grandes] = exatos
+        return pd.Series(resultado, index=serie.index)
+    resultado = resultado.astype(object)
+    resultado[grandes] = exatos
+    return pd.Series(resultado, index=serie.index, dtype=object)
+
+def _parse_tempo_vet(serie: pd.Series) -> pd.Series:
+    out = pd.Series(np.nan, index=serie.index, dtype='float64')
+    validos = serie.notna()
+    if not validos.any():
+        return out
+    txt = serie[validos].astype(str).str.strip()
+
+    partes = txt.str.extract(_RE_TEMPO_RAPIDO)
+    casou = partes[0].notna()
+    p0 = partes[0][casou].astype('float64')
+    p1 = partes[1][casou].astype('float64')
+    p2 = partes[2][casou].astype('float64')
+    segundos = np.where(p2.notna(), p0*3600 + p1*60 + p2,
+                        np.where(p1.notna(), p0*60 + p1, p0))
+    out.loc[p0.index] = segundos
+
+    resto = txt.index[~casou.to_numpy()]
+    if len(resto):
+        out.loc[resto] = serie.loc[resto].map(_parse_tempo).astype('float64')
+    return out
+
+def _obter_ordem_ano_vet(serie: pd.Series) -> pd.Series:
+    txt = serie.astype(str).str.lower()
+    ano = txt.str.extract(r'^(\d+)[ªº°]?\s*ano', expand=False)
+    ejai = txt.str.extract(r'^ejai\s*(\d+)[ªº°]?\s*etapa', expand=False)
+    qualquer = txt.str.extract(r'(\d+)', expand=False)
+
+    ordem = ano.astype('float64')
+    ordem = ordem.fillna(ejai.astype('float64') + 100)
+    ordem = ordem.fillna(qualquer.astype('float64'))
+    return ordem.fillna(float('inf'))
+
+def padronizar_nome_escola_serie(serie: pd.Series) -> pd.Series:
+    """Versão vetorizada de padronizar_nome_escola (não-texto vira "")."""
+    return _em_valores_unicos(serie, _padronizar_nome_escola_vet)
+
+def _padronizar_nome_aluno_vet(serie: pd.Series) -> pd.Series:
+    txt = (serie.astype(str).str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+           .str.upper().str.replace(r'\s+', ' ', regex=True).str.strip())
+    return txt.where(serie.notna())
+
+def padronizar_nome_aluno_serie(serie: pd.Series) -> pd.Series:
+    """Nome do aluno para comparação entre arquivos: sem acentos, maiúsculo, espaços simples (NaN segue NaN)."""
+    return _em_valores_unicos(serie, _padronizar_nome_aluno_vet)
+
+def padronizar_pontuacao_serie(serie: pd.Series) -> pd.Series:
+    """Versão vetorizada de padronizar_pontuacao (inválidos viram 0; object se algum valor passar do int64)."""
+    if not _eh_texto(serie):
+        return _padronizar_pontuacao_vet(serie)
+    return _em_valores_unicos(serie, _padronizar_pontuacao_vet)
+
+def parse_tempo_serie(serie: pd.Series) -> pd.Series:
+    """
+    Versão vetorizada de _parse_tempo (segundos, float).
+    Formatos comuns ('hh:mm:ss', 'mm:ss', 'ss') são resolvidos via str.extract;
+    o que sobrar (raro) cai no _parse_tempo escalar, garantindo o mesmo resultado.
+    """
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return serie.astype('float64')
+    return _em_valores_unicos(serie, _parse_tempo_vet)
+
+def obter_ordem_ano_serie(serie: pd.Series) -> pd.Series:
+    """Versão vetorizada de obter_ordem_ano (int64, ou float64 se houver inf)."""
+    ordem = _em_valores_unicos(serie, _obter_ordem_ano_vet)
+    if np.isinf(ordem.to_numpy()).any():
+        return ordem
+    return ordem.astype('int64')
+
+# ------------------ Codificação por dicionário (Categorical) ------------------
+# Escola, Ano e Deficiência/Transtorno têm poucos valores distintos (centenas de
+# escolas, ~15 anos, meia dúzia de respostas): viram Categorical e cada categoria
+# é normalizada uma única vez, com memo entre execuções. Filtros e ordenações
+# passam a trabalhar sobre os códigos inteiros.
+_MEMO_ESCOLA = {}
+_MEMO_ORDEM_ANO = {}
+_MEMO_LIMITE = 50_000
+
+_SEM_DEF_FLAGS = {
+    'nao possui deficiencia/transtorno',
+    'não possui deficiência/transtorno',
+    'sem deficiencia',
+    'sem deficiência',
+    'nao', 'não', 'n'
+}
+
+def _como_categoria(serie: pd.Series) -> pd.Series:
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie
+    return serie.astype('category')
+
+def _normalizar_com_memo(valores, func_serie, memo):
+    """Normaliza uma lista de valores distintos, reaproveitando o memo."""
+    faltando = [v for v in valores if v not in memo]
+    if faltando:
+        if len(memo) + len(faltando) > _MEMO_LIMITE:
+            memo.clear()
+        res = func_serie(pd.Series(faltando, dtype=object))
+        memo.update(zip(faltando, res.tolist()))
+    return [memo[v] for v in valores]
+
+def codificar_escolas(serie: pd.Series) -> pd.Series:
+    """padronizar_nome_escola por categoria -> Categorical em ordem alfabética."""
+    bruto = _como_categoria(serie)
+    codigos = bruto.cat.codes.to_numpy()
+    # último slot = valor usado para NaN (código -1)
+    normal = _normalizar_com_memo(list(bruto.cat.categories), padronizar_nome_escola_serie, _MEMO_ESCOLA) + [""]
+
+    usados = set(normal[:-1])
+    if (codigos == -1).any():
+        usados.add("")
+    categorias = sorted(usados)
+    posicao = {nome: i for i, nome in enumerate(categorias)}
+    mapa = np.array([posicao.get(nome, -1) for nome in normal], dtype='int32')
+    return pd.Series(pd.Categorical.from_codes(mapa[codigos], categories=categorias),
+                     index=serie.index, name=serie.name)
+
+def ordem_ano_codigos(serie: pd.Series) -> np.ndarray:
+    """Posição densa (int16) de cada linha na ordem de obter_ordem_ano, calculada por categoria."""
+    ano = _como_categoria(serie)
+    ordem = _normalizar_com_memo(list(ano.cat.categories), obter_ordem_ano_serie, _MEMO_ORDEM_ANO)
+    ordem = np.array(ordem + [obter_ordem_ano(np.nan)], dtype='float64')
+    posto = np.unique(ordem, return_inverse=True)[1].astype('int16')
+    return posto[ano.cat.codes.to_numpy()]
+
+def mascara_sem_deficiencia(serie: pd.Series) -> np.ndarray:
+    """True para quem não possui deficiência/transtorno (_norm só nas categorias)."""
+    defi = _como_categoria(serie)
+    flags = [_norm(c) in _SEM_DEF_FLAGS for c in defi.cat.categories]
+    flags.append(_norm(np.nan) in _SEM_DEF_FLAGS)
+    return np.array(flags, dtype=bool)[defi.cat.codes.to_numpy()]
+
 def ajustar_nome_aba(nome, usados):
     nome = nome[:31] if nome else "ESCOLA_DESCONHECIDA"
     nome = re.sub(r'[\\/*?:\[\]]', '_', nome).strip()
@@ -97,6 +312,11 @@ def ajustar_nome_aba(nome, usados):
     usados.add(nome)
     return nome
 
+def nomes_abas(escolas, abas_reservadas=('GERAL',)) -> list:
+    """Nome da aba de cada escola, na ordem dada (como em escrever_por_escola)."""
+    usados = set(abas_reservadas)
+    return [ajustar_nome_aba(escola, usados) for escola in escolas]
+
 # ------------------ Mapeamento de Colunas (flexível) ------------------
 # Canoniza para estes nomes:
 # 'Data/Hora','Email','Nome','EscolaSel','EscolaLivre','Ano','Pontuacao','Tempo','DefTran','Mensagem'
@@ -125,20 +345,36 @@ _COL_CANON = {
     'quer deixar uma mensagem? pode usar o espaço abaixo': 'Mensagem',
 }
 
+# chave exata > primeira chave (na ordem acima) contida no cabeçalho; memorizado por cabeçalho
+_RESOLVEDOR_COLUNAS = ResolvedorCabecalhos(_COL_CANON, _norm)
+
+def canonizar_coluna(c):
+    """Nome canônico do cabeçalho c, ou None se não for uma das colunas conhecidas."""
+    return _RESOLVEDOR_COLUNAS.coluna(c).canonico
+
+def coluna_canonica(c) -> bool:
+    """Filtro de leitura (usecols): só as colunas que mapear_colunas reconhece."""
+    return canonizar_coluna(c) is not None
+
+def avisos_colunas(df: pd.DataFrame) -> tuple:
+    """Cabeçalhos ambíguos (casam com mais de um campo) ou campos reconhecidos em mais de uma coluna."""
+    return _RESOLVEDOR_COLUNAS.colunas(tuple(df.columns)).avisos
+
 def mapear_colunas(df: pd.DataFrame) -> pd.DataFrame:
-    renamed = {}
-    for c in df.columns:
-        key = _norm(c)
-        mapped = None
-        if key in _COL_CANON:
-            mapped = _COL_CANON[key]
-        else:
-            for k, v in _COL_CANON.items():
-                if k in key:
-                    mapped = v
-                    break
-        renamed[c] = mapped if mapped else c
-    return df.rename(columns=renamed)
+    # só renomeia: os dados continuam os do df (quem for alterar seleciona/copia antes)
+    return df.rename(columns=_RESOLVEDOR_COLUNAS.colunas(tuple(df.columns)).renomear, copy=False)
+
+ESTILO_CABECALHO = {
+    'bold': True,
+    'align': 'center',
+    'valign': 'vcenter',
+    'bg_color': '#6AA84F',
+    'font_color': 'white',
+    'border': 1
+}
+ESTILO_TITULO_ESCOLA = {
+    'align': 'center', 'bold': True, 'bg_color': '#2E7D32', 'font_color': 'white', 'border': 1
+}
 
 def aplicar_formatacao_basica(writer, sheet_name, df, header_row_idx=0, col_width_chars=18):
     """
@@ -147,16 +383,7 @@ def aplicar_formatacao_basica(writer, sheet_name, df, header_row_idx=0, col_widt
     - Retorna lista com larguras em pixels (aprox) para posicionar o banner
     """
     ws = writer.sheets[sheet_name]
-    book = writer.book
-
-    header_fmt = book.add_format({
-        'bold': True,
-        'align': 'center',
-        'valign': 'vcenter',
-        'bg_color': '#6AA84F',
-        'font_color': 'white',
-        'border': 1
-    })
+    header_fmt = obter_formato(writer.book, ESTILO_CABECALHO)
 
     # escreve cabeçalho com estilo
     for col_idx, col_name in enumerate(df.columns):
@@ -166,41 +393,30 @@ def aplicar_formatacao_basica(writer, sheet_name, df, header_row_idx=0, col_widt
     for col_idx in range(df.shape[1]):
         ws.set_column(col_idx, col_idx, col_width_chars)
 
+    return larguras_colunas_px(df.shape[1], col_width_chars)
+
+def larguras_colunas_px(n_colunas, col_width_chars=18):
     # conversão aproximada chars -> pixels (fator ~7)
-    col_pixels = [int(col_width_chars * 7) for _ in range(df.shape[1])]
-    return col_pixels
+    return [int(col_width_chars * 7) for _ in range(n_colunas)]
 
-from xlsxwriter.utility import xl_col_to_name
+class BannerPreparado(NamedTuple):
+    """Imagem do banner já reduzida para a área do banner + offsets de centralização."""
+    dados: bytes
+    x_offset: int
+    y_offset: int
 
-def inserir_banner(ws, image_bytes, col_widths_px, cols, banner_rows=3, target_height_px=110):
+@functools.lru_cache(maxsize=8)
+def preparar_banner(image_bytes: bytes, total_px: int, target_height_px: int) -> BannerPreparado:
     """
-    Insere a imagem centralizada dentro da área MESCLADA A1:.. (banner_rows linhas),
-    escalando para caber e centralizando **horizontal e verticalmente**.
-    Usa object_position=1 (move e redimensiona com as células) para o Google Sheets.
+    Decodifica a imagem uma única vez, calcula a escala para caber em total_px x target_height_px
+    (sem ampliar) e já reamostra para esse tamanho: todas as abas usam os mesmos bytes pequenos,
+    inseridos com escala 1 (o xlsxwriter guarda uma única cópia por arquivo).
     """
-    if not image_bytes:
-        return
-
-    # 1) Mescla A1:LastCol<banner_rows>
-    last_col_name = xl_col_to_name(cols - 1)
-    merge_range = f"A1:{last_col_name}{banner_rows}"
-    ws.merge_range(merge_range, "", None)
-
-    # 2) Ajusta altura das linhas da faixa do banner (total = target_height_px)
-    for r in range(banner_rows):
-        ws.set_row(r, target_height_px / banner_rows)
-
-    # 3) Largura total da área em pixels
-    total_px = sum(col_widths_px[:cols]) if col_widths_px else 600
-
-    # 4) Escala e offsets (centro)
     with Image.open(BytesIO(image_bytes)) as im:
         img_w, img_h = im.size
+        if img_w <= 0 or img_h <= 0:
+            return BannerPreparado(image_bytes, 0, 0)
 
-    if img_w <= 0 or img_h <= 0:
-        x_scale = y_scale = 1.0
-        x_offset = y_offset = 0
-    else:
         scale_w = total_px / img_w
         scale_h = target_height_px / img_h
         scale = min(scale_w, scale_h, 1.0)  # não amplia
@@ -210,159 +426,846 @@ def inserir_banner(ws, image_bytes, col_widths_px, cols, banner_rows=3, target_h
         x_offset = max(int((total_px - out_w) / 2), 0)
         y_offset = max(int((target_height_px - out_h) / 2), 0)
 
-        x_scale = y_scale = scale
+        formato = im.format if im.format in ('PNG', 'JPEG') else 'PNG'
+        reduzida = im
+        if scale < 1.0:
+            if im.mode not in ('RGB', 'RGBA', 'L', 'CMYK'):
+                im = im.convert('RGBA')
+            reduzida = im.resize((max(round(out_w), 1), max(round(out_h), 1)), Image.LANCZOS)
+        if formato == 'JPEG' and reduzida.mode not in ('RGB', 'L', 'CMYK'):
+            formato = 'PNG'
+
+        # regrava sem metadados de DPI: o xlsxwriter assume 96 DPI e usa o tamanho em pixels
+        out = BytesIO()
+        reduzida.save(out, format=formato)
+        return BannerPreparado(out.getvalue(), x_offset, y_offset)
+
+def inserir_banner(ws, image_bytes, col_widths_px, cols, banner_rows=3, target_height_px=110, merge_format=None):
+    """
+    Insere a imagem centralizada dentro da área MESCLADA A1:.. (banner_rows linhas),
+    escalando para caber e centralizando **horizontal e verticalmente**.
+    Usa object_position=1 (move e redimensiona com as células) para o Google Sheets.
+    image_bytes pode ser os bytes originais ou um BannerPreparado (preparar_banner).
+    No modo streaming passe um merge_format: só linhas com célula são gravadas em disco.
+    """
+    if not image_bytes:
+        return
+
+    # 1) Ajusta altura das linhas da faixa do banner (total = target_height_px)
+    #    (antes da mescla: no modo constant_memory a linha já escrita não aceita set_row)
+    for r in range(banner_rows):
+        ws.set_row(r, target_height_px / banner_rows)
+
+    # 2) Mescla A1:LastCol<banner_rows>
+    last_col_name = xl_col_to_name(cols - 1)
+    merge_range = f"A1:{last_col_name}{banner_rows}"
+    ws.merge_range(merge_range, "", merge_format)
+
+    # 3) Imagem já reduzida + offsets (centro); decodifica só se vier em bytes crus
+    if not isinstance(image_bytes, BannerPreparado):
+        total_px = sum(col_widths_px[:cols]) if col_widths_px else 600
+        image_bytes = preparar_banner(image_bytes, total_px, target_height_px)
 
-    # 5) Insere na A1, “dentro” da área mesclada e seguindo as células
+    # 4) Insere na A1, “dentro” da área mesclada e seguindo as células
     ws.insert_image(
         "A1",
         "banner.png",
         {
-            "image_data": BytesIO(image_bytes),
-            "x_scale": x_scale,
-            "y_scale": y_scale,
-            "x_offset": x_offset,
-            "y_offset": y_offset,
+            "image_data": BytesIO(image_bytes.dados),
+            "x_offset": image_bytes.x_offset,
+            "y_offset": image_bytes.y_offset,
             "object_position": 1,  # **move e redimensiona com as células** (Sheets fica estável)
         },
     )
 
 
 # ------------------ Pipeline de dados ------------------
-def gerar_classificatoria(formulario_df: pd.DataFrame, etapa: str) -> pd.DataFrame:
-    df = mapear_colunas(formulario_df).copy()
+# Duas etapas: normalizar_respostas trata cada linha sozinha (só as categorias dependem das
+# outras linhas, e unir_respostas as junta), então pode rodar bloco a bloco sobre um formulário
+# lido aos poucos; ordenar_classificatoria precisa de todas as linhas.
+COLUNAS_RESPOSTA = ['Nome', 'EscolaSel', 'EscolaLivre', 'Ano', 'Pontuacao', 'Tempo', 'DefTran']
+_MARCADORES_ESCOLA_FORA = {
+    'escola não está na lista', 'escola nao esta na lista', 'escola nao está na lista',
+    'outros', 'outro'
+}
 
-    # Precisamos destas (canon):
-    req = ['Nome', 'EscolaSel', 'EscolaLivre', 'Ano', 'Pontuacao', 'Tempo', 'DefTran']
-    faltando = [c for c in req if c not in df.columns]
+def _inteiro_compacto(serie: pd.Series) -> pd.Series:
+    """Menor tipo inteiro (int16, int32, int64) que guarda os valores (e o oposto deles, para ordenar decrescente)."""
+    if len(serie) == 0:
+        return serie.astype('int16')
+    menor, maior = serie.min(), serie.max()
+    for tipo in ('int16', 'int32'):
+        limites = np.iinfo(tipo)
+        if limites.min < menor and maior <= limites.max:
+            return serie.astype(tipo)
+    return serie
+
+def normalizar_respostas(formulario_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Colunas de COLUNAS_RESPOSTA do formulário já normalizadas, na ordem e com o índice das linhas
+    do formulário: Escola/Ano/Deficiência categóricas, Pontuação no menor inteiro que couber
+    (int16 em geral) e Tempo_seg em float32. O Tempo original segue para o Excel.
+    """
+    with medir_etapa('mapear_colunas', linhas=len(formulario_df)):
+        df = mapear_colunas(formulario_df)
+    faltando = [c for c in COLUNAS_RESPOSTA if c not in df.columns]
     if faltando:
         raise KeyError(f"Colunas ausentes: {faltando}. Recebidas: {list(df.columns)}")
 
-    work = df[req].copy()
-
     # "Escola não está na lista" -> usa EscolaLivre
-    escola_sel_norm = work['EscolaSel'].astype(str).str.strip().str.lower()
-    marcadores_out = {
-        'escola não está na lista', 'escola nao esta na lista', 'escola nao está na lista',
-        'outros', 'outro'
-    }
-    mask_out = escola_sel_norm.isin(marcadores_out)
-    work.loc[mask_out, 'EscolaSel'] = work['EscolaLivre']
-    work.drop(columns=['EscolaLivre'], inplace=True)
-
-    # Renomeia finais
-    work = work.rename(columns={
-        'Nome': 'Nome',
-        'EscolaSel': 'Escola',
-        'Ano': 'Ano',
-        'Pontuacao': 'Pontuação',
-        'Tempo': 'Tempo',
-        'DefTran': 'Deficiência/Transtorno'
-    })
-
-    # Normalizações
-    work['Nome'] = work['Nome'].astype(str).str.upper()
-    work['Escola'] = work['Escola'].apply(padronizar_nome_escola)
-    work['Pontuação'] = work['Pontuação'].apply(padronizar_pontuacao)
-    work['Tempo_seg'] = work['Tempo'].apply(_parse_tempo)
-
-    # Ordenação
-    work['Ordem_Ano'] = work['Ano'].apply(obter_ordem_ano)
-    work = work.sort_values(by=['Ordem_Ano', 'Pontuação', 'Tempo_seg'],
-                            ascending=[True, False, True]).drop(columns=['Ordem_Ano'])
+    escola_sel = _como_categoria(df['EscolaSel'])
+    marcadas = [str(c).strip().lower() in _MARCADORES_ESCOLA_FORA for c in escola_sel.cat.categories]
+    mask_out = np.array(marcadas + [False], dtype=bool)[escola_sel.cat.codes.to_numpy()]
+    escola = df['EscolaSel'].where(~mask_out, df['EscolaLivre']) if mask_out.any() else df['EscolaSel']
+
+    # Normalizações (vetorizadas; Escola/Ano/Deficiência como Categorical); cada coluna é
+    # construída uma vez, sem copiar o formulário
+    with medir_etapa('normalizacao', linhas=len(df)):
+        return pd.DataFrame({
+            'Ano': _como_categoria(df['Ano']),
+            'Nome': df['Nome'].astype(str).str.upper(),
+            'Escola': codificar_escolas(escola),
+            'Pontuação': _inteiro_compacto(padronizar_pontuacao_serie(df['Pontuacao'])),
+            'Tempo': df['Tempo'],
+            'Deficiência/Transtorno': _como_categoria(df['DefTran']),
+            'Tempo_seg': parse_tempo_serie(df['Tempo']).astype('float32'),
+        }, index=df.index)
+
+def unir_respostas(partes) -> pd.DataFrame:
+    """Junta saídas de normalizar_respostas (blocos do mesmo formulário), unindo as categorias."""
+    if len(partes) == 1:
+        return partes[0]
+    unidas = pd.concat(partes)
+    for col in _COLUNAS_CATEGORIA:
+        unidas[col] = _unir_categorias([p[col] for p in partes])
+    return unidas
+
+def ordenar_classificatoria(respostas: pd.DataFrame, etapa: str) -> pd.DataFrame:
+    """
+    Ordena a saída de normalizar_respostas por ano, pontuação (decrescente) e tempo, numa única
+    ordenação estável sobre os códigos, e acrescenta a ETAPA. Não altera respostas.
+    """
+    # Ordem_Ano = código inteiro denso da ordem dos anos
+    with medir_etapa('ordenacao', linhas=len(respostas)):
+        ordem = np.lexsort((respostas['Tempo_seg'].to_numpy(), -respostas['Pontuação'].to_numpy(),
+                            ordem_ano_codigos(respostas['Ano'])))
+        work = respostas.take(ordem)
 
-    work['ETAPA'] = etapa
     # Mantém Tempo_seg para ordenação/debug; removemos na exportação
-    work = work[['Ano', 'Nome', 'Escola', 'Pontuação', 'Tempo', 'Deficiência/Transtorno', 'ETAPA', 'Tempo_seg']]
+    work.insert(work.columns.get_loc('Tempo_seg'), 'ETAPA', etapa)
     return work
 
+@medir('classificacao', linhas=len)
+def gerar_classificatoria(formulario_df: pd.DataFrame, etapa: str) -> pd.DataFrame:
+    return ordenar_classificatoria(normalizar_respostas(formulario_df), etapa)
+
+class RespostasEmBlocos(NamedTuple):
+    respostas: pd.DataFrame  # normalizar_respostas de todas as linhas (índice = linha no formulário)
+    avisos: tuple            # avisos_colunas do cabeçalho
+    datas: pd.Series | None  # datas_resposta (mesmo índice), se o formulário tiver Data/Hora
+
+@medir('normalizacao em blocos', linhas=lambda r: len(r.respostas))
+def normalizar_em_blocos(blocos) -> RespostasEmBlocos:
+    """
+    normalizar_respostas bloco a bloco (blocos: DataFrames de leitura.ler_em_blocos). Só a saída
+    compacta de cada bloco fica guardada: a memória da leitura não cresce com o formulário.
+    """
+    partes, avisos, datas = [], (), []
+    for bloco in blocos:
+        if not partes:
+            avisos = avisos_colunas(bloco)
+        partes.append(normalizar_respostas(bloco))
+        datas.append(datas_resposta(bloco))
+        del bloco  # solta o bloco antes de o leitor montar o próximo
+    if not partes:  # arquivo sem cabeçalho: o mesmo erro de colunas ausentes
+        partes.append(normalizar_respostas(pd.DataFrame()))
+    datas = pd.concat(datas) if datas and datas[0] is not None else None
+    return RespostasEmBlocos(unir_respostas(partes), avisos, datas)
+
+# ------------------ Particionamento por escola ------------------
+class ParticaoEscolas(NamedTuple):
+    """
+    Linhas agrupadas por escola em uma única passada (sort estável + offsets).
+    A escola i ocupa as posições ordem[limites[i]:limites[i+1]] do DataFrame original,
+    mantendo dentro do grupo a ordem da classificação.
+    """
+    ordem: np.ndarray
+    limites: np.ndarray
+    escolas: list
+
+def particionar_por_escola(df: pd.DataFrame) -> ParticaoEscolas:
+    escola_cat = _como_categoria(df['Escola'])
+    categorias = list(escola_cat.cat.categories)
+    codigos = escola_cat.cat.codes.to_numpy()
+
+    # posto alfabético de cada categoria -> ORDEM ALFABÉTICA das abas
+    alfabetica = sorted(range(len(categorias)), key=categorias.__getitem__)
+    posto = np.empty(len(categorias), dtype='int64')
+    posto[alfabetica] = np.arange(len(categorias))
+
+    validas = np.flatnonzero(codigos >= 0)  # NaN fica de fora (como no dropna)
+    chave = posto[codigos[validas]]
+    ordem = validas[np.argsort(chave, kind='stable')]
+
+    contagem = np.bincount(chave, minlength=len(categorias))
+    presentes = np.flatnonzero(contagem)
+    limites = np.concatenate(([0], np.cumsum(contagem[presentes])))
+    escolas = [categorias[alfabetica[i]] for i in presentes]
+    return ParticaoEscolas(ordem, limites, escolas)
+
+def filtrar_particao(particao: ParticaoEscolas, mascara: np.ndarray) -> ParticaoEscolas:
+    """Sub-partição das linhas com mascara=True, sem reescanear por escola."""
+    manter = mascara[particao.ordem]
+    if not particao.escolas:
+        return ParticaoEscolas(particao.ordem[manter], particao.limites, [])
+    contagem = np.add.reduceat(manter.astype('int64'), particao.limites[:-1])
+    presentes = np.flatnonzero(contagem)
+    limites = np.concatenate(([0], np.cumsum(contagem[presentes])))
+    escolas = [particao.escolas[i] for i in presentes]
+    return ParticaoEscolas(particao.ordem[manter], limites, escolas)
+
+def _reindexar_particao(particao: ParticaoEscolas, mascara: np.ndarray) -> ParticaoEscolas:
+    """Converte posições do DataFrame completo em posições de df[mascara]."""
+    nova_posicao = np.cumsum(mascara) - 1
+    return particao._replace(ordem=nova_posicao[particao.ordem])
+
+def abas_por_linha(n_linhas: int, particao: ParticaoEscolas, abas_reservadas=('GERAL',)) -> pd.Categorical:
+    """Aba por escola de cada linha (categorias na ordem das abas); NaN para quem não tem escola."""
+    codigos = np.full(n_linhas, -1, dtype='int32')
+    codigos[particao.ordem] = np.repeat(np.arange(len(particao.escolas)), np.diff(particao.limites))
+    return pd.Categorical.from_codes(codigos, categories=nomes_abas(particao.escolas, abas_reservadas))
+
 # ------------------ Escrita em Excel ------------------
-def escrever_geral(writer, df, image_bytes=None, banner_rows=3, banner_h_px=110):
-    sheet = 'GERAL'
+# Modo streaming (constant_memory do xlsxwriter): cada linha é gravada em disco assim
+# que a próxima começa, então tudo precisa ser escrito em ordem crescente de linha:
+# banner -> título -> cabeçalho -> dados (em blocos). A memória não cresce com o nº de linhas.
+TAMANHO_BLOCO_STREAMING = 5_000
+# Fora do streaming as linhas também vão em blocos (to_excel por bloco): cada aba/arquivo é um
+# conjunto de posições da mesma base, e só um bloco por vez é copiado dela
+TAMANHO_BLOCO_ESCRITA = 50_000
+
+def _colunas_exportacao(df):
+    """Posições das colunas que vão para o Excel (Tempo_seg é só para ordenação)."""
+    return [i for i, c in enumerate(df.columns) if c != 'Tempo_seg']
+
+def _blocos(df, linhas, colunas, tamanho_bloco):
+    """(deslocamento, df.iloc[linhas, colunas]) em fatias de até tamanho_bloco; linhas=None: todas."""
+    total = len(df) if linhas is None else len(linhas)
+    for inicio in range(0, total, tamanho_bloco):
+        fim = min(inicio + tamanho_bloco, total)
+        # linhas antes das colunas: df.iloc[linhas, colunas] seleciona as colunas primeiro (cópia inteira)
+        yield inicio, df.iloc[slice(inicio, fim) if linhas is None else linhas[inicio:fim]].iloc[:, colunas]
+
+def _valor_celula(v):
+    """Mesma conversão do df.to_excel: NaN vira célula vazia, inf vira texto, datas com formato."""
+    if v is None or v is pd.NaT:
+        return None, None
+    if isinstance(v, (bool, np.bool_)):
+        return bool(v), None
+    if isinstance(v, (int, np.integer)):
+        return int(v), None
+    if isinstance(v, (float, np.floating)):
+        if np.isnan(v):
+            return None, None
+        if np.isinf(v):
+            return ('inf' if v > 0 else '-inf'), None
+        return float(v), None
+    if isinstance(v, str):
+        return v, None
+    if isinstance(v, datetime):
+        return v, 'YYYY-MM-DD HH:MM:SS'
+    if isinstance(v, date):
+        return v, 'YYYY-MM-DD'
+    if isinstance(v, timedelta):
+        return v.total_seconds() / 86400, '0'
+    return str(v), None
+
+def escrever_linhas_streaming(writer, ws, df, primeira_linha, tamanho_bloco=TAMANHO_BLOCO_STREAMING, linhas=None,
+                              colunas=None):
+    """Escreve as linhas de df (sem cabeçalho) a partir de primeira_linha, bloco a bloco."""
+    book = writer.book
+    linha = primeira_linha
+    colunas = list(range(df.shape[1])) if colunas is None else colunas
+    for _, bloco in _blocos(df, linhas, colunas, tamanho_bloco):
+        for valores in bloco.to_numpy(dtype=object):
+            for col_idx, v in enumerate(valores):
+                valor, num_format = _valor_celula(v)
+                if valor is None:
+                    continue
+                if num_format:
+                    ws.write(linha, col_idx, valor, obter_formato(book, {'num_format': num_format}))
+                else:
+                    ws.write(linha, col_idx, valor)
+            linha += 1
+
+def escrever_linhas_excel(writer, sheet, df, header_row, linhas=None, colunas=None,
+                          tamanho_bloco=TAMANHO_BLOCO_ESCRITA):
+    """
+    Mesmo resultado de df.iloc[linhas, colunas].to_excel(startrow=header_row), um bloco por vez
+    (o cabeçalho sai com o primeiro bloco; sem linhas, só ele).
+    """
+    colunas = list(range(df.shape[1])) if colunas is None else colunas
+    escritas = 0
+    for inicio, bloco in _blocos(df, linhas, colunas, tamanho_bloco):
+        primeiro = inicio == 0
+        bloco.to_excel(writer, sheet_name=sheet, index=False, header=primeiro,
+                       startrow=header_row if primeiro else header_row + 1 + inicio)
+        escritas += len(bloco)
+    if not escritas:
+        df.iloc[:0].iloc[:, colunas].to_excel(writer, sheet_name=sheet, index=False, startrow=header_row)
+
+def escrever_geral(writer, df, image_bytes=None, banner_rows=3, banner_h_px=110, streaming=False, sheet='GERAL',
+                   linhas=None):
+    """linhas: posições de df que entram na aba (na ordem dada); None = todas."""
     header_row = banner_rows if image_bytes else 0
-    df_export = df.drop(columns=['Tempo_seg'], errors='ignore')
-    df_export.to_excel(writer, sheet_name=sheet, index=False, startrow=header_row)
-    ws = writer.sheets[sheet]
+    colunas = _colunas_exportacao(df)
+    cabecalho = df.iloc[:0].iloc[:, colunas]  # só as colunas exportadas, sem linhas
+    n_linhas = len(df) if linhas is None else len(linhas)
 
-    # Formatação + larguras reais
-    col_pixels = aplicar_formatacao_basica(writer, sheet, df_export, header_row_idx=header_row)
+    if streaming:
+        ws = writer.book.add_worksheet(sheet)
+        if image_bytes:
+            inserir_banner(ws, image_bytes, col_widths_px=larguras_colunas_px(cabecalho.shape[1]),
+                           cols=cabecalho.shape[1], banner_rows=banner_rows, target_height_px=banner_h_px,
+                           merge_format=obter_formato(writer.book, {}))
+        aplicar_formatacao_basica(writer, sheet, cabecalho, header_row_idx=header_row)
+        escrever_linhas_streaming(writer, ws, df, header_row + 1, linhas=linhas, colunas=colunas)
+    else:
+        escrever_linhas_excel(writer, sheet, df, header_row, linhas=linhas, colunas=colunas)
+        ws = writer.sheets[sheet]
 
-    # Banner dentro da célula mesclada A1:.. (se houver imagem)
-    if image_bytes:
-        inserir_banner(ws, image_bytes, col_widths_px=col_pixels, cols=df_export.shape[1],
-                       banner_rows=banner_rows, target_height_px=banner_h_px)
+        # Formatação + larguras reais
+        col_pixels = aplicar_formatacao_basica(writer, sheet, cabecalho, header_row_idx=header_row)
+
+        # Banner dentro da célula mesclada A1:.. (se houver imagem)
+        if image_bytes:
+            inserir_banner(ws, image_bytes, col_widths_px=col_pixels, cols=cabecalho.shape[1],
+                           banner_rows=banner_rows, target_height_px=banner_h_px)
 
     # Filtros e freeze
-    ws.autofilter(header_row, 0, header_row + len(df_export), df_export.shape[1] - 1)
+    ws.autofilter(header_row, 0, header_row + n_linhas, cabecalho.shape[1] - 1)
     ws.freeze_panes(header_row + 1, 0)
 
-def escrever_por_escola(writer, df, image_bytes=None, banner_rows=3, banner_h_px=110):
-    # ↓↓↓ ORDEM ALFABÉTICA nas abas por escola
-    escolas = sorted(df['Escola'].dropna().unique())
+def escrever_por_escola(writer, df, image_bytes=None, banner_rows=3, banner_h_px=110, particao=None,
+                        streaming=False, abas_reservadas=('GERAL',), ao_escrever_aba=None):
+    """ao_escrever_aba(nome da aba): chamado ao fim de cada aba (progresso)."""
+    # ↓↓↓ ORDEM ALFABÉTICA nas abas por escola (particao já vem ordenada)
+    if particao is None:
+        particao = particionar_por_escola(df)
+
+    # cada aba é uma fatia da partição (posições em df): as linhas são copiadas bloco a bloco na escrita
+    colunas = _colunas_exportacao(df)
+    cabecalho = df.iloc[:0].iloc[:, colunas]
+    n_colunas = cabecalho.shape[1]
 
-    usados = set(['GERAL'])  # mantém GERAL reservado; evita conflito de nome
+    # mantém GERAL (ou a aba-resumo) reservado; evita conflito de nome
+    abas = nomes_abas(particao.escolas, abas_reservadas)
     book = writer.book
 
-    for escola in escolas:
-        sheet = ajustar_nome_aba(escola, usados)
+    for i, (escola, sheet) in enumerate(zip(particao.escolas, abas)):
         title_row = banner_rows if image_bytes else 0
         header_row = title_row + 1
 
-        df_esc = df[df['Escola'] == escola].drop(columns=['Tempo_seg'], errors='ignore')
-        df_esc.to_excel(writer, sheet_name=sheet, index=False, startrow=header_row)
-        ws = writer.sheets[sheet]
+        linhas = particao.ordem[particao.limites[i]:particao.limites[i + 1]]
+        titulo_fmt = obter_formato(book, ESTILO_TITULO_ESCOLA)
+
+        if streaming:
+            ws = book.add_worksheet(sheet)
+            if image_bytes:
+                inserir_banner(ws, image_bytes, col_widths_px=larguras_colunas_px(n_colunas),
+                               cols=n_colunas, banner_rows=banner_rows, target_height_px=banner_h_px,
+                               merge_format=obter_formato(book, {}))
+            ws.merge_range(title_row, 0, title_row, n_colunas-1, escola, titulo_fmt)
+            aplicar_formatacao_basica(writer, sheet, cabecalho, header_row_idx=header_row)
+            escrever_linhas_streaming(writer, ws, df, header_row + 1, linhas=linhas, colunas=colunas)
+        else:
+            escrever_linhas_excel(writer, sheet, df, header_row, linhas=linhas, colunas=colunas)
+            ws = writer.sheets[sheet]
 
-        col_pixels = aplicar_formatacao_basica(writer, sheet, df_esc, header_row_idx=header_row)
+            col_pixels = aplicar_formatacao_basica(writer, sheet, cabecalho, header_row_idx=header_row)
 
-        if image_bytes:
-            inserir_banner(ws, image_bytes, col_widths_px=col_pixels, cols=df_esc.shape[1],
-                           banner_rows=banner_rows, target_height_px=banner_h_px)
+            if image_bytes:
+                inserir_banner(ws, image_bytes, col_widths_px=col_pixels, cols=n_colunas,
+                               banner_rows=banner_rows, target_height_px=banner_h_px)
 
-        ws.merge_range(title_row, 0, title_row, df_esc.shape[1]-1, escola, book.add_format({
-            'align': 'center', 'bold': True, 'bg_color': '#2E7D32', 'font_color': 'white', 'border': 1
-        }))
+            ws.merge_range(title_row, 0, title_row, n_colunas-1, escola, titulo_fmt)
 
-        ws.autofilter(header_row, 0, header_row + len(df_esc), df_esc.shape[1]-1)
+        ws.autofilter(header_row, 0, header_row + len(linhas), n_colunas-1)
         ws.freeze_panes(header_row + 1, 0)
+        if ao_escrever_aba is not None:
+            ao_escrever_aba(sheet)
+
+
+# Execução dos 3 arquivos: 'serial', 'threads' ou 'processos' (xlsxwriter é CPU-bound,
+# então só 'processos' escala de fato em servidores com vários núcleos).
+# Padrão da página: 'serial'. A geração já roda numa tarefa em segundo plano (tarefas.py, até
+# TAREFAS_SIMULTANEAS ao mesmo tempo) e 'processos' multiplicaria a memória por 3 em cada uma.
+# 'processos' usa o contexto 'spawn': o servidor do Streamlit tem várias threads e um fork
+# depois delas pode herdar travas seguras por outra thread (o filho trava).
+MODOS_EXECUCAO = ('serial', 'threads', 'processos')
+MODO_EXECUCAO_PADRAO = os.environ.get('TABULACAO_MODO_EXECUCAO', 'serial')
+_CONTEXTO_PROCESSOS = multiprocessing.get_context('spawn')
+
+def _gerar_workbook(df, linhas, particao, image_bytes, banner_rows, banner_h_px, criado_em,
+                    streaming=False, avisar=None) -> bytes:
+    """
+    Monta um arquivo (GERAL + abas por escola) com as linhas de df nas posições linhas (None = todas);
+    particao já é a dessas linhas. Função de módulo para poder ir a outro processo.
+    avisar(nome da aba) é chamado a cada aba terminada.
+    """
+    out = BytesIO()
+    engine_kwargs = {'options': {'constant_memory': True}} if streaming else None
+    n_linhas = len(df) if linhas is None else len(linhas)
+    # o tempo de 'workbook' que não está nas abas é a gravação/compactação do .xlsx
+    with medir_etapa('workbook', linhas=n_linhas), \
+            pd.ExcelWriter(out, engine='xlsxwriter', engine_kwargs=engine_kwargs) as writer:
+        # data de criação fixa -> mesmos bytes em qualquer modo de execução
+        writer.book.set_properties({'created': criado_em})
+        with medir_etapa('aba GERAL', linhas=n_linhas):
+            escrever_geral(writer, df, image_bytes=image_bytes, banner_rows=banner_rows, banner_h_px=banner_h_px,
+                           streaming=streaming, linhas=linhas)
+        if avisar is not None:
+            avisar('GERAL')
+        with medir_etapa('abas por escola', linhas=len(particao.ordem)):
+            escrever_por_escola(writer, df, image_bytes=image_bytes, banner_rows=banner_rows,
+                                banner_h_px=banner_h_px, particao=particao, streaming=streaming,
+                                ao_escrever_aba=avisar)
+    return out.getvalue()
+
+def _avisar_fila(fila, indice, aba):
+    """avisar de um arquivo gerado em outro processo: o progresso volta pela fila do Manager."""
+    fila.put((indice, aba))
+
+def _drenar_fila(fila, avisar):
+    while True:
+        try:
+            indice, aba = fila.get_nowait()
+        except queue.Empty:
+            return
+        avisar(indice, aba)
 
+ARQUIVOS = ('olimpiada', 'paralimpiada', 'juncao')
+ROTULOS_ARQUIVOS = ('Olimpíada', 'Paralimpíada', 'JUNÇÃO')
 
-def salvar_excels(classificatoria_df, image_bytes=None, banner_rows=3, banner_h_px=110):
-    out_olimpiada, out_paralimpiada, out_juncao = BytesIO(), BytesIO(), BytesIO()
+def mascaras_arquivos(base: pd.DataFrame, escolas=None) -> list:
+    """Linhas de cada arquivo (ARQUIVOS), como máscaras sobre a base; escolas limita às escolas dadas."""
+    # Normaliza campo de deficiência (por categoria)
+    sem_def = mascara_sem_deficiencia(base['Deficiência/Transtorno'])
+    if escolas is None:
+        selecionadas = np.ones(len(base), dtype=bool)
+    else:
+        selecionadas = _como_categoria(base['Escola']).isin(list(escolas)).to_numpy()
+    return [selecionadas & sem_def, selecionadas & ~sem_def, selecionadas]
 
-    # Normaliza campo de deficiência
-    def _norm_low(s): return _norm(s)
+@medir('escrita')
+def salvar_excels(classificatoria_df, image_bytes=None, banner_rows=3, banner_h_px=110, modo='serial',
+                  streaming=False, escolas=None, progresso=None):
+    """
+    escolas: se informado, os arquivos trazem só essas escolas (GERAL e abas),
+    ex.: as escolas alteradas no modo incremental.
+    progresso(feitas, total, mensagem): chamado a cada aba terminada, somando os 3 arquivos.
+    """
+    if modo not in MODOS_EXECUCAO:
+        raise ValueError(f"Modo de execução inválido: {modo!r}. Use um de {MODOS_EXECUCAO}.")
 
-    sem_def_flags = {
-        'nao possui deficiencia/transtorno',
-        'não possui deficiência/transtorno',
-        'sem deficiencia',
-        'sem deficiência',
-        'nao', 'não', 'n'
-    }
+    base = classificatoria_df  # já na ordem da classificação; nenhum arquivo copia a base inteira
 
-    base = classificatoria_df.copy()
-    base['__def_norm'] = base['Deficiência/Transtorno'].map(_norm_low)
+    # Agrupa por escola uma única vez; cada arquivo é só uma máscara sobre a mesma base:
+    # posições das linhas (GERAL) + a partição filtrada (abas), sem DataFrames intermediários
+    particao = particionar_por_escola(base)
+    arquivos = [(np.flatnonzero(m), filtrar_particao(particao, m), m) for m in mascaras_arquivos(base, escolas)]
+    criado_em = datetime.now(timezone.utc).replace(microsecond=0)
 
-    olimpiada_df = base[base['__def_norm'].isin(sem_def_flags)].drop(columns=['__def_norm'])
-    paralimpiada_df = base[~base.index.isin(olimpiada_df.index)].drop(columns=['__def_norm'])
+    # Banner decodificado/reduzido uma única vez para o layout fixo de colunas
+    if image_bytes:
+        n_colunas = len(_colunas_exportacao(base))
+        with medir_etapa('banner'):
+            image_bytes = preparar_banner(image_bytes, sum(larguras_colunas_px(n_colunas)), banner_h_px)
+    comuns = (image_bytes, banner_rows, banner_h_px, criado_em, streaming)
+
+    avisar = None
+    if progresso is not None:
+        total_abas = sum(1 + len(p.escolas) for _, p, _ in arquivos)  # GERAL + escolas de cada arquivo
+        feitas = 0
+        trava = threading.Lock()
+
+        def avisar(indice, aba):
+            nonlocal feitas
+            with trava:
+                feitas += 1
+                n = feitas
+            progresso(n, total_abas, f"escrevendo aba {n}/{total_abas} ({ROTULOS_ARQUIVOS[indice]}: {aba})")
+
+    def avisar_arquivo(indice):
+        return None if avisar is None else functools.partial(avisar, indice)
+
+    if modo == 'serial':
+        resultados = [_gerar_workbook(base, linhas, p, *comuns, avisar=avisar_arquivo(i))
+                      for i, (linhas, p, _) in enumerate(arquivos)]
+    elif modo == 'threads':
+        with ThreadPoolExecutor(max_workers=len(arquivos)) as executor:
+            futuros = [executor.submit(_gerar_workbook, base, linhas, p, *comuns, avisar=avisar_arquivo(i))
+                       for i, (linhas, p, _) in enumerate(arquivos)]
+            resultados = [f.result() for f in futuros]
+    else:
+        # o processo filho recebe uma cópia de qualquer jeito (pickle): vai só a parte do arquivo,
+        # com a partição relativa a ela. O progresso volta por uma fila do Manager (só se pedido).
+        with ProcessPoolExecutor(max_workers=len(arquivos), mp_context=_CONTEXTO_PROCESSOS) as executor, \
+                (_CONTEXTO_PROCESSOS.Manager() if avisar else contextlib.nullcontext()) as gerente:
+            fila = gerente.Queue() if avisar else None
+            futuros = [executor.submit(_gerar_workbook, base[m], None, _reindexar_particao(p, m), *comuns,
+                                       avisar=functools.partial(_avisar_fila, fila, i) if fila else None)
+                       for i, (_, p, m) in enumerate(arquivos)]
+            pendentes = set(futuros) if fila else ()
+            while pendentes:
+                _, pendentes = wait(pendentes, timeout=tarefas.INTERVALO_ATUALIZACAO / 2)
+                _drenar_fila(fila, avisar)
+            resultados = [f.result() for f in futuros]
+
+    out_olimpiada, out_paralimpiada, out_juncao = (BytesIO(r) for r in resultados)
+    return out_olimpiada, out_paralimpiada, out_juncao
 
-    # 1) Olimpíada
-    with pd.ExcelWriter(out_olimpiada, engine='xlsxwriter') as writer:
-        escrever_geral(writer, olimpiada_df, image_bytes=image_bytes, banner_rows=banner_rows, banner_h_px=banner_h_px)
-        escrever_por_escola(writer, olimpiada_df, image_bytes=image_bytes, banner_rows=banner_rows, banner_h_px=banner_h_px)
+# ------------------ Artefato Parquet (artefatos.py) ------------------
+# Cada arquivo também sai como artefato: as linhas do GERAL na ordem da classificação, com a
+# aba por escola de cada uma e as colunas derivadas (Tempo_seg, Ordem_Ano). As outras páginas
+# leem as mesmas abas do .xlsx; a própria Tabulação reaproveita a classificação sem reprocessar.
+TIPO_ARTEFATO = 'tabulacao'
+COLUNA_ORDEM_ANO = 'Ordem_Ano'
+
+@medir('artefatos')
+def salvar_artefatos(classificatoria_df, escolas=None) -> tuple:
+    """Bytes dos artefatos Parquet dos 3 arquivos (mesmas linhas e abas de salvar_excels)."""
+    base = classificatoria_df
+    particao = particionar_por_escola(base)
+    saidas = []
+    for nome, mascara in zip(ARQUIVOS, mascaras_arquivos(base, escolas)):
+        tabela = base[mascara].reset_index(drop=True)
+        tabela[COLUNA_ORDEM_ANO] = ordem_ano_codigos(tabela['Ano'])
+        tabela[artefatos.COLUNA_ABA] = abas_por_linha(len(tabela),
+                                                      _reindexar_particao(filtrar_particao(particao, mascara), mascara))
+        saidas.append(artefatos.exportar(tabela, TIPO_ARTEFATO, derivadas=['Tempo_seg', COLUNA_ORDEM_ANO],
+                                         aba_geral='GERAL', arquivo=nome))
+    return tuple(saidas)
+
+def classificatoria_do_artefato(artefato: artefatos.Artefato) -> pd.DataFrame:
+    """A classificação (mesmas colunas de gerar_classificatoria) guardada num artefato da Tabulação."""
+    if artefato.tipo != TIPO_ARTEFATO:
+        raise ValueError(f"Artefato gerado pela página '{artefato.tipo}'; aqui é esperado o da Tabulação.")
+    return artefato.tabela[_COLUNAS_CLASSIFICATORIA]
+
+# ------------------ Modo incremental (Parquet) ------------------
+# As respostas chegam aos poucos durante a classificatória. A classificação já processada
+# fica salva em Parquet (uma pasta por formulário, um arquivo por etapa), identificada por
+# Data/Hora + Email + o conteúdo das colunas lidas; a cada upload só as respostas ainda não
+# vistas (novas ou editadas no formulário) passam por gerar_classificatoria e são mescladas
+# na ordem existente. Só as escolas com respostas novas/removidas têm abas diferentes.
+PASTA_INCREMENTAL = os.environ.get('TABULACAO_PASTA_INCREMENTAL', 'dados_incrementais')
+COLUNAS_CHAVE_RESPOSTA = ['Data/Hora', 'Email']
+_COLUNAS_CLASSIFICATORIA = ['Ano', 'Nome', 'Escola', 'Pontuação', 'Tempo', 'Deficiência/Transtorno', 'ETAPA',
+                            'Tempo_seg']
+_COLUNAS_CATEGORIA = ['Ano', 'Escola', 'Deficiência/Transtorno']
+
+_ESTADO_INCREMENTAL = {}  # caminho -> (mtime_ns, DataFrame): evita reler o Parquet a cada upload
+_TRAVAS_INCREMENTAL = {}  # caminho -> Lock: sessões com o mesmo formulário atualizam uma de cada vez
+_TRAVA_INCREMENTAL = threading.Lock()
+
+class ResultadoIncremental(NamedTuple):
+    classificatoria: pd.DataFrame
+    escolas_alteradas: list  # ordem alfabética
+    novas: int
+    removidas: int
+    versao: int | None  # mtime_ns do Parquet deixado por esta atualização (versao_estado)
+
+def _nome_arquivo(texto: str, padrao: str) -> str:
+    return re.sub(r'[^0-9A-Za-z]+', '_', _strip_accents(str(texto))).strip('_').lower() or padrao
+
+def caminho_incremental(etapa: str, pasta=None, formulario=None) -> Path:
+    """Parquet da etapa; formulario (ex.: o município) separa o estado de formulários diferentes."""
+    pasta = Path(pasta or PASTA_INCREMENTAL)
+    if formulario:
+        pasta = pasta / _nome_arquivo(formulario, 'formulario')
+    return pasta / f"classificatoria_{_nome_arquivo(etapa, 'etapa')}.parquet"
+
+def versao_estado(caminho: Path) -> int | None:
+    """mtime_ns do Parquet da etapa (None sem estado salvo): muda a cada atualização gravada."""
+    try:
+        return caminho.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
 
-    # 2) Paralimpíada
-    with pd.ExcelWriter(out_paralimpiada, engine='xlsxwriter') as writer:
-        escrever_geral(writer, paralimpiada_df, image_bytes=image_bytes, banner_rows=banner_rows, banner_h_px=banner_h_px)
-        escrever_por_escola(writer, paralimpiada_df, image_bytes=image_bytes, banner_rows=banner_rows, banner_h_px=banner_h_px)
+def _trava_incremental(caminho: Path) -> threading.Lock:
+    with _TRAVA_INCREMENTAL:
+        return _TRAVAS_INCREMENTAL.setdefault(caminho, threading.Lock())
 
-    # 3) JUNÇÃO
-    base_export = base.drop(columns=['__def_norm'], errors='ignore')
-    with pd.ExcelWriter(out_juncao, engine='xlsxwriter') as writer:
-        escrever_geral(writer, base_export, image_bytes=image_bytes, banner_rows=banner_rows, banner_h_px=banner_h_px)
-        escrever_por_escola(writer, base_export, image_bytes=image_bytes, banner_rows=banner_rows, banner_h_px=banner_h_px)
+def chaves_resposta(df: pd.DataFrame) -> np.ndarray:
+    """
+    Chave uint64 de cada resposta: hash de Data/Hora + Email (e-mail sem espaços/maiúsculas),
+    mais o nº da repetição se a mesma dupla aparecer mais de uma vez.
+    """
+    faltando = [c for c in COLUNAS_CHAVE_RESPOSTA if c not in df.columns]
+    if faltando:
+        raise KeyError(f"Modo incremental precisa das colunas {faltando} "
+                       f"(Carimbo de data/hora e Endereço de e-mail). Recebidas: {list(df.columns)}")
+    email = _em_valores_unicos(df['Email'], lambda u: u.astype(str).str.strip().str.lower())
+    base = (pd.util.hash_array(df['Data/Hora'].to_numpy()) * np.uint64(0x9E3779B97F4A7C15)
+            ^ pd.util.hash_array(email.to_numpy(dtype=object)))
+    repeticao = pd.Series(base).groupby(base, sort=False).cumcount().to_numpy().astype('uint64')
+    return base ^ (repeticao * np.uint64(0xC2B2AE3D27D4EB4F))
+
+def conteudo_resposta(df: pd.DataFrame) -> np.ndarray:
+    """Hash uint64 das colunas que a normalização lê (COLUNAS_RESPOSTA): muda se a resposta for editada."""
+    colunas = [c for c in COLUNAS_RESPOSTA if c in df.columns]
+    return pd.util.hash_pandas_object(df[colunas], index=False).to_numpy()
+
+def _tempo_para_parquet(df: pd.DataFrame) -> pd.DataFrame:
+    """Tempo mistura texto e número: no Parquet vira Tempo_txt + Tempo_num (o Excel recebe os mesmos valores)."""
+    texto, numero = artefatos.separar_texto_numero(df['Tempo'])
+    df = df.drop(columns=['Tempo'])
+    df['Tempo_txt'] = texto
+    df['Tempo_num'] = numero
+    return df
+
+def _tempo_de_parquet(df: pd.DataFrame) -> pd.Series:
+    return artefatos.juntar_texto_numero(df['Tempo_txt'], df['Tempo_num'])
+
+def _ler_estado(caminho: Path):
+    if not caminho.exists():
+        return None
+    mtime = caminho.stat().st_mtime_ns
+    em_memoria = _ESTADO_INCREMENTAL.get(caminho)
+    if em_memoria is None or em_memoria[0] != mtime:
+        em_memoria = (mtime, pd.read_parquet(caminho))
+        _ESTADO_INCREMENTAL[caminho] = em_memoria
+    return em_memoria[1]
+
+def _gravar_estado(caminho: Path, df: pd.DataFrame):
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_suffix('.tmp')
+    df.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+    _ESTADO_INCREMENTAL[caminho] = (caminho.stat().st_mtime_ns, df)
+
+def _unir_categorias(series) -> pd.Categorical:
+    """Junta Categoricals com categorias diferentes, deixando só as usadas e em ordem (como astype('category'))."""
+    categoricas = [_como_categoria(s) for s in series]
+    if len({c.cat.categories.dtype for c in categoricas}) > 1:  # ex.: bloco com a coluna vazia (float) ou só números
+        categoricas = [c.astype(object).astype('category') for c in categoricas]
+    unido = pd.api.types.union_categoricals(categoricas, ignore_order=True)
+    unido = unido.remove_unused_categories()
+    try:
+        return unido.reorder_categories(sorted(unido.categories))
+    except TypeError:  # categorias de tipos misturados: mantém a ordem de chegada
+        return unido
 
-    out_olimpiada.seek(0); out_paralimpiada.seek(0); out_juncao.seek(0)
-    return out_olimpiada, out_paralimpiada, out_juncao
+@medir('atualizacao incremental', linhas=lambda r: len(r.classificatoria))
+def atualizar_classificatoria(formulario_df: pd.DataFrame, etapa: str, pasta=None,
+                              formulario=None) -> ResultadoIncremental:
+    """
+    Mesmo resultado de gerar_classificatoria(formulario_df, etapa), normalizando só as respostas novas.
+    Respostas que sumiram do formulário saem da classificação; uma resposta editada (mesma Data/Hora
+    + Email, outro conteúdo) sai e volta normalizada de novo. O Parquet da etapa é atualizado.
+    """
+    caminho = caminho_incremental(etapa, pasta, formulario)
+    with _trava_incremental(caminho):
+        return _atualizar_classificatoria(formulario_df, etapa, caminho)
+
+def _atualizar_classificatoria(formulario_df, etapa, caminho) -> ResultadoIncremental:
+    mapeado = mapear_colunas(formulario_df)
+    chaves = chaves_resposta(mapeado) ^ (conteudo_resposta(mapeado) * np.uint64(0x94D049BB133111EB))
+    anterior = _ler_estado(caminho)
+    if anterior is not None and anterior['ETAPA'].ne(etapa).any():
+        anterior = None  # arquivo de outra etapa com o mesmo nome normalizado: recomeça
+
+    vistas = np.zeros(len(chaves), dtype=bool)
+    if anterior is not None:
+        vistas = np.isin(chaves, anterior['_chave'].to_numpy())
+
+    novas = gerar_classificatoria(formulario_df[~vistas], etapa)
+    novas['_chave'] = chaves[formulario_df.index.get_indexer(novas.index)]  # gerar_classificatoria preserva o índice
+    partes = [_tempo_para_parquet(novas)]
+    alteradas = set(novas['Escola'].astype(object))
+    removidas = 0
+    if anterior is not None:
+        mantidas = np.isin(anterior['_chave'].to_numpy(), chaves)
+        removidas = int((~mantidas).sum())
+        alteradas.update(anterior.loc[~mantidas, 'Escola'].astype(object))
+        partes = [anterior[mantidas]] + ([partes[0]] if len(novas) else [])
+
+    combinado = pd.concat(partes, ignore_index=True)
+    for col in _COLUNAS_CATEGORIA:
+        combinado[col] = _unir_categorias([p[col] for p in partes])
+
+    # Mescla: anteriores + novas numa única ordenação estável das chaves numéricas
+    # (ano, -pontuação, tempo); a posição no upload desempata como na classificação completa
+    linha = pd.Index(chaves).get_indexer(combinado['_chave'])
+    ordem = np.lexsort((linha, combinado['Tempo_seg'].to_numpy(), -combinado['Pontuação'].to_numpy(),
+                        ordem_ano_codigos(combinado['Ano'])))
+    combinado = combinado.take(ordem).reset_index(drop=True)
+
+    if len(novas) or removidas or anterior is None:
+        _gravar_estado(caminho, combinado)
+
+    classificatoria = combinado.assign(Tempo=_tempo_de_parquet(combinado))[_COLUNAS_CLASSIFICATORIA]
+    classificatoria.index = formulario_df.index[linha[ordem]]
+    return ResultadoIncremental(classificatoria, sorted(alteradas), len(novas), removidas, versao_estado(caminho))
+
+# ------------------ Respostas repetidas ------------------
+# O mesmo aluno (nome sem acentos/maiúsculas, escola e ano normalizados) enviado mais de uma
+# vez conta uma vez só: fica a melhor tentativa (a primeira na ordem da classificação) ou a
+# última enviada (Data/Hora; sem ela, a última linha do formulário). Nomes parecidos na mesma
+# escola e ano não são removidos: vão para a planilha de revisão (duplicatas.py).
+CRITERIOS_DUPLICATAS = ('melhor', 'ultima')
+ABA_REPETIDAS, ABA_PARECIDOS = 'REPETIDAS', 'NOMES PARECIDOS'
+_NOMES_VAZIOS = {'', 'NAN', 'NONE'}  # Nome vazio depois do astype(str).str.upper()
+
+class ResultadoDuplicatas(NamedTuple):
+    classificatoria: pd.DataFrame  # uma resposta por aluno, na ordem da classificação
+    repetidas: pd.DataFrame        # cada grupo repetido: a resposta mantida e as removidas
+    parecidos: pd.DataFrame        # pares de nomes parecidos na mesma escola e ano (não removidos)
+
+def datas_resposta(formulario_df: pd.DataFrame) -> pd.Series | None:
+    """Data/Hora de envio de cada resposta (NaT se ilegível), ou None se o formulário não tiver a coluna."""
+    df = mapear_colunas(formulario_df)
+    if 'Data/Hora' not in df.columns:
+        return None
+    datas = df['Data/Hora']
+    if pd.api.types.is_datetime64_any_dtype(datas):
+        return datas
+    return pd.to_datetime(datas, errors='coerce', dayfirst=True, format='mixed')
+
+def _chave_ano(serie: pd.Series) -> np.ndarray:
+    """Código do ano para comparar respostas: pela ordem do ano ('1° ANO' = '1º ano'); sem ordem, pelo _norm do texto."""
+    ano = _como_categoria(serie)
+    categorias = list(ano.cat.categories)
+    ordem = _normalizar_com_memo(categorias, obter_ordem_ano_serie, _MEMO_ORDEM_ANO)
+    chaves = [repr(float(o)) if np.isfinite(o) else _norm(c) for c, o in zip(categorias, ordem)]
+    codigos = pd.factorize(pd.Series(chaves + [None], dtype=object))[0]  # último slot: NaN (código -1)
+    return codigos[ano.cat.codes.to_numpy()].astype('int64')
+
+def _codigos_aluno(df: pd.DataFrame):
+    """(aluno, bloco escola+ano, nome normalizado) de cada linha; aluno -1 para quem está sem nome."""
+    escola = _como_categoria(df['Escola']).cat.codes.to_numpy().astype('int64')
+    nome_normal = padronizar_nome_aluno_serie(df['Nome'])
+    nome_normal = nome_normal.where(~nome_normal.isin(_NOMES_VAZIOS))
+    nome = pd.factorize(nome_normal)[0].astype('int64')
+    bloco = chave_composta([escola + 1, _chave_ano(df['Ano']) + 1])
+    aluno = pd.factorize(chave_composta([bloco, nome + 1]))[0].astype('int64')
+    aluno[nome < 0] = -1
+    return aluno, bloco, nome_normal
+
+def _tabela_repetidas(df, aluno, mantidas, datas) -> pd.DataFrame:
+    """Linhas dos alunos com mais de uma resposta: por grupo (na ordem da classificação), a mantida primeiro."""
+    tamanho = np.bincount(aluno[aluno >= 0], minlength=1)
+    posicoes = np.flatnonzero((aluno >= 0) & (tamanho[np.maximum(aluno, 0)] > 1))
+    primeira = np.full(len(tamanho), len(df), dtype='int64')
+    np.minimum.at(primeira, aluno[posicoes], posicoes)
+    ordem = np.lexsort((posicoes, ~mantidas[posicoes], primeira[aluno[posicoes]]))
+    posicoes = posicoes[ordem]
+
+    tabela = df.iloc[posicoes].iloc[:, _colunas_exportacao(df)].reset_index(drop=True)
+    tabela.insert(0, 'Grupo', np.unique(primeira[aluno[posicoes]], return_inverse=True)[1] + 1)
+    tabela.insert(1, 'Situação', np.where(mantidas[posicoes], 'mantida', 'removida'))
+    tabela.insert(2, 'Linha no formulário', df.index[posicoes] + 2)  # + cabeçalho, numeração do Excel
+    if datas is not None:
+        tabela.insert(3, 'Data/Hora', datas.reindex(df.index[posicoes]).to_numpy())
+    return tabela
+
+def _tabela_parecidos(df, aluno, bloco, nome_normal, mantidas) -> pd.DataFrame:
+    entradas = np.flatnonzero(mantidas & (aluno >= 0))
+    pares = pares_parecidos(bloco[entradas], nome_normal.iloc[entradas])
+    i, j = entradas[pares['i'].to_numpy()], entradas[pares['j'].to_numpy()]
+    return pd.DataFrame({
+        'Escola': df['Escola'].to_numpy()[i],
+        'Ano': df['Ano'].to_numpy()[i],
+        'Nome': df['Nome'].to_numpy()[i],
+        'Linha no formulário': df.index[i] + 2,
+        'Nome parecido': df['Nome'].to_numpy()[j],
+        'Linha (nome parecido)': df.index[j] + 2,
+        'Motivo': pares['Motivo'].to_numpy(),
+        'Semelhança (%)': np.round(pares['Semelhança'].to_numpy() * 100).astype('int64'),
+    })
+
+@medir('duplicatas', linhas=lambda r: len(r.classificatoria))
+def remover_duplicatas(classificatoria_df: pd.DataFrame, criterio='melhor', datas=None) -> ResultadoDuplicatas:
+    """
+    Uma resposta por aluno. criterio 'melhor': a primeira na ordem da classificação (maior
+    pontuação, menor tempo); 'ultima': a de Data/Hora mais recente (datas com o índice do
+    formulário; empate ou sem datas: a linha mais abaixo). O índice do formulário é preservado.
+    """
+    if criterio not in CRITERIOS_DUPLICATAS:
+        raise ValueError(f"Critério inválido: {criterio!r}. Use um de {CRITERIOS_DUPLICATAS}.")
+    df = classificatoria_df
+    aluno, bloco, nome_normal = _codigos_aluno(df)
+    if criterio == 'melhor':
+        preferencia = np.arange(len(df), dtype='int64')
+    else:
+        preferencia = posto_valores(pd.Series(df.index), ascending=False)
+        if datas is not None:
+            recente = posto_valores(datas.reindex(df.index).reset_index(drop=True), ascending=False)
+            preferencia = chave_composta([recente, preferencia])
+    mantidas = manter_uma_por_grupo(aluno, preferencia)
+
+    return ResultadoDuplicatas(df if mantidas.all() else df[mantidas],
+                               _tabela_repetidas(df, aluno, mantidas, datas),
+                               _tabela_parecidos(df, aluno, bloco, nome_normal, mantidas))
+
+@medir('escrita revisao')
+def gerar_excel_duplicatas(resultado: ResultadoDuplicatas) -> bytes:
+    """Planilha de revisão: abas REPETIDAS (mantidas e removidas) e NOMES PARECIDOS."""
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        for aba, df in ((ABA_REPETIDAS, resultado.repetidas), (ABA_PARECIDOS, resultado.parecidos)):
+            df.to_excel(writer, sheet_name=aba, index=False)
+            aplicar_formatacao_basica(writer, aba, df)
+    return output.getvalue()
+
+# ------------------ Cache entre reruns ------------------
+# chave = hash do upload; os parâmetros de cada etapa completam a chave do st.cache_data
+@st.cache_data(max_entries=MAX_ENTRADAS, show_spinner="Classificando respostas...")
+def _classificar_cache(chave: str, etapa: str, _formulario_df):
+    return gerar_classificatoria(_formulario_df, etapa)
+
+@st.cache_data(max_entries=MAX_ENTRADAS, show_spinner="Lendo o formulário em blocos...")
+def _normalizar_em_blocos_cache(chave: str, formato: str, _conteudo: bytes):
+    return normalizar_em_blocos(ler_em_blocos(_conteudo, formato, usecols=coluna_canonica))
+
+@st.cache_data(max_entries=MAX_ENTRADAS, show_spinner="Classificando respostas...")
+def _ordenar_cache(chave: str, etapa: str, _respostas):
+    return ordenar_classificatoria(_respostas, etapa)
+
+def _atualizar_incremental(chave: str, etapa: str, formulario: str, formulario_df):
+    # Fora do st.cache_data: o Parquet muda por fora (outro upload, outra sessão, estado apagado).
+    # Os reruns desta sessão reaproveitam o resultado (e a lista de escolas) só enquanto o estado
+    # em disco for o que esta atualização deixou; senão o upload é aplicado de novo
+    caminho = caminho_incremental(etapa, formulario=formulario)
+    salvo = st.session_state.get('tabulacao_incremental')
+    if salvo is not None and salvo[0] == (chave, etapa, formulario) and salvo[1].versao == versao_estado(caminho):
+        return salvo[1]
+    with st.spinner("Atualizando respostas já processadas..."):
+        resultado = atualizar_classificatoria(formulario_df, etapa, formulario=formulario)
+    st.session_state['tabulacao_incremental'] = ((chave, etapa, formulario), resultado)
+    return resultado
+
+@st.cache_data(max_entries=MAX_ENTRADAS, show_spinner="Procurando respostas repetidas...")
+def _duplicatas_cache(chave: str, etapa: str, criterio: str, _classificatoria_df, _formulario_df=None, _datas=None):
+    datas = datas_resposta(_formulario_df) if _formulario_df is not None else _datas
+    return remover_duplicatas(_classificatoria_df, criterio, datas)
+
+@st.cache_data(max_entries=MAX_ENTRADAS, show_spinner="Gerando a planilha de revisão...")
+def _excel_duplicatas_cache(chave: str, etapa: str, criterio: str, _resultado):
+    return gerar_excel_duplicatas(_resultado)
+
+@st.cache_data(max_entries=MAX_ENTRADAS, show_spinner="Gerando artefatos...")
+def _gerar_artefatos_cache(chave: str, etapa: str, escolas, criterio, _classificatoria_df):
+    return salvar_artefatos(_classificatoria_df, escolas=escolas)
+
+# Geração dos 3 arquivos em segundo plano (tarefas.py): a chave da tarefa faz o papel da chave
+# do cache (o mesmo pedido reaproveita a tarefa em andamento ou o resultado pronto)
+def _gerar_arquivos(classificatoria_df, image_bytes, banner_rows, banner_h_px, streaming, escolas, progresso=None):
+    saidas = salvar_excels(classificatoria_df, image_bytes=image_bytes, banner_rows=banner_rows,
+                           banner_h_px=banner_h_px, modo=MODO_EXECUCAO_PADRAO, streaming=streaming,
+                           escolas=escolas, progresso=progresso)
+    return tuple(o.getvalue() for o in saidas)
 
 # ------------------ App ------------------
 def main():
@@ -382,54 +1285,164 @@ def main():
 }
     st.table(pd.DataFrame(exemplo_data))
 
-    uploaded_file = st.file_uploader("Envie o arquivo do Formulário de Resposta", type=["xlsx", "xls"])
+    uploaded_file = st.file_uploader("Envie o arquivo do Formulário de Resposta (ou um artefato Parquet "
+                                     "baixado desta página)", type=["xlsx", "xls", "csv", artefatos.EXTENSAO])
+    em_blocos = st.checkbox("Ler o formulário em blocos (formulários muito grandes)", value=False,
+                            help="Lê e normaliza as respostas aos poucos, guardando só as colunas usadas em "
+                                 "tipos compactos: a memória da leitura não cresce com o tamanho da planilha. "
+                                 "Arquivos .csv são sempre lidos assim. Não funciona com o modo incremental.")
     if uploaded_file is not None:
+        chave = hash_upload(uploaded_file)
+        conteudo = uploaded_file.getvalue()
+        formato = Path(uploaded_file.name).suffix.lower().lstrip('.')
+        em_blocos = formato == 'csv' or (em_blocos and formato == 'xlsx')
+        artefato = None
+        respostas = None
+        formulario_df = None
         try:
-            formulario_df = pd.read_excel(uploaded_file)
+            if artefatos.eh_artefato(conteudo):
+                # classificação já feita: só gera os arquivos de novo (ex.: outro banner)
+                artefato = ler_artefato(chave, conteudo)
+                classificatoria_df = classificatoria_do_artefato(artefato)
+            elif em_blocos:
+                # normalizado bloco a bloco; o formulário inteiro nunca fica na memória
+                respostas = _normalizar_em_blocos_cache(chave, formato, conteudo)
+            else:
+                # só as colunas conhecidas (_COL_CANON); as de questões do formulário ficam de fora
+                formulario_df = ler_excel(chave, conteudo, usecols=coluna_canonica)
             st.success("Arquivo carregado com sucesso!")
         except Exception as e:
             st.error(f"Erro ao processar o arquivo: {e}")
             return
 
-        etapa_sel = st.selectbox("Selecione a Etapa", ["1° CLASSIFICATÓRIA", "2° CLASSIFICATÓRIA", "OUTROS"])
-        etapa = st.text_input("Digite o nome da Etapa") if etapa_sel == "OUTROS" else etapa_sel
+        if artefato is None:
+            for aviso in (respostas.avisos if respostas is not None else avisos_colunas(formulario_df)):
+                st.warning(aviso)
+            etapa_sel = st.selectbox("Selecione a Etapa", ["1° CLASSIFICATÓRIA", "2° CLASSIFICATÓRIA", "OUTROS"])
+            etapa = st.text_input("Digite o nome da Etapa") if etapa_sel == "OUTROS" else etapa_sel
+        else:
+            etapa = ' / '.join(map(str, pd.unique(classificatoria_df['ETAPA'].dropna())))
+            st.info(f"Classificação carregada do artefato ({len(classificatoria_df)} linhas, etapa: {etapa}).")
 
         usar_banner = st.checkbox("Adicionar imagem no topo (todas as abas)", value=True)
         banner_altura = st.slider("Altura do banner (px)", min_value=60, max_value=220, value=110, step=10)
         banner_linhas = st.slider("Linhas reservadas para o banner", min_value=2, max_value=5, value=3, step=1)
+        baixa_memoria = st.checkbox("Modo de baixa memória (planilhas muito grandes)", value=False,
+                                    help="Grava as linhas em blocos, sem manter a planilha inteira na memória.")
+        incremental = artefato is None and respostas is None and st.checkbox(
+            "Modo incremental (reaproveita as respostas já processadas desta etapa)", value=False,
+            help="Guarda a classificação em disco e, a cada novo upload, processa só as "
+                 "respostas novas ou editadas (identificadas por Carimbo de data/hora + E-mail).")
+        formulario_incremental = incremental and st.text_input(
+            "Identificador do formulário (ex.: o município)", value=Path(uploaded_file.name).stem,
+            help="O estado do modo incremental é guardado por formulário e etapa: use sempre o mesmo "
+                 "identificador para o mesmo formulário e um diferente para cada município.").strip()
+        if incremental and not formulario_incremental:
+            st.warning("Informe o identificador do formulário para usar o modo incremental.")
+            return
+        opcoes_repetidas = {"Manter todas": None, "Manter a melhor tentativa": 'melhor',
+                            "Manter a última enviada": 'ultima'}
+        criterio = artefato is None and opcoes_repetidas[st.radio(
+            "Respostas repetidas (o mesmo aluno na mesma escola e ano)", list(opcoes_repetidas), horizontal=True,
+            help="Mesmo nome sem diferença de acentos, maiúsculas e espaços. A melhor tentativa é a de maior "
+                 "pontuação (e menor tempo); a última é a de Carimbo de data/hora mais recente. Nomes parecidos "
+                 "não são removidos: vão para a planilha de revisão.")] or None
+        # a busca custa ~45 µs por resposta (uns 20 s em 500 mil): só roda se pedida
+        revisar_repetidas = artefato is None and (criterio is not None or st.checkbox(
+            "Procurar respostas repetidas e nomes parecidos (sem remover)", value=False,
+            help="Gera a planilha de revisão sem tirar nenhuma resposta da classificação."))
 
         image_bytes = None
+        chave_banner = None
         if usar_banner:
             img_file = st.file_uploader("Envie a imagem (PNG/JPG), opcional", type=["png", "jpg", "jpeg"])
             if img_file is not None:
-                image_bytes = img_file.read()
+                image_bytes = img_file.getvalue()
+                chave_banner = hash_upload(img_file)
 
+        escolas = None
         try:
-            classificatoria_df = gerar_classificatoria(formulario_df, etapa)
+            if incremental:
+                resultado = _atualizar_incremental(chave, etapa, formulario_incremental, formulario_df)
+                classificatoria_df = resultado.classificatoria
+                st.info(f"{resultado.novas} respostas novas (ou editadas) e {resultado.removidas} removidas desde o "
+                        f"último upload desta etapa; {len(resultado.escolas_alteradas)} escola(s) alterada(s).")
+                if resultado.escolas_alteradas and st.checkbox("Gerar só as escolas alteradas", value=False):
+                    escolas = tuple(resultado.escolas_alteradas)
+            elif respostas is not None:
+                classificatoria_df = _ordenar_cache(chave, etapa, respostas.respostas)
+            elif artefato is None:
+                classificatoria_df = _classificar_cache(chave, etapa, formulario_df)
         except KeyError as e:
             st.error(f"Planilha não está no formato esperado: {e}")
             return
+        except ImportError as e:
+            st.error(f"O modo incremental precisa do pacote pyarrow: {e}")
+            return
+
+        if revisar_repetidas:
+            try:
+                repetidas = _duplicatas_cache(chave, etapa, criterio or 'melhor', classificatoria_df, formulario_df,
+                                              respostas.datas if respostas is not None else None)
+            except Exception as e:
+                st.error(f"Erro ao procurar respostas repetidas: {e}")
+                return
+            removidas = len(classificatoria_df) - len(repetidas.classificatoria)
+            if criterio:
+                classificatoria_df = repetidas.classificatoria
+                st.info(f"{removidas} resposta(s) repetida(s) removida(s).")
+            elif removidas:
+                st.warning(f"{removidas} resposta(s) repetida(s) (o mesmo aluno enviado mais de uma vez) estão na "
+                           f"classificação: escolha acima qual tentativa manter.")
+            if len(repetidas.parecidos):
+                st.info(f"{len(repetidas.parecidos)} par(es) de nomes parecidos na mesma escola e ano "
+                        f"(não removidos): confira na planilha de revisão.")
+            if len(repetidas.repetidas) or len(repetidas.parecidos):
+                st.download_button("Baixar planilha de revisão das repetidas",
+                                   _excel_duplicatas_cache(chave, etapa, criterio or 'melhor', repetidas),
+                                   "revisao_repetidas.xlsx",
+                                   "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 
         st.write("Dados filtrados e ordenados:")
-        st.dataframe(classificatoria_df)
+        previa(classificatoria_df, (chave, etapa, incremental, criterio), 'tabulacao')
 
+        chave_tarefa = ('tabulacao', chave, etapa, incremental, criterio, chave_banner, banner_linhas, banner_altura,
+                        baixa_memoria, escolas)
         if st.button("Gerar Arquivos"):
-            out_olimp, out_para, out_junc = salvar_excels(
-                classificatoria_df,
-                image_bytes=image_bytes,
-                banner_rows=banner_linhas,
-                banner_h_px=banner_altura
-            )
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.download_button("Baixar Alunos Olimpíada", out_olimp, "classificatoria_olimpiada.xlsx",
-                                   "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-            with col2:
-                st.download_button("Baixar Alunos Paralimpíada", out_para, "classificatoria_paralimpiada.xlsx",
-                                   "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-            with col3:
-                st.download_button("Baixar JUNÇÃO (Olimpíada + Paralimpíada)", out_junc, "classificatoria_juncao.xlsx",
-                                   "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+            tarefas.enviar(chave_tarefa, _gerar_arquivos, classificatoria_df, image_bytes, banner_linhas,
+                           banner_altura, baixa_memoria, escolas)
+            st.session_state['tabulacao_tarefa'] = chave_tarefa
+
+        # só a tarefa pedida com os parâmetros atuais (mudou banner/etapa: é preciso gerar de novo)
+        if st.session_state.get('tabulacao_tarefa') != chave_tarefa:
+            return
+        estado = tarefas.acompanhar(chave_tarefa)
+        if estado is None:  # em andamento (barra de progresso) ou já descartada do servidor
+            return
+        if estado.situacao == tarefas.ERRO:
+            st.error(f"Erro ao gerar os arquivos: {estado.erro}")
+            return
+
+        st.success(f"Arquivos gerados em {estado.segundos:.1f} s.")
+        out_olimp, out_para, out_junc = estado.resultado
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.download_button("Baixar Alunos Olimpíada", out_olimp, "classificatoria_olimpiada.xlsx",
+                               "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        with col2:
+            st.download_button("Baixar Alunos Paralimpíada", out_para, "classificatoria_paralimpiada.xlsx",
+                               "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        with col3:
+            st.download_button("Baixar JUNÇÃO (Olimpíada + Paralimpíada)", out_junc, "classificatoria_juncao.xlsx",
+                               "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+        # os mesmos 3 arquivos em Parquet, para enviar às próximas páginas sem reler o Excel
+        if artefatos.PYARROW_DISPONIVEL:
+            parquets = _gerar_artefatos_cache(chave, etapa, escolas, criterio, classificatoria_df)
+            for lugar, nome, dados in zip((col1, col2, col3), ARQUIVOS, parquets):
+                with lugar:
+                    st.download_button(f"Baixar em Parquet ({nome})", dados,
+                                       f"classificatoria_{nome}.{artefatos.EXTENSAO}", artefatos.MIME)
 
 if __name__ == '__main__':
     main()
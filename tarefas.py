@@ -0,0 +1,135 @@
+# Tarefas em segundo plano (geração de arquivos fora da execução da página)
+# - O clique só registra a tarefa; ela roda num pool de threads do servidor, então mexer em
+#   qualquer widget (rerun) não cancela nem recomeça a geração
+# - O registro é do servidor, pela chave da tarefa (hash do upload + parâmetros): o mesmo
+#   pedido, de qualquer sessão, reaproveita a tarefa em andamento ou o resultado pronto
+# - No máximo TAREFAS_SIMULTANEAS rodam ao mesmo tempo; as outras esperam na fila
+# - A função recebe progresso(feitas, total, mensagem); a página só lê o estado
+# - Tarefas terminadas ficam até MAX_TAREFAS_CONCLUIDAS (as mais antigas saem primeiro)
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import NamedTuple
+
+import streamlit as st
+
+from cache_resultados import MAX_ENTRADAS
+
+TAREFAS_SIMULTANEAS = int(os.environ.get('TABULACAO_TAREFAS_SIMULTANEAS', 2))
+MAX_TAREFAS_CONCLUIDAS = MAX_ENTRADAS
+INTERVALO_ATUALIZACAO = 1.0  # segundos entre as leituras do progresso na página
+
+NA_FILA, EXECUTANDO, CONCLUIDA, ERRO = 'na fila', 'executando', 'concluída', 'erro'
+
+
+class EstadoTarefa(NamedTuple):
+    chave: tuple
+    situacao: str       # NA_FILA, EXECUTANDO, CONCLUIDA ou ERRO
+    feitas: int
+    total: int
+    mensagem: str
+    resultado: object   # valor devolvido pela função (só CONCLUIDA)
+    erro: str | None
+    segundos: float     # desde o envio (ou duração total, se terminou)
+    posicao_fila: int   # 1 = a próxima a começar; 0 fora da fila
+
+    @property
+    def terminada(self) -> bool:
+        return self.situacao in (CONCLUIDA, ERRO)
+
+    @property
+    def fracao(self) -> float:
+        return min(self.feitas / self.total, 1.0) if self.total else 0.0
+
+
+_TRAVA = threading.Lock()
+_TAREFAS = {}  # chave -> SimpleNamespace (estado mutável, protegido por _TRAVA)
+_EXECUTOR = None
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = ThreadPoolExecutor(max_workers=TAREFAS_SIMULTANEAS, thread_name_prefix='tarefa')
+    return _EXECUTOR
+
+
+def _executar(tarefa, func, args, kwargs):
+    def progresso(feitas, total, mensagem=''):
+        with _TRAVA:
+            tarefa.feitas, tarefa.total, tarefa.mensagem = feitas, total, mensagem
+
+    with _TRAVA:
+        tarefa.situacao = EXECUTANDO
+    try:
+        resultado = func(*args, progresso=progresso, **kwargs)
+    except Exception as e:  # a página mostra o erro; o servidor continua
+        with _TRAVA:
+            tarefa.situacao, tarefa.erro, tarefa.fim = ERRO, f"{type(e).__name__}: {e}", time.monotonic()
+            _descartar_antigas()
+        return
+    with _TRAVA:
+        tarefa.situacao, tarefa.resultado, tarefa.fim = CONCLUIDA, resultado, time.monotonic()
+        _descartar_antigas()
+
+
+def _descartar_antigas():
+    terminadas = sorted((t.fim, i, chave) for i, (chave, t) in enumerate(_TAREFAS.items()) if t.fim is not None)
+    for _, _, chave in terminadas[:max(len(terminadas) - MAX_TAREFAS_CONCLUIDAS, 0)]:
+        del _TAREFAS[chave]
+
+
+def enviar(chave: tuple, func, *args, **kwargs) -> EstadoTarefa:
+    """
+    Agenda func(*args, progresso=..., **kwargs) com essa chave, se ainda não houver uma tarefa
+    em andamento ou concluída com ela (uma que terminou com erro é refeita).
+    """
+    with _TRAVA:
+        tarefa = _TAREFAS.get(chave)
+        if tarefa is None or tarefa.situacao == ERRO:
+            tarefa = SimpleNamespace(situacao=NA_FILA, feitas=0, total=0, mensagem='', resultado=None, erro=None,
+                                     inicio=time.monotonic(), fim=None)
+            _TAREFAS[chave] = tarefa
+            _executor().submit(_executar, tarefa, func, args, kwargs)
+    return consultar(chave)
+
+
+def consultar(chave: tuple) -> EstadoTarefa | None:
+    with _TRAVA:
+        tarefa = _TAREFAS.get(chave)
+        if tarefa is None:
+            return None
+        posicao = 0
+        if tarefa.situacao == NA_FILA:
+            posicao = sum(1 for t in _TAREFAS.values() if t.situacao == NA_FILA and t.inicio <= tarefa.inicio)
+        return EstadoTarefa(chave, tarefa.situacao, tarefa.feitas, tarefa.total, tarefa.mensagem, tarefa.resultado,
+                            tarefa.erro, (tarefa.fim or time.monotonic()) - tarefa.inicio, posicao)
+
+
+_fragmento = getattr(st, 'fragment', None) or st.experimental_fragment
+
+
+@_fragmento(run_every=INTERVALO_ATUALIZACAO)
+def _progresso(chave):
+    estado = consultar(chave)
+    if estado is None or estado.terminada:
+        st.rerun()  # a página toda mostra o resultado
+    if estado.situacao == NA_FILA:
+        st.progress(0.0, text=f"Na fila ({estado.posicao_fila}ª)... {estado.segundos:.0f} s")
+    else:
+        st.progress(estado.fracao, text=f"{estado.mensagem or 'Iniciando...'} ({estado.segundos:.0f} s)")
+
+
+def acompanhar(chave: tuple) -> EstadoTarefa | None:
+    """
+    Estado da tarefa para a página: em andamento, mostra a barra de progresso (atualizada
+    sozinha, sem reexecutar a página) e devolve None; terminada, devolve o estado.
+    """
+    estado = consultar(chave)
+    if estado is None or estado.terminada:
+        return estado
+    _progresso(chave)
+    return None
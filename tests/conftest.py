@@ -0,0 +1,5 @@
+# Os módulos ficam na raiz do repositório (sem pacote): os testes importam de lá
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,78 @@
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+import artefatos
+from merge_sheets import COLUNA_ABA, combinar_abas, dados_do_artefato
+
+pytest.importorskip('pyarrow')
+
+
+def _tabela():
+    return pd.DataFrame({
+        'Ano': pd.Categorical(['5° ANO', '1° ANO', '5° ANO', '1° ANO']),
+        'Nome': ['Ana', 'Rui', 'Lia', 'Caio'],
+        'Escola': ['ESCOLA B', 'ESCOLA A', 'ESCOLA B', 'ESCOLA A'],  # object: vira categoria no artefato
+        'Pontuação': [10, 8, 7, 12],
+        'Tempo': ['12:30', 540, 90.5, None],  # texto e número na mesma coluna
+        'Tempo_seg': [750, 540, 90, 0],
+    })
+
+
+def test_ida_e_volta():
+    tabela = _tabela()
+    artefato = artefatos.ler(artefatos.exportar(tabela, 'teste', derivadas=['Tempo_seg'], origem='x.xlsx'))
+    assert artefato.tipo == 'teste' and artefato.metadados['origem'] == 'x.xlsx'
+    assert artefato.metadados['mistas'] == ['Tempo']
+    assert list(artefato.tabela.columns) == list(tabela.columns)  # sem as colunas __txt/__num
+
+    lido = artefato.tabela
+    assert lido['Tempo'].tolist()[:3] == ['12:30', 540, 90.5] and pd.isna(lido['Tempo'].iloc[3])
+    assert type(lido['Tempo'].iloc[1]) is int
+    for coluna in ('Ano', 'Escola'):
+        assert isinstance(lido[coluna].dtype, pd.CategoricalDtype)
+        assert lido[coluna].astype(object).tolist() == tabela[coluna].astype(object).tolist()
+    assert list(lido['Ano'].cat.categories) == list(tabela['Ano'].cat.categories)
+    pd.testing.assert_frame_equal(lido[['Nome', 'Pontuação', 'Tempo_seg']], tabela[['Nome', 'Pontuação', 'Tempo_seg']])
+
+
+def test_abas_na_ordem_do_arquivo():
+    tabela = _tabela()
+    abas = {'ESCOLA B': tabela.iloc[[0, 2]], 'VAZIA': tabela.iloc[:0], 'ESCOLA A': tabela.iloc[[1, 3]]}
+    artefato = artefatos.ler(artefatos.exportar(abas, 'teste', derivadas=['Tempo_seg'], aba_geral='GERAL'))
+
+    lidas = artefatos.abas(artefato)
+    assert list(lidas) == ['ESCOLA B', 'ESCOLA A']  # aba sem linhas não volta (como no .xlsx)
+    for nome, df in lidas.items():
+        assert list(df.columns) == ['Ano', 'Nome', 'Escola', 'Pontuação', 'Tempo']  # sem Aba e sem derivadas
+        assert df.index.tolist() == list(range(len(df)))
+        assert df['Nome'].tolist() == abas[nome]['Nome'].tolist()
+
+    com_tudo = artefatos.abas(artefato, incluir_derivadas=True, incluir_geral=True)
+    assert list(com_tudo) == ['GERAL', 'ESCOLA B', 'ESCOLA A']
+    assert len(com_tudo['GERAL']) == len(tabela) and 'Tempo_seg' in com_tudo['ESCOLA A'].columns
+
+
+def test_parquet_sem_metadados():
+    saida = BytesIO()
+    pd.DataFrame({'a': [1]}).to_parquet(saida)
+    assert artefatos.eh_artefato(saida.getvalue())
+    with pytest.raises(ValueError):
+        artefatos.ler(saida.getvalue())
+
+
+def test_combinado_ida_e_volta():
+    aba = pd.DataFrame([['título'] * 7, ['Ano'] * 7,
+                        ['1° ano', 'ana', 'escola a', 10, '00:10:00', 'n', '1ª etapa'],
+                        ['1° ano', 'rui', 'escola a', 8, 540, 'n', '1ª etapa']])
+    combinado = combinar_abas({'Planilha 1': aba, 'Planilha 2': aba})
+    lido = dados_do_artefato(artefatos.ler(artefatos.exportar(combinado, 'combinado')))
+    assert lido.astype(object).values.tolist() == combinado.astype(object).values.tolist()
+    assert lido[COLUNA_ABA].tolist() == ['Planilha 1'] * 2 + ['Planilha 2'] * 2
+
+
+@pytest.mark.parametrize('tipo', ['tabulacao', 'classificacao', 'semifinal', 'final'])
+def test_combinado_recusa_artefato_de_outra_pagina(tipo):
+    with pytest.raises(ValueError, match=tipo):
+        dados_do_artefato(artefatos.ler(artefatos.exportar(_tabela(), tipo)))
@@ -0,0 +1,43 @@
+from streamlit.testing.v1 import AppTest
+
+from cache_resultados import _nome_funcao
+
+
+def _filtro(colunas):
+    return lambda c: c in colunas
+
+
+def _pagina():
+    # o cache do Streamlit só vale dentro de uma execução da página
+    from io import BytesIO
+
+    import pandas as pd
+    import streamlit as st
+
+    from cache_resultados import ler_excel
+
+    saida = BytesIO()
+    pd.DataFrame({'A': [1, 2], 'B': [3, 4], 'C': [5, 6]}).to_excel(saida, index=False)
+    planilha = saida.getvalue()
+
+    def filtro(colunas):
+        return lambda c: c in colunas
+
+    ler_excel.clear()
+    st.session_state['lambdas'] = [list(ler_excel('k', planilha, usecols=lambda c: c == 'A').columns),
+                                   list(ler_excel('k', planilha, usecols=lambda c: c == 'B').columns)]
+    st.session_state['closures'] = [list(ler_excel('k', planilha, usecols=filtro({'A'})).columns),
+                                    list(ler_excel('k', planilha, usecols=filtro({'B', 'C'})).columns)]
+
+
+def test_funcoes_diferentes_nao_dividem_o_cache():
+    at = AppTest.from_function(_pagina, default_timeout=30)
+    at.run()
+    assert not at.exception
+    assert at.session_state['lambdas'] == [['A'], ['B']]
+    assert at.session_state['closures'] == [['A'], ['B', 'C']]
+
+
+def test_mesma_funcao_mesma_chave():
+    assert _nome_funcao(_filtro({'A'})) == _nome_funcao(_filtro({'A'}))
+    assert _nome_funcao(lambda c: c == 'A') != _nome_funcao(lambda c: c == 'B')
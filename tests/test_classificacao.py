@@ -0,0 +1,28 @@
+from io import BytesIO
+
+import openpyxl
+import pandas as pd
+
+from classificacaoMelhoresColocados import gerar_excel_classificacao
+
+
+def _aba(n):
+    return pd.DataFrame({
+        'Ano': ['5° ANO'] * n,
+        'Nome': [f'ALUNO {i}' for i in range(n)],
+        'Escola': ['ESCOLA A'] * n,
+        'Pontuação': list(range(n)),
+        'Tempo': ['00:10:00'] * n,
+        'Deficiência/Transtorno': ['N'] * n,
+        'ETAPA': ['1° CLASSIFICATÓRIA'] * n,
+    })
+
+
+def test_titulo_cobre_todas_as_colunas():
+    conteudo, _, erros, melhores = gerar_excel_classificacao({'ESCOLA A': _aba(5)}, top_n=3)
+    assert not erros
+    planilha = openpyxl.load_workbook(BytesIO(conteudo))['ESCOLA A']
+    colunas = [c.value for c in planilha[2] if c.value is not None]
+    assert 'Posição' in colunas
+    assert [str(r) for r in planilha.merged_cells.ranges] == [f"A1:{openpyxl.utils.get_column_letter(len(colunas))}1"]
+    assert planilha['A1'].value == 'ESCOLA A'
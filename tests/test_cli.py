@@ -0,0 +1,46 @@
+import pandas as pd
+
+from cli_tabulacao import NOMES_SAIDA, listar_entradas, main, nomes_saida
+
+FORMULARIO = {
+    "Nome do aluno?": ["Ana Lima", "Rui Prado"],
+    "Qual é o nome da sua escola?": ["EMEF Central", "EMEF Central"],
+    "Escreva o nome da escola caso ela no esteja listada": ["", ""],
+    "Ano escolar do aluno:": ["5° ANO", "5° ANO"],
+    "Total de pontuação?": [10, 8],
+    "Quanto tempo de realização?": ["00:10:00", "00:12:00"],
+    "Se for aluno com deficiência/transtorno:": ["N", "N"],
+}
+
+
+def _entradas(tmp_path):
+    for pasta in ('municipio_a', 'municipio_b'):
+        (tmp_path / pasta).mkdir()
+        pd.DataFrame(FORMULARIO).to_excel(tmp_path / pasta / 'respostas.xlsx', index=False)
+    pd.DataFrame(FORMULARIO).to_csv(tmp_path / 'municipio_a' / 'respostas.csv', index=False)
+    pd.DataFrame(FORMULARIO).to_csv(tmp_path / 'municipio_a' / 'outro.csv', index=False)
+    return tmp_path / 'municipio_a', tmp_path / 'municipio_b'
+
+
+def test_pasta_inclui_csv(tmp_path):
+    pasta_a, _ = _entradas(tmp_path)
+    assert [p.name for p in listar_entradas([pasta_a])] == ['outro.csv', 'respostas.csv', 'respostas.xlsx']
+    assert [p.name for p in listar_entradas([pasta_a], '*.xlsx')] == ['respostas.xlsx']
+
+
+def test_nomes_saida_unicos(tmp_path):
+    entradas = listar_entradas(_entradas(tmp_path))
+    nomes, colisoes = nomes_saida(entradas)
+    assert len(set(nomes.values())) == len(entradas) == 4
+    assert nomes[tmp_path / 'municipio_a' / 'outro.csv'] == 'outro'
+    assert [sorted(p.suffix for p in grupo) for grupo in colisoes] == [['.csv', '.xlsx', '.xlsx']]
+    assert nomes_saida(entradas) == (nomes, colisoes)  # o mesmo caminho sempre vai para a mesma pasta
+
+
+def test_main_nao_sobrescreve_e_avisa(tmp_path, capsys):
+    assert main([*map(str, _entradas(tmp_path)), '--saida', str(tmp_path / 'saida'), '--workers', '1']) == 0
+    pastas = sorted(p.name for p in (tmp_path / 'saida').iterdir())
+    assert len(pastas) == 4 and 'outro' in pastas
+    for pasta in pastas:
+        assert all((tmp_path / 'saida' / pasta / nome).exists() for nome in NOMES_SAIDA)
+    assert "3 entradas com o nome 'respostas'" in capsys.readouterr().err
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cli_tabulacao import NOME_REVISAO, processar_arquivo
+from duplicatas import pares_parecidos
+from tabulacaoOlimpiadasEParalimpada import gerar_classificatoria, gerar_excel_duplicatas, remover_duplicatas
+
+ETAPA = '1° CLASSIFICATÓRIA'
+
+# o exemplo mostrado na página de Tabulação
+EXEMPLO = {
+    "Nome do aluno?": ["Aluno 1", "Aluno 2", "Aluno 3"],
+    "Qual é o nome da sua escola?": ["EMEF Exemplo", "Escola não está na lista", "EMEF Central"],
+    "Escreva o nome da escola caso ela no esteja listada": ["EMEF Nova Esperança", "", ""],
+    "Ano escolar do aluno:": ["1° ANO", "2° ANO", "EJAI 2ª ETAPA"],
+    "Total de pontuação?": [45, 38, 50],
+    "Quanto tempo de realização?": ["00:15:00", "12:30", "540"],
+    "Se for aluno com deficiência/transtorno:": ["Não possui deficiência/transtorno", "Deficiência física", "N"],
+}
+
+
+def _formulario(nomes, escola="EMEF Central", ano="5° ANO", pontos=None, datas=None):
+    n = len(nomes)
+    df = pd.DataFrame({
+        "Carimbo de data/hora": datas or [f"01/05/2024 08:{i:02d}:00" for i in range(n)],
+        "Nome do aluno?": nomes,
+        "Qual é o nome da sua escola?": [escola] * n,
+        "Escreva o nome da escola caso ela no esteja listada": [""] * n,
+        "Ano escolar do aluno:": [ano] * n,
+        "Total de pontuação?": pontos or list(range(10, 10 + n)),
+        "Quanto tempo de realização?": ["00:10:00"] * n,
+        "Se for aluno com deficiência/transtorno:": ["N"] * n,
+    })
+    return df
+
+
+@pytest.mark.parametrize('nomes', [[], ['Ana'], ['Ana Lima', 'Pedro Souza'], ['ALUNO 1', 'ALUNO 2', 'ALUNO 3']])
+def test_pares_parecidos_sem_candidatos(nomes):
+    pares = pares_parecidos(np.arange(len(nomes)), pd.Series(nomes, dtype=object))
+    assert pares.empty
+    assert list(pares.columns) == ['i', 'j', 'Motivo', 'Semelhança']
+
+
+def test_pares_parecidos_mesmo_bloco_sem_candidatos():
+    assert pares_parecidos(np.zeros(2, dtype='int64'), pd.Series(['ANA LIMA', 'PEDRO SOUZA'])).empty
+
+
+@pytest.mark.parametrize('criterio', ['melhor', 'ultima'])
+def test_exemplo_da_pagina(criterio):
+    classificatoria = gerar_classificatoria(pd.DataFrame(EXEMPLO), ETAPA)
+    resultado = remover_duplicatas(classificatoria, criterio)
+    assert len(resultado.classificatoria) == 3
+    assert resultado.repetidas.empty and resultado.parecidos.empty
+    assert gerar_excel_duplicatas(resultado)[:2] == b'PK'
+
+
+@pytest.mark.parametrize('criterio', ['melhor', 'ultima'])
+def test_uma_escola_nomes_distintos(criterio):
+    formulario = _formulario(['Ana Lima', 'Pedro Souza', 'Carla Dias', 'Rui Prado'])
+    resultado = remover_duplicatas(gerar_classificatoria(formulario, ETAPA), criterio)
+    assert len(resultado.classificatoria) == 4
+    assert resultado.repetidas.empty
+
+
+def test_melhor_e_ultima_tentativa():
+    formulario = _formulario(['Ana Lima', 'ANA  LIMA', 'Ána Lima', 'Pedro Souza'], pontos=[20, 40, 30, 10])
+    classificatoria = gerar_classificatoria(formulario, ETAPA)
+
+    melhor = remover_duplicatas(classificatoria, 'melhor')
+    assert melhor.classificatoria['Pontuação'].tolist() == [40, 10]
+    ultima = remover_duplicatas(classificatoria, 'ultima', pd.to_datetime(formulario["Carimbo de data/hora"],
+                                                                         dayfirst=True))
+    assert sorted(ultima.classificatoria['Pontuação'].tolist()) == [10, 30]
+    assert (ultima.repetidas['Situação'] == 'removida').sum() == 2
+
+
+def test_nome_parecido_so_revisado():
+    formulario = _formulario(['Isabela Souza Lima', 'Izabela Sousa Lima'])
+    resultado = remover_duplicatas(gerar_classificatoria(formulario, ETAPA), 'melhor')
+    assert len(resultado.classificatoria) == 2
+    assert len(resultado.parecidos) == 1
+
+
+@pytest.mark.parametrize('dados', [EXEMPLO, _formulario(['Ana Lima', 'Pedro Souza']).to_dict('list')])
+def test_cli_duplicatas_formulario_pequeno(tmp_path, dados):
+    entrada = tmp_path / 'formulario.xlsx'
+    pd.DataFrame(dados).to_excel(entrada, index=False)
+    resultado = processar_arquivo(entrada, tmp_path / 'saida', ETAPA, duplicatas='melhor')
+    assert resultado.erro == ''
+    assert (tmp_path / 'saida' / 'formulario' / NOME_REVISAO).exists()
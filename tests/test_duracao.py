@@ -0,0 +1,37 @@
+from datetime import time, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from duracao import COLUNA_TEMPO_SEG, TEMPO_AUSENTE, adicionar_tempo_seg, tempo_em_segundos
+
+
+@pytest.mark.parametrize('valor, segundos', [
+    ('9:00', 540), ('12:30', 750), ('00:15:00', 900), ('1:02:03', 3723), ('540', 540),
+    (540, 540), (90.4, 90), (time(0, 12, 30), 750), (timedelta(minutes=9), 540),
+    (pd.Timedelta(seconds=75), 75), (None, TEMPO_AUSENTE), (np.nan, TEMPO_AUSENTE), ('abc', TEMPO_AUSENTE),
+])
+def test_tempo_em_segundos(valor, segundos):
+    assert tempo_em_segundos(pd.Series([valor, '00:01:00'], dtype=object)).tolist() == [segundos, 60]
+
+
+def test_ordem_numerica_e_ausente_por_ultimo():
+    serie = pd.Series(['12:30', None, '9:00', time(0, 10), timedelta(minutes=11), 600.0, 'abc', 30], dtype=object)
+    tempo = tempo_em_segundos(serie)
+    assert tempo.dtype == 'int32' and tempo.name == COLUNA_TEMPO_SEG
+    ordem = serie.iloc[np.argsort(tempo.to_numpy(), kind='stable')].tolist()
+    assert ordem[:6] == [30, '9:00', time(0, 10), 600.0, timedelta(minutes=11), '12:30']
+    assert ordem[6] is None and ordem[7] == 'abc'  # sem tempo: por último, na ordem das linhas
+
+
+def test_coluna_timedelta():
+    serie = pd.Series(pd.to_timedelta(['00:09:00', None, '00:12:30']), index=[5, 6, 7])
+    tempo = tempo_em_segundos(serie)
+    assert tempo.tolist() == [540, TEMPO_AUSENTE, 750] and tempo.index.tolist() == [5, 6, 7]
+
+
+def test_adicionar_tempo_seg():
+    df = pd.DataFrame({'Tempo': ['9:00', '12:30']})
+    assert adicionar_tempo_seg(df)[COLUNA_TEMPO_SEG].tolist() == [540, 750]
+    assert COLUNA_TEMPO_SEG not in df.columns
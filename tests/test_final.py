@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+
+from final import _chave_cabecalho, alunos_da_aba, classificar_final
+from tabulacaoOlimpiadasEParalimpada import mascara_sem_deficiencia
+
+
+@pytest.mark.parametrize('cabecalho, chave', [
+    ('Pontuação', 'pontuacao'), ('  PONTUAÇÃO ', 'pontuacao'), ('Pontuação:', 'pontuacao'),
+    ('Ano  escolar', 'ano escolar'), ('Deficiência/Transtorno', 'deficiencia/transtorno'),
+    ('Escola (aba)', 'escola (aba)'), (None, None), (3, None),
+])
+def test_chave_cabecalho(cabecalho, chave):
+    assert _chave_cabecalho(cabecalho) == chave
+
+
+def test_alunos_da_aba_cabecalho_abaixo_do_banner():
+    bruto = pd.DataFrame([
+        [None, None, None, None],
+        ['ESCOLA A', None, None, None],
+        ['ANO', 'Nome do aluno', 'Nome', 'Pontuação:'],
+        ['5° ANO', 'x', 'Ana', 10],
+        ['5° ANO', 'y', None, 3],
+    ])
+    alunos = alunos_da_aba(bruto, 'ESCOLA A')
+    assert alunos['Nome'].tolist() == ['Ana']
+    assert alunos['Pontuação'].tolist() == [10]
+    assert alunos['Escola'].tolist() == ['ESCOLA A']
+
+
+def test_categoria_igual_a_da_tabulacao():
+    defi = pd.Series(['Não possui deficiência/transtorno', None, 'TEA', ''])
+    alunos = pd.DataFrame({'Ano': ['5° ANO'] * 4, 'Nome': ['Ana', 'Rui', 'Lia', 'Caio'], 'Escola': ['ESCOLA A'] * 4,
+                           'Pontuação': [10, 9, 8, 7], 'Tempo': ['00:10:00'] * 4, 'Deficiência/Transtorno': defi,
+                           'Etapa': [None] * 4, 'Arquivo': ['x.xlsx'] * 4})
+    ranking = classificar_final(alunos).set_index('Nome')
+    olimpiada = dict(zip(alunos['Nome'], mascara_sem_deficiencia(defi)))
+    assert {nome: ranking.loc[nome, 'Categoria'] == 'OLIMPÍADA' for nome in olimpiada} == olimpiada
+    assert ranking.loc['Rui', 'Categoria'] == 'PARALIMPÍADA'
@@ -0,0 +1,98 @@
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import tabulacaoOlimpiadasEParalimpada as tabulacao
+from tabulacaoOlimpiadasEParalimpada import atualizar_classificatoria, caminho_incremental, gerar_classificatoria
+
+ETAPA = '1° CLASSIFICATÓRIA'
+COLUNAS = ['Nome', 'Escola', 'Ano', 'Pontuação', 'Tempo_seg']
+
+
+def _formulario(linhas):
+    """linhas: (minuto, email, nome, escola, pontos)."""
+    return pd.DataFrame({
+        "Carimbo de data/hora": [f"01/05/2024 08:{m:02d}:00" for m, *_ in linhas],
+        "Endereço de e-mail": [e for _, e, *_ in linhas],
+        "Nome do aluno?": [n for _, _, n, _, _ in linhas],
+        "Qual é o nome da sua escola?": [f"EMEF {escola}" for *_, escola, _ in linhas],
+        "Escreva o nome da escola caso ela no esteja listada": [""] * len(linhas),
+        "Ano escolar do aluno:": ["5° ANO"] * len(linhas),
+        "Total de pontuação?": [p for *_, p in linhas],
+        "Quanto tempo de realização?": ["00:10:00"] * len(linhas),
+        "Se for aluno com deficiência/transtorno:": ["N"] * len(linhas),
+    })
+
+
+BASE = [(0, 'a@x', 'Ana', 'A', 10), (1, 'b@x', 'Rui', 'A', 20), (2, 'c@x', 'Lia', 'B', 15)]
+
+
+def _igual_completo(resultado, formulario):
+    completo = gerar_classificatoria(formulario, ETAPA)
+    assert resultado.classificatoria[COLUNAS].astype(object).values.tolist() == \
+        completo[COLUNAS].astype(object).values.tolist()
+    assert resultado.classificatoria.index.tolist() == completo.index.tolist()
+
+
+def test_novas_e_removidas(tmp_path):
+    atualizar_classificatoria(_formulario(BASE), ETAPA, tmp_path)
+    atual = _formulario(BASE[1:] + [(3, 'd@x', 'Davi', 'B', 40)])
+    resultado = atualizar_classificatoria(atual, ETAPA, tmp_path)
+    assert (resultado.novas, resultado.removidas) == (1, 1)
+    assert resultado.escolas_alteradas == ['A', 'B']
+    _igual_completo(resultado, atual)
+
+
+@pytest.mark.parametrize('coluna, valor', [("Total de pontuação?", 30), ("Nome do aluno?", "Ana Maria"),
+                                           ("Qual é o nome da sua escola?", "EMEF B")])
+def test_resposta_editada(tmp_path, coluna, valor):
+    atualizar_classificatoria(_formulario(BASE), ETAPA, tmp_path)
+    editado = _formulario(BASE)
+    editado.loc[0, coluna] = valor  # mesma Data/Hora + Email, conteúdo corrigido
+    resultado = atualizar_classificatoria(editado, ETAPA, tmp_path)
+    assert resultado.novas == 1 and resultado.removidas == 1
+    _igual_completo(resultado, editado)
+
+
+def test_sem_mudancas(tmp_path):
+    atualizar_classificatoria(_formulario(BASE), ETAPA, tmp_path)
+    resultado = atualizar_classificatoria(_formulario(BASE), ETAPA, tmp_path)
+    assert (resultado.novas, resultado.removidas, resultado.escolas_alteradas) == (0, 0, [])
+    _igual_completo(resultado, _formulario(BASE))
+
+
+def test_formularios_separados(tmp_path):
+    outro = [(0, 'x@y', 'Caio', 'C', 5)]
+    atualizar_classificatoria(_formulario(BASE), ETAPA, tmp_path, formulario='Município A')
+    atualizar_classificatoria(_formulario(outro), ETAPA, tmp_path, formulario='Município B')
+    assert caminho_incremental(ETAPA, tmp_path, 'Município A') != caminho_incremental(ETAPA, tmp_path, 'Município B')
+
+    resultado = atualizar_classificatoria(_formulario(BASE), ETAPA, tmp_path, formulario='Município A')
+    assert (resultado.novas, resultado.removidas) == (0, 0)  # o B não sobrescreveu o estado do A
+    _igual_completo(resultado, _formulario(BASE))
+
+
+def _pagina():
+    import streamlit as st
+
+    from tabulacaoOlimpiadasEParalimpada import _atualizar_incremental
+    from test_incremental import BASE, ETAPA, _formulario
+
+    resultado = _atualizar_incremental('k', ETAPA, 'Município A', _formulario(BASE))
+    st.session_state['vistos'] = st.session_state.get('vistos', []) + [(resultado.novas, resultado.removidas)]
+
+
+def test_pagina_reaplica_quando_o_estado_muda(tmp_path, monkeypatch):
+    monkeypatch.setattr(tabulacao, 'PASTA_INCREMENTAL', tmp_path)
+    at = AppTest.from_function(_pagina, default_timeout=30)
+    at.run()
+    at.run()  # rerun da mesma sessão: reaproveita o resultado
+    assert at.session_state['vistos'] == [(3, 0), (3, 0)]
+
+    # outra sessão envia um formulário diferente com o mesmo identificador
+    atualizar_classificatoria(_formulario(BASE[:1]), ETAPA, tmp_path, formulario='Município A')
+    at.run()
+    assert not at.exception
+    assert at.session_state['vistos'][-1] == (2, 0)
+    resultado = atualizar_classificatoria(_formulario(BASE), ETAPA, tmp_path, formulario='Município A')
+    assert (resultado.novas, resultado.removidas) == (0, 0)
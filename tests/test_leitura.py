@@ -0,0 +1,83 @@
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from leitura import ler_em_blocos, ler_planilha
+from tabulacaoOlimpiadasEParalimpada import (avisos_colunas, coluna_canonica, datas_resposta, gerar_classificatoria,
+                                             normalizar_em_blocos, ordenar_classificatoria)
+
+ETAPA = '1° CLASSIFICATÓRIA'
+LINHAS = 120
+CORTE = 50  # a partir daqui os tipos das colunas mudam: o bloco de 50 linhas termina antes
+
+
+def _formulario():
+    i = np.arange(LINHAS)
+    depois = i >= CORTE
+    return pd.DataFrame({
+        "Carimbo de data/hora": [f"{1 + d % 28:02d}/05/2024 08:{d % 60:02d}:00" for d in i],
+        "Endereço de e-mail": [f"prof{d % 7}@x" for d in i],
+        "Nome do aluno?": [f"Aluno {d % 90}" for d in i],
+        "Qual é o nome da sua escola?": [f"EMEF {'ABC'[d % 3]}" for d in i],
+        # só preenchida depois do corte: o primeiro bloco lê a coluna vazia (float)
+        "Escreva o nome da escola caso ela no esteja listada": np.where(depois & (i % 5 == 0), 'EMEF Nova', None),
+        "Ano escolar do aluno:": [['1° ANO', '1º ano', '5° ANO', 'EJAI 2ª ETAPA'][d % 4] for d in i],
+        # números antes do corte, texto depois
+        "Total de pontuação?": np.where(depois, [f"{d % 40} pts" for d in i], (i % 40).astype(object)),
+        "Quanto tempo de realização?": np.where(depois, (i * 7 % 900).astype(object),
+                                                [f"00:{d % 15:02d}:{d % 60:02d}" for d in i]),
+        "Se for aluno com deficiência/transtorno:": np.where(i % 6 == 0, 'TEA', 'Não possui deficiência/transtorno'),
+        "Coluna ignorada": i,
+    })
+
+
+def _arquivo(formato):
+    saida = BytesIO()
+    if formato == 'csv':
+        _formulario().to_csv(saida, index=False)
+    else:
+        _formulario().to_excel(saida, index=False)
+    return saida.getvalue()
+
+
+def _inteira(conteudo, formato):
+    if formato == 'csv':  # o CSV só é lido em blocos: a referência é um bloco só
+        return pd.concat(ler_em_blocos(conteudo, formato, usecols=coluna_canonica, tamanho_bloco=LINHAS * 10))
+    return ler_planilha(conteudo, usecols=coluna_canonica)
+
+
+@pytest.mark.parametrize('formato', ['xlsx', 'csv'])
+@pytest.mark.parametrize('tamanho_bloco', [7, CORTE, 100_000])
+def test_blocos_iguais_a_leitura_inteira(formato, tamanho_bloco):
+    conteudo = _arquivo(formato)
+    inteira = _inteira(conteudo, formato)
+
+    blocos = list(ler_em_blocos(conteudo, formato, usecols=coluna_canonica, tamanho_bloco=tamanho_bloco))
+    assert len(blocos) == -(-LINHAS // tamanho_bloco)
+    lida = pd.concat(blocos)
+    assert list(lida.columns) == list(inteira.columns) and 'Coluna ignorada' not in lida.columns
+    assert lida.index.tolist() == list(range(LINHAS))
+    assert lida.astype(object).where(lida.notna(), None).values.tolist() == \
+        inteira.astype(object).where(inteira.notna(), None).values.tolist()
+
+    respostas = normalizar_em_blocos(ler_em_blocos(conteudo, formato, usecols=coluna_canonica,
+                                                   tamanho_bloco=tamanho_bloco))
+    assert respostas.avisos == avisos_colunas(inteira)
+    pd.testing.assert_series_equal(respostas.datas, datas_resposta(inteira))
+
+    em_blocos = ordenar_classificatoria(respostas.respostas, ETAPA)
+    completa = gerar_classificatoria(inteira, ETAPA)
+    assert em_blocos.index.tolist() == completa.index.tolist()
+    assert em_blocos.astype(object).values.tolist() == completa.astype(object).values.tolist()
+
+
+def test_csv_tipos_por_valor():
+    conteudo = "Nome;Pontuação;Tempo;Vazia\nAna;10;00:10:00;\nRui;8 pts;540;\nLia;007;12.5;\n".encode()
+    lido = pd.concat(ler_em_blocos(conteudo, 'csv', tamanho_bloco=1))
+    assert lido['Pontuação'].tolist() == [10, '8 pts', 7]
+    assert lido['Tempo'].tolist() == ['00:10:00', 540, 12.5]
+    assert lido['Vazia'].isna().all()
+    inteiro = pd.concat(ler_em_blocos(conteudo, 'csv'))
+    assert inteiro['Pontuação'].tolist() == [10, '8 pts', 7] and inteiro['Nome'].tolist() == ['Ana', 'Rui', 'Lia']
@@ -0,0 +1,66 @@
+# As versões vetorizadas (*_serie) têm que dar o mesmo resultado das funções escalares
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tabulacaoOlimpiadasEParalimpada import (_parse_tempo, obter_ordem_ano, obter_ordem_ano_serie, padronizar_nome_escola,
+                                             padronizar_nome_escola_serie, padronizar_pontuacao,
+                                             padronizar_pontuacao_serie, parse_tempo_serie)
+
+ANOS = ['1° ANO', '1º ano', '2ª ANO', '9° ANO', 'EJAI 2ª ETAPA', 'ejai 4º etapa', 'Turma 7', 'sem ano', '', None,
+        np.nan, 5]
+TEMPOS = ['12:30', '540', '00:15:00', '1:02:03.5', ' 12:30 ', '7.5', 'não lembro', '1:2:3:4', '', None, np.nan,
+          540, 12.5, datetime.time(0, 12, 30), datetime.time(1, 0), pd.Timedelta(minutes=3)]
+PONTUACOES = ['45 pts', '45', '038', 'quarenta', '', '-3', '12345678901234567890', None, np.nan, 45, 45.9, -2.5,
+              1e300, float('inf'), '9007199254740993']
+ESCOLAS = ['EMEF Exemplo', 'E.M.E.F. Central', 'emef   escola 3 ', 'Escola não está na lista', '', None, np.nan, 12]
+
+
+def _iguais(vetorizado, escalar):
+    assert len(vetorizado) == len(escalar)
+    for v, e in zip(vetorizado, escalar):
+        if isinstance(e, float) and np.isnan(e):
+            assert isinstance(v, float) and np.isnan(v)
+        else:
+            assert v == e
+
+
+def _series(valores):
+    # a coluna como vem do Excel (object) e, para cada valor, sozinho (tipo inferido pelo pandas)
+    return [pd.Series(valores, dtype=object)] + [pd.Series([v]) for v in valores]
+
+
+@pytest.mark.parametrize('serie', _series(PONTUACOES))
+def test_pontuacao(serie):
+    _iguais(padronizar_pontuacao_serie(serie).tolist(), [padronizar_pontuacao(v) for v in serie])
+
+
+def test_pontuacao_grande_exata():
+    serie = pd.Series(['12345678901234567890', 1e300, '9007199254740993', '45 pts'], dtype=object)
+    assert padronizar_pontuacao_serie(serie).tolist() == [padronizar_pontuacao(v) for v in serie]
+    assert padronizar_pontuacao_serie(pd.Series(['9007199254740993', 1])).dtype == 'int64'
+
+
+@pytest.mark.parametrize('serie', _series(TEMPOS))
+def test_tempo(serie):
+    _iguais(parse_tempo_serie(serie).tolist(), [_parse_tempo(v) for v in serie])
+
+
+@pytest.mark.parametrize('serie', _series(ANOS))
+def test_ordem_ano(serie):
+    assert obter_ordem_ano_serie(serie).tolist() == [obter_ordem_ano(v) for v in serie]
+
+
+@pytest.mark.parametrize('serie', _series(ESCOLAS))
+def test_nome_escola(serie):
+    assert padronizar_nome_escola_serie(serie).tolist() == [padronizar_nome_escola(v) for v in serie]
+
+
+def test_valores_repetidos():
+    # _em_valores_unicos: cada valor distinto uma vez, espalhado de volta na ordem das linhas
+    serie = pd.Series(['12:30', '540', '12:30', None, '540'] * 3, dtype=object)
+    _iguais(parse_tempo_serie(serie).tolist(), [_parse_tempo(v) for v in serie])
+    serie = pd.Series(['45 pts', 38, '45 pts', None] * 3, dtype=object)
+    assert padronizar_pontuacao_serie(serie).tolist() == [padronizar_pontuacao(v) for v in serie]
@@ -0,0 +1,49 @@
+import threading
+import tracemalloc
+
+from perfil import coletar, etapa
+
+
+def _medir_em_thread(entrou, pode_sair, saida):
+    with coletar(memoria=True) as relatorio:
+        entrou.set()
+        with etapa('outra'):
+            pode_sair.wait(5)
+    saida.append(relatorio)
+
+
+def test_sessoes_simultaneas_nao_desligam_o_tracemalloc_da_outra():
+    assert not tracemalloc.is_tracing()
+    entrou, pode_sair, saida = threading.Event(), threading.Event(), []
+    with coletar(memoria=True) as relatorio:
+        outra = threading.Thread(target=_medir_em_thread, args=(entrou, pode_sair, saida))
+        outra.start()
+        entrou.wait(5)
+        pode_sair.set()
+        outra.join(5)
+        assert tracemalloc.is_tracing()  # a outra sessão saiu sem desligar
+        with etapa('lista'):
+            dados = [0] * 1_000_000
+        del dados
+    assert not tracemalloc.is_tracing()  # quem ligou desliga
+
+    assert relatorio.erro == '' and relatorio[0].pico_python_mb > 5
+    assert saida[0].erro and saida[0][0].pico_python_mb is None
+
+
+def test_tracemalloc_ligado_por_fora_continua_ligado():
+    tracemalloc.start()
+    try:
+        with coletar(memoria=True) as relatorio:
+            with etapa('x'):
+                pass
+        assert tracemalloc.is_tracing() and relatorio[0].pico_python_mb is not None
+    finally:
+        tracemalloc.stop()
+
+
+def test_sem_memoria():
+    with coletar() as relatorio:
+        with etapa('x', linhas=3):
+            pass
+    assert relatorio[0].linhas == 3 and relatorio[0].pico_python_mb is None and not tracemalloc.is_tracing()
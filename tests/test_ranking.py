@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ranking import chave_composta, posicoes_em_ordem, posto_valores, selecionar_top_n, top_n_por_aba, \
+    top_n_por_grupo
+
+
+def _df():
+    return pd.DataFrame({
+        'Ano': ['1° ANO', '1° ANO', '1° ANO', '1° ANO', '2° ANO', '2° ANO'],
+        'Nome': ['Ana', 'Rui', 'Lia', 'Caio', 'Davi', 'Eva'],
+        'Pontuação': [10, 10, 8, 7, 5, 5],
+        'Tempo_seg': [60, 60, 50, 40, 30, 30],
+    })
+
+
+def _ranking(resultado):
+    return list(zip(resultado['Ano'], resultado['Nome'], resultado['Posição']))
+
+
+def test_posto_valores():
+    assert posto_valores(pd.Series([3, 1, np.nan, 3])).tolist() == [1, 0, 2, 1]
+    assert posto_valores(pd.Series([3, 1, np.nan, 3]), ascending=False).tolist() == [0, 1, 2, 0]
+    assert posto_valores(pd.Series([2, 'b', 1, 'a'], dtype=object)).tolist() == [1, 3, 0, 2]  # números antes
+
+
+def test_chave_composta_lexicografica():
+    chave = chave_composta([np.array([1, 0, 1, 0]), np.array([0, 5, 1, 2])])
+    assert np.argsort(chave).tolist() == [3, 1, 0, 2]
+
+
+@pytest.mark.parametrize('metodo, posicoes', [('competicao', [1, 1, 3, 4]), ('densa', [1, 1, 2, 3])])
+def test_numeracao_competicao_e_densa(metodo, posicoes):
+    resultado = top_n_por_grupo(_df(), ['Ano'], ['Pontuação', 'Tempo_seg'], 4, ascending=[False, True],
+                                metodo=metodo)
+    assert _ranking(resultado)[:4] == list(zip(['1° ANO'] * 4, ['Ana', 'Rui', 'Lia', 'Caio'], posicoes))
+
+
+def test_metodo_invalido():
+    with pytest.raises(ValueError):
+        top_n_por_grupo(_df(), ['Ano'], ['Pontuação'], 1, metodo='olimpico')
+
+
+def test_igual_ao_sort_completo():
+    df = _df()
+    resultado = top_n_por_grupo(df, ['Ano'], ['Pontuação', 'Tempo_seg'], 3, ascending=[False, True])
+    esperado = df.sort_values(['Ano', 'Pontuação', 'Tempo_seg'], ascending=[True, False, True],
+                              kind='stable').groupby('Ano').head(3)
+    assert resultado.index.tolist() == esperado.index.tolist()
+
+
+def test_empates_na_fronteira():
+    df = _df()
+    sem = top_n_por_grupo(df, ['Ano'], ['Pontuação'], 1, ascending=[False])
+    assert _ranking(sem) == [('1° ANO', 'Ana', 1), ('2° ANO', 'Davi', 1)]  # a ordem das linhas decide
+
+    com = top_n_por_grupo(df, ['Ano'], ['Pontuação'], 1, ascending=[False], empates=True)
+    assert _ranking(com) == [('1° ANO', 'Ana', 1), ('1° ANO', 'Rui', 1), ('2° ANO', 'Davi', 1), ('2° ANO', 'Eva', 1)]
+
+    # top 2 com empate no 2º lugar: quem empata com a última vaga também entra
+    df.loc[3, 'Pontuação'] = 8
+    com = top_n_por_grupo(df.iloc[1:4], ['Ano'], ['Pontuação'], 2, ascending=[False], empates=True)
+    assert _ranking(com) == [('1° ANO', 'Rui', 1), ('1° ANO', 'Lia', 2), ('1° ANO', 'Caio', 2)]
+
+
+def test_grupo_nan_fica_de_fora():
+    df = _df()
+    df.loc[[0, 4], 'Ano'] = np.nan
+    resultado = top_n_por_grupo(df, ['Ano'], ['Pontuação'], 10, ascending=[False])
+    assert 'Ana' not in resultado['Nome'].tolist() and 'Davi' not in resultado['Nome'].tolist()
+    assert _ranking(resultado) == [('1° ANO', 'Rui', 1), ('1° ANO', 'Lia', 2), ('1° ANO', 'Caio', 3),
+                                   ('2° ANO', 'Eva', 1)]
+
+    grupos = np.array([0, -1, 0, 1])
+    selecao = selecionar_top_n(grupos, np.array([2, 0, 1, 5]), 5)
+    assert selecao.posicoes.tolist() == [2, 0, 3]  # grupo negativo: fora de qualquer grupo
+
+
+def test_top_n_por_aba():
+    df = _df()
+    abas = {'ESCOLA B': df.iloc[:3].assign(Nota=pd.Categorical(['x', 'y', 'x'])), 'VAZIA': df.iloc[:0],
+            'ESCOLA A': df.iloc[3:]}
+    resultado = top_n_por_aba(abas, ['Ano'], ['Pontuação', 'Tempo_seg'], 1, ascending=[False, True], empates=True)
+    assert list(resultado) == ['ESCOLA B', 'VAZIA', 'ESCOLA A']  # ordem das abas preservada
+
+    for nome, esperado in [('ESCOLA B', [('1° ANO', 'Ana', 1), ('1° ANO', 'Rui', 1)]),
+                           ('ESCOLA A', [('1° ANO', 'Caio', 1), ('2° ANO', 'Davi', 1), ('2° ANO', 'Eva', 1)])]:
+        assert _ranking(resultado[nome]) == esperado
+        sozinha = top_n_por_grupo(abas[nome], ['Ano'], ['Pontuação', 'Tempo_seg'], 1, ascending=[False, True],
+                                  empates=True)
+        assert resultado[nome].index.tolist() == sozinha.index.tolist()  # mesmas linhas da aba isolada
+    assert resultado['VAZIA'].empty
+    assert isinstance(resultado['ESCOLA B']['Nota'].dtype, pd.CategoricalDtype)  # dtypes intactos
+
+
+def test_posicoes_em_ordem():
+    grupos = np.array([0, 0, 0, 0, 1, 1])
+    chave = np.array([1, 1, 2, 3, 4, 4])
+    assert posicoes_em_ordem(grupos, chave).tolist() == [1, 1, 3, 4, 1, 1]
+    assert posicoes_em_ordem(np.zeros(0, 'int64'), np.zeros(0, 'int64')).tolist() == []
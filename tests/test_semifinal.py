@@ -0,0 +1,56 @@
+from io import BytesIO
+
+import openpyxl
+import pandas as pd
+from openpyxl.utils import get_column_letter
+
+from semifinal import gerar_excel_semifinal, montar_tabela_longa, ranking_geral
+
+
+def _aba(nomes, pontos):
+    return pd.DataFrame({'Ano': ['5° ANO'] * len(nomes), 'Nome': nomes, 'Pontuação': pontos,
+                         'Tempo': ['00:10:00'] * len(nomes)})
+
+
+def test_etapas_realizadas_conta_etapas_distintas():
+    etapa1 = {'ESCOLA A': _aba(['Ana Lima', 'ANA LIMA', 'Rui Prado'], [10, 12, 8])}  # Ana enviou duas vezes
+    etapa2 = {'ESCOLA A': _aba(['Rui Prado', 'Lia Dias'], [9, 7])}
+    longa, _, avisos = montar_tabela_longa(etapa1, etapa2)
+    assert not avisos
+
+    ranking = ranking_geral(longa).set_index('Nome')
+    assert ranking.loc['ANA LIMA', 'Etapas Realizadas'] == 1
+    assert ranking.loc['Rui Prado', 'Etapas Realizadas'] == 2
+    assert ranking.loc['Lia Dias', 'Etapas Realizadas'] == 1
+    assert ranking.loc['ANA LIMA', 'Pontuação'] == 12
+
+
+def test_ranking_geral_agrupa_grafias_do_mesmo_ano():
+    etapa1 = {'ESCOLA A': _aba(['Ana Lima'], [10]).assign(Ano='1° ANO'),
+              'ESCOLA B': _aba(['Rui Prado'], [8]).assign(Ano='1º ano')}
+    etapa2 = {'ESCOLA A': _aba(['Lia Dias'], [5]).assign(Ano='1º ANO'), 'ESCOLA B': _aba([], [])}
+    longa, _, _ = montar_tabela_longa(etapa1, etapa2)
+
+    ranking = ranking_geral(longa).set_index('Nome')
+    assert ranking['Posição'].to_dict() == {'Ana Lima': 1, 'Rui Prado': 2, 'Lia Dias': 3}
+
+
+def test_ranking_geral_padroniza_pontuacao():
+    etapa1 = {'ESCOLA A': _aba(['Ana Lima', 'Rui Prado', 'Lia Dias'], [7, '8', '6 pts'])}
+    etapa2 = {'ESCOLA A': _aba([], [])}
+    longa, _, _ = montar_tabela_longa(etapa1, etapa2)
+
+    ranking = ranking_geral(longa)
+    assert ranking['Nome'].tolist() == ['Rui Prado', 'Ana Lima', 'Lia Dias']
+    assert ranking['Pontuação'].tolist() == [8, 7, 6]
+
+
+def test_titulo_cobre_todas_as_colunas():
+    etapa1 = {'ESCOLA A': _aba(['Ana Lima', 'Rui Prado'], [10, 8])}
+    etapa2 = {'ESCOLA A': _aba(['Rui Prado'], [9])}
+    conteudo, *_ = gerar_excel_semifinal(etapa1, etapa2)
+
+    livro = openpyxl.load_workbook(BytesIO(conteudo))
+    for planilha in livro.worksheets:
+        colunas = [c.value for c in planilha[2] if c.value is not None]
+        assert [str(r) for r in planilha.merged_cells.ranges] == [f"A1:{get_column_letter(len(colunas))}1"]